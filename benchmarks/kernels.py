@@ -0,0 +1,191 @@
+"""
+Microbenchmarks of the tracking kernels on synthetic eyes (eyeloop.utilities.synthetic):
+the pupil and corneal reflection thresholds and walkouts, and the fit models.
+Every kernel is timed for each frame size and ray count, and the results are written as json.
+Run from the repository root:
+
+    python -m benchmarks.kernels --output results.json
+    python -m benchmarks.kernels --compare results.json  # exits 1 on regressions
+
+A result is a regression if its median is more than --tolerance slower than the baseline's.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+import eyeloop.config as config
+from eyeloop.engine.processor import Center_class, Shape
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.synthetic import Synthetic_Eye
+
+SIZES = ((320, 240), (640, 480), (1280, 1024))
+RAYS = (16, 32, 64)
+KERNELS = ("pupil_thresh", "cr_thresh", "pupil_walkout", "cr_walkout", "ellipse_fit", "circle_hyper_fit", "center_fit")
+
+
+def time_kernel(kernel, setup=lambda: None, repeat: int = 200, warmup: int = 10) -> dict:
+    """
+    Runs setup() and kernel() repeat times, timing kernel() only. Durations in microseconds.
+    """
+
+    durations = np.zeros(repeat, dtype=np.int64)
+    for i in range(-warmup, repeat):
+        setup()
+        start = time.perf_counter_ns()
+        kernel()
+        if i >= 0:
+            durations[i] = time.perf_counter_ns() - start
+
+    durations = durations / 1e3
+    return {
+        "repeat": repeat,
+        "median_us": float(np.median(durations)),
+        "mean_us": float(np.mean(durations)),
+        "p95_us": float(np.percentile(durations, 95)),
+        "min_us": float(np.min(durations))
+    }
+
+
+def processor(shape_type: int, frame: np.ndarray, center: tuple, threshold: float) -> Shape:
+    shape = Shape(type=shape_type, n=1)
+    shape.binarythreshold = threshold
+    shape.reset(center)
+    shape.raw = frame
+    shape.source = frame.copy()
+    return shape
+
+
+def benchmark(width: int, height: int, rays: int, repeat: int) -> list:
+    config.arguments = Arguments(["--pupil_rays", str(rays), "--cr_rays", str(rays)])
+    config.engine = SimpleNamespace(width=width, height=height, dataout={})
+
+    eye = Synthetic_Eye(width, height, pupil_radius=min(height / 10, 60))  # within the pupil max_radius
+    truth = eye.ground_truth(0)
+    frame = eye.render(0, truth)
+
+    pupil = processor(1, frame, truth["pupil"][0], 60)
+    cr = processor(2, frame, truth["cr_1"], 200)
+
+    def restore(shape):
+        return lambda: np.copyto(shape.source, frame)
+
+    results = {
+        "pupil_thresh": time_kernel(pupil.thresh, restore(pupil), repeat),
+        "cr_thresh": time_kernel(cr.thresh, restore(cr), repeat)
+    }
+
+    # walkouts and fits run on the thresholded frames
+    restore(pupil)()
+    pupil.thresh()
+    restore(cr)()
+    cr.thresh()
+
+    pupil_points = pupil.walkout()
+    cr_points = cr.walkout()
+
+    config.arguments.model = "circular"
+    circle = Shape(type=1).fit_model
+
+    results.update({
+        "pupil_walkout": time_kernel(pupil.walkout, repeat=repeat),
+        "cr_walkout": time_kernel(cr.walkout, repeat=repeat),
+        "ellipse_fit": time_kernel(lambda: pupil.fit_model.fit(pupil_points), repeat=repeat),
+        "circle_hyper_fit": time_kernel(lambda: circle.hyper_fit(pupil_points), repeat=repeat),
+        "center_fit": time_kernel(lambda: Center_class().fit(cr_points), repeat=repeat)
+    })
+
+    return [{"kernel": kernel, "width": width, "height": height, "rays": rays, **result}
+            for kernel, result in results.items()]
+
+
+def run(sizes=SIZES, rays=RAYS, repeat: int = 200) -> dict:
+    results = []
+    for width, height in sizes:
+        for n in rays:
+            results += benchmark(width, height, n, repeat)
+
+    return {
+        "meta": {
+            "eyeloop": config.version,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "time": time.time()
+        },
+        "results": results
+    }
+
+
+def key(result: dict) -> tuple:
+    return result["kernel"], result["width"], result["height"], result["rays"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Results whose median is more than tolerance (fraction) slower than in the baseline.
+    """
+
+    baseline = {key(result): result for result in baseline["results"]}
+
+    regressions = []
+    for result in results["results"]:
+        try:
+            reference = baseline[key(result)]["median_us"]
+        except KeyError:
+            continue
+
+        if result["median_us"] > reference * (1 + tolerance):
+            regressions.append({**result, "baseline_median_us": reference})
+
+    return regressions
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(f"{w}x{h}" for w, h in SIZES),
+                        help="Frame sizes, comma-separated WIDTHxHEIGHT")
+    parser.add_argument("--rays", default=",".join(map(str, RAYS)), help="Ray counts, comma-separated")
+    parser.add_argument("--repeat", default=200, type=int, help="Timed calls per kernel")
+    parser.add_argument("--output", default="", help="Write the results to this json file")
+    parser.add_argument("--compare", default="", help="Baseline results json to check for regressions")
+    parser.add_argument("--tolerance", default=.25, type=float,
+                        help="Slowdown of the median counted as a regression (default = 0.25)")
+    parsed_args = parser.parse_args(args)
+
+    sizes = [tuple(map(int, size.split("x"))) for size in parsed_args.sizes.split(",")]
+    rays = [int(n) for n in parsed_args.rays.split(",")]
+
+    results = run(sizes, rays, parsed_args.repeat)
+
+    print(f"{'kernel':<18}{'frame':>11}{'rays':>6}{'median':>10}{'p95':>10} (us)")
+    for result in results["results"]:
+        print(f"{result['kernel']:<18}{result['width']:>6}x{result['height']:<4}{result['rays']:>6}"
+              f"{result['median_us']:>10.1f}{result['p95_us']:>10.1f}")
+
+    if parsed_args.output:
+        Path(parsed_args.output).write_text(json.dumps(results, indent=1))
+        print(f"Results written to {parsed_args.output}")
+
+    if parsed_args.compare:
+        regressions = compare(results, json.loads(Path(parsed_args.compare).read_text()), parsed_args.tolerance)
+        for result in regressions:
+            print(f"(!) {result['kernel']} {result['width']}x{result['height']}, {result['rays']} rays: "
+                  f"{result['median_us']:.1f} us, baseline {result['baseline_median_us']:.1f} us")
+        if regressions:
+            return 1
+        print("No regressions")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
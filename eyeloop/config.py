@@ -5,9 +5,3 @@ engine = 0
 arguments = 0
 file_manager = 0
 graphical_user_interface = 0
-
-#blink = 142.08
-import numpy as np
-blink = np.zeros(300, dtype=np.float64)
-
-blink_i = 0
@@ -7,3 +7,10 @@ anglesteps_cos = np.array([np.cos(np.radians(i * 360 / angular_iter)) for i in a
 anglesteps_sin = np.array([np.sin(np.radians(i * 360 / angular_iter)) for i in angular_range], dtype=np.float64)
 number_row = np.arange(1, len(anglesteps_cos) + 1, 1)
 zeros = np.zeros(len(number_row), dtype=int)
+
+preroll = 25  # frames tracked ahead of each parallel chunk (--workers) and discarded, to settle the fits
+
+blink_calibration_frames = 300  # frames sampled to calibrate the blink detector
+blink_samples = 4096  # pixels sampled per frame by the blink detector
+blink_threshold = 10  # minimum intensity deviation of a blink
+blink_sigma = 0  # if > 0, blinks must also deviate by blink_sigma standard deviations (noisy sensors)
@@ -7,49 +7,27 @@ angular_range = np.arange(angular_iter, dtype=np.int8)
 point_source = np.zeros(angular_iter, dtype=np.float64)
 step_list_source = np.zeros(angular_iter, dtype=np.int8)
 
-diagonal_size = 2**10
-
 step_size = np.deg2rad(360 / angular_iter)
 limit = np.arange(250)  # max size of shape; normalize qqqq
 cos_sin_steps = np.array([(np.cos(i * step_size), np.sin(i * step_size)) for i in angular_range], dtype=np.float64)
 
 kernel = np.ones((1, 1), np.uint8)
 
-main_diagonal = np.eye(diagonal_size, diagonal_size, dtype=bool)
+roi_expand = 1.5  # tracking window radius relative to the extent of the last fit (--roi 1)
+roi_decay = .95  # per-frame shrink rate of the tracking window; it grows immediately
 
 #atan(1/2.414) = 22.5 ~atan(1/2) = 26.57 deg
 
-half_diagonal = np.full((diagonal_size, diagonal_size), False, dtype=bool)
-fourth_diagonal = half_diagonal.copy()
-third_diagonal = half_diagonal.copy()
 onefourth = 1/4
 onethird = 1/3
 
 
-invhalf_diagonal = half_diagonal.copy()
-invfourth_diagonal = half_diagonal.copy()
-invthird_diagonal = half_diagonal.copy()
-
-for i, _ in enumerate(half_diagonal):
-    half_diagonal[int(i/2), i] = True
-    fourth_diagonal[int(i/4), i] = True
-    third_diagonal[int(i/3), i] = True
-
-    invhalf_diagonal[i, int(i/2)] = True
-    invfourth_diagonal[i, int(i/4)] = True
-    invthird_diagonal[i, int(i/3)] = True
-
-
 rr_stock = np.zeros((32), dtype=np.float64)
 
-rr_2d = np.zeros((32, 2), dtype=np.float64)
-rr_2d_cr = np.zeros((4, 2), dtype=np.float64)
 
 rx_multiply = np.ones((32), dtype=np.float64)
 ry_multiply = rx_multiply.copy()
 
-crop_stock = np.zeros((32), dtype=int)
-crop_stock_cr = np.zeros((4), dtype=int)
 center_shape = (2, 31)
 
 
@@ -102,6 +80,14 @@ ry_subtract = np.array(np.concatenate(([3, 5, 7],onehalf_ry_subtract,onefourth_r
 
 rx_subtract = np.array(np.concatenate(([3, 4, 6],onehalf_rx_subtract,onefourth_rx_subtract,onethird_rx_subtract)))
 
+# quadrant (b/t: down/up, r/l: right/left) of each walkout ray;
+# rays cast up or left start one pixel off the center row or column.
+walkout_quadrants = ("br br br tl bl tr tl tl " + "br tl bl tr " * 2 + "br tr tl bl br bl tl tr " + "br bl tl tr " * 2).split()
+
+# corneal reflection walkout: down, up, right, left
+cr_walkout_directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+cr_walkout_quadrants = "br tl br tl".split()
+
 
 
 black = [35, 35, 35]
@@ -0,0 +1,106 @@
+import logging
+
+import numpy as np
+
+from eyeloop.constants.engine_constants import *
+
+logger = logging.getLogger(__name__)
+
+
+class Blink_Detector:
+    """
+    Detects blinks as outliers of the mean image intensity.
+    The intensity is sampled on a sparse grid of about blink_samples pixels, of the whole frame or of the
+    eye region (--blink_roi), so each frame costs the same regardless of sensor size.
+    The mean and variance are running averages over the first `calibration` frames, and exponentially weighted
+    averages afterwards, so they follow slow drifts of illumination. Blinks are left out of the variance.
+    A frame is a blink if its intensity deviates from the mean by more than max(threshold, sigma * std).
+    """
+
+    def __init__(self, calibration: int = blink_calibration_frames, threshold: float = blink_threshold,
+                 sigma: float = blink_sigma, samples: int = blink_samples) -> None:
+        self.calibration = calibration
+        self.threshold = threshold
+        self.sigma = sigma
+        self.samples = samples
+
+        self.window = None  # (rows, columns) slices of the sampling grid
+
+        self.n = 0  # frames sampled
+        self.k = 0  # frames sampled without blinks
+        self.mean = 0.
+        self.variance = 0.
+
+        # Engine assigns these to report calibration.
+        self.progress = lambda fraction: None
+        self.calibrated = lambda: None
+
+    def set_region(self, width: int, height: int, center: tuple = None, radius: int = 0) -> None:
+        """
+        Samples the square region of radius around center, or the whole frame (radius = 0).
+        Restarts calibration, unless it has completed or was loaded.
+        """
+
+        if radius > 0 and center is not None:
+            x, y = int(center[0]), int(center[1])
+            x0, x1 = max(x - radius, 0), min(x + radius + 1, width)
+            y0, y1 = max(y - radius, 0), min(y + radius + 1, height)
+        else:
+            x0, x1, y0, y1 = 0, width, 0, height
+
+        stride = max(int(np.sqrt((x1 - x0) * (y1 - y0) / self.samples)), 1)
+        self.window = (slice(y0, y1, stride), slice(x0, x1, stride))
+
+        if self.n < self.calibration:
+            self.n = self.k = 0
+            self.mean = self.variance = 0.
+
+    def sample(self, img: np.ndarray) -> float:
+        if self.window is None:
+            self.set_region(img.shape[1], img.shape[0])
+
+        return float(np.mean(img[self.window]))
+
+    def track(self, img: np.ndarray) -> bool:
+        """
+        Returns True if img is a blink.
+        """
+
+        intensity = self.sample(img)
+
+        self.n += 1
+        self.mean += (intensity - self.mean) / min(self.n, self.calibration)
+
+        deviation = intensity - self.mean
+        blink = abs(deviation) > max(self.threshold, self.sigma * np.sqrt(self.variance))
+
+        if not blink:
+            self.k += 1
+            self.variance += (deviation * deviation - self.variance) / min(self.k, self.calibration)
+
+        if self.n <= self.calibration:
+            if self.n == self.calibration:
+                self.calibrated()
+            elif self.n % 20 == 0:
+                self.progress(self.n / self.calibration)
+
+        return blink
+
+    def save(self, path: str) -> None:
+        np.save(path, {"mean": self.mean, "variance": self.variance})
+
+    def load(self, path: str) -> None:
+        """
+        Loads a calibration saved by save(), or an array of calibration intensities (older versions).
+        """
+
+        calibration = np.load(path, allow_pickle=True)
+
+        if calibration.dtype == object:
+            calibration = calibration.item()
+            self.mean, self.variance = calibration["mean"], calibration["variance"]
+        else:
+            intensities = calibration[np.nonzero(calibration)]
+            self.mean, self.variance = float(np.mean(intensities)), float(np.var(intensities))
+
+        self.n = self.k = self.calibration
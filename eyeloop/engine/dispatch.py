@@ -0,0 +1,285 @@
+"""
+Runs extractors inline, on a dedicated thread or in a subprocess.
+An extractor declares its execution mode with the class attribute
+
+    mode = "inline"  # (default) fetch(engine) on the tracking thread
+    mode = "thread"  # fetch(sample) on a dedicated thread
+    mode = "process" # fetch(sample) in a subprocess; the extractor must be picklable
+
+Off-thread extractors receive a Sample per frame instead of the engine: a deep copy of engine.dataout,
+taken when the engine runs the extractors, and the frame index. Each extractor gets its own copy, so the engine
+and the extractor never see each other's changes to it, nested values included.
+Samples wait in a bounded queue (queue_size attribute, or --extractor_queue). When it is full, the policy
+(policy attribute, or --extractor_policy) decides:
+- block: wait for a free slot (no sample is lost)
+- drop: discard the sample and count it
+"""
+import copy
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+import eyeloop.config as config
+
+logger = logging.getLogger(__name__)
+
+
+class Sample(NamedTuple):
+    dataout: dict
+    frame: int
+
+
+def name(extractor) -> str:
+    return type(extractor).__name__
+
+
+def sample(engine) -> Sample:
+    """Deep copy of engine.dataout, so that an off-thread extractor shares no container with the engine."""
+
+    try:
+        frame = config.importer.frame
+    except AttributeError:
+        frame = -1
+
+    return Sample(copy.deepcopy(engine.dataout), frame)
+
+
+class Extractor_Stats:
+    """
+    Latency of fetch() (ms), delay from the engine to the end of fetch() (ms), and queue depth of an extractor.
+    """
+
+    def __init__(self) -> None:
+        self.fetched = 0
+        self.dropped = 0
+        self.latency = 0
+        self.latency_max = 0
+        self.delay = 0
+        self.delay_max = 0
+        self.depth = 0
+        self.depth_max = 0
+        self.depth_n = 0
+
+    def fetch(self, start: int, end: int, queued: int) -> None:
+        self.fetched += 1
+        self.latency += end - start
+        self.latency_max = max(self.latency_max, end - start)
+        self.delay += end - queued
+        self.delay_max = max(self.delay_max, end - queued)
+
+    def add_fetches(self, stats) -> None:
+        self.fetched += stats.fetched
+        self.latency += stats.latency
+        self.latency_max = max(self.latency_max, stats.latency_max)
+        self.delay += stats.delay
+        self.delay_max = max(self.delay_max, stats.delay_max)
+
+    def sample_depth(self, depth: int) -> None:
+        self.depth += depth
+        self.depth_max = max(self.depth_max, depth)
+        self.depth_n += 1
+
+    def report(self) -> dict:
+        fetched = max(self.fetched, 1)
+        return {
+            "fetched": self.fetched,
+            "dropped": self.dropped,
+            "latency_mean_ms": self.latency / fetched / 1e6,
+            "latency_max_ms": self.latency_max / 1e6,
+            "delay_mean_ms": self.delay / fetched / 1e6,
+            "delay_max_ms": self.delay_max / 1e6,
+            "queue_mean": self.depth / max(self.depth_n, 1),
+            "queue_max": self.depth_max
+        }
+
+
+def call(extractor, method: str, arg=None) -> None:
+    """
+    Calls activate() or release(arg) of the extractor. Errors are logged, so that the runner keeps serving.
+    """
+
+    if not hasattr(extractor, method):
+        logger.warning(f"Extractor {name(extractor)} has no {method}() method")
+        return
+
+    try:
+        if method == "activate":
+            extractor.activate()
+        else:
+            getattr(extractor, method)(arg)
+    except Exception:
+        logger.exception(f"Error in {method}() of extractor {name(extractor)}")
+
+
+def serve(extractor, samples, stats: Extractor_Stats) -> Extractor_Stats:
+    """
+    Calls the extractor with the (method, sample, queued) items of samples, until None.
+    """
+
+    while True:
+        item = samples.get()
+        if item is None:
+            return stats
+
+        method, sample, queued = item
+        if method != "fetch":
+            call(extractor, method, sample)
+            continue
+
+        start = time.perf_counter_ns()
+        try:
+            extractor.fetch(sample)
+        except Exception as e:
+            print("Error in module class: {}".format(name(extractor)))
+            print("Error message: ", e)
+        stats.fetch(start, time.perf_counter_ns(), queued)
+
+
+def serve_process(extractor, samples, results) -> None:
+    stats = Extractor_Stats()
+    try:
+        serve(extractor, samples, stats)
+    finally:
+        results.put(stats)
+
+
+class Inline_Runner:
+    mode = "inline"
+
+    def __init__(self, extractor) -> None:
+        self.extractor = extractor
+        self.stats = Extractor_Stats()
+
+    def activate(self) -> None:
+        call(self.extractor, "activate")
+
+    def fetch(self, engine) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.extractor.fetch(engine)
+        except Exception as e:
+            print("Error in module class: {}".format(name(self.extractor)))
+            print("Error message: ", e)
+        self.stats.fetch(start, time.perf_counter_ns(), start)
+
+    def release(self, engine) -> None:
+        call(self.extractor, "release", engine)
+
+    def report(self) -> dict:
+        return {"mode": self.mode, **self.stats.report()}
+
+
+class Thread_Runner(Inline_Runner):
+    mode = "thread"
+
+    def __init__(self, extractor, queue_size: int, policy: str) -> None:
+        super().__init__(extractor)
+
+        try:
+            self.put = {"block": self.put_block, "drop": self.put_drop}[policy]
+        except KeyError:
+            raise ValueError(f"Unknown extractor policy {policy}; use block or drop")
+
+        self.policy = policy
+        self.start(queue_size)
+
+    def start(self, queue_size: int) -> None:
+        self.samples = queue.Queue(maxsize=queue_size)
+        self.worker = threading.Thread(target=serve, args=(self.extractor, self.samples, self.stats),
+                                       name=f"extractor {name(self.extractor)}", daemon=True)
+        self.worker.start()
+
+    def depth(self) -> int:
+        return self.samples.qsize()
+
+    def put_block(self, item: tuple) -> None:
+        # gives up (counted as dropped) if the worker died, instead of waiting on its full queue forever
+        while True:
+            try:
+                self.samples.put(item, timeout=.1)
+                return
+            except queue.Full:
+                if not self.worker.is_alive():
+                    self.stats.dropped += 1
+                    return
+
+    def put_drop(self, item: tuple) -> None:
+        try:
+            self.samples.put_nowait(item)
+        except queue.Full:
+            self.stats.dropped += 1
+
+    def activate(self) -> None:
+        self.put_block(("activate", None, 0))
+
+    def fetch(self, engine) -> None:
+        self.stats.sample_depth(self.depth())
+        self.put(("fetch", sample(engine), time.perf_counter_ns()))
+
+    def release(self, engine) -> None:
+        if not self.worker.is_alive():
+            return
+
+        self.put_block(("release", sample(engine), 0))
+        self.put_block(None)
+        self.join()
+
+    def join(self) -> None:
+        self.worker.join()
+
+    def report(self) -> dict:
+        return {"mode": self.mode, "policy": self.policy, **self.stats.report()}
+
+
+class Process_Runner(Thread_Runner):
+    mode = "process"
+
+    def start(self, queue_size: int) -> None:
+        context = multiprocessing.get_context("spawn")
+        self.samples = context.Queue(maxsize=queue_size)
+        self.results = context.Queue()
+        self.worker = context.Process(target=serve_process, args=(self.extractor, self.samples, self.results),
+                                      name=f"extractor {name(self.extractor)}", daemon=True)
+        self.worker.start()
+
+    def depth(self) -> int:
+        try:
+            return self.samples.qsize()
+        except NotImplementedError:  # macOS
+            return 0
+
+    def join(self) -> None:
+        # fetch() ran in the subprocess; its latencies come back when it ends
+        while True:
+            try:
+                self.stats.add_fetches(self.results.get(timeout=.1))
+                break
+            except queue.Empty:
+                if not self.worker.is_alive():
+                    logger.warning(f"Extractor {name(self.extractor)} process ended (exit code "
+                                   f"{self.worker.exitcode}) without its fetch statistics")
+                    break
+
+        self.worker.join()
+
+
+def runner(extractor, queue_size: int = 64, policy: str = "drop") -> Inline_Runner:
+    """
+    Wraps the extractor in the runner of its mode. Its queue_size and policy attributes override the defaults.
+    """
+
+    mode = getattr(extractor, "mode", "inline")
+    queue_size = getattr(extractor, "queue_size", queue_size)
+    policy = getattr(extractor, "policy", policy)
+
+    if mode == "inline":
+        return Inline_Runner(extractor)
+    elif mode == "thread":
+        return Thread_Runner(extractor, queue_size, policy)
+    elif mode == "process":
+        return Process_Runner(extractor, queue_size, policy)
+
+    raise ValueError(f"Unknown mode {mode} of extractor {name(extractor)}; use inline, thread or process")
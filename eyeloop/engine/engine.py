@@ -8,7 +8,11 @@ import cv2
 
 import eyeloop.config as config
 from eyeloop.constants.engine_constants import *
+from eyeloop.engine.blink import Blink_Detector
+from eyeloop.engine.dispatch import runner
 from eyeloop.engine.processor import Shape
+from eyeloop.engine.rotation import Rotation
+from eyeloop.engine.timing import Stage_Timer
 from eyeloop.utilities.general_operations import to_int, tuple_int
 
 logger = logging.getLogger(__name__)
@@ -29,21 +33,46 @@ class Engine:
         else:  # Tracking mode. --tracking 1 (default)
             self.iterate = self.track
 
+        #   With --rotation 1, the fits are rotated into the aligned axes (see eyeloop.engine.rotation);
+        #   frames are tracked as captured.
         self.angle = 0
+        self.rotation = None
+        if config.arguments.rotation == 1:
+            self.align = self.align_
+        else:
+            self.align = lambda: None
+
+        #   Durations of the tracking stages; summarized every --timing_interval seconds.
+        self.timer = Stage_Timer(interval=config.arguments.timing_interval)
 
-        self.cr_processor_1 = Shape(type = 2, n = 1)
-        self.cr_processor_2 = Shape(type = 2, n = 2)
-        self.pupil_processor = Shape()
+        self.cr_processor_1 = Shape(type = 2, n = 1, timer = self.timer)
+        self.cr_processor_2 = Shape(type = 2, n = 2, timer = self.timer)
+        self.pupil_processor = Shape(timer = self.timer)
+
+        self.blink_detector = Blink_Detector()
+        self.blink_detector.progress = lambda fraction: print(f"calibrating blink detector {round(fraction * 100, 1)}%")
+        self.blink_detector.calibrated = self.blink_calibrated
+
+        #   With --blink_roi, blinks are sampled around the pupil once it has been selected.
+        if config.arguments.blink_roi > 0:
+            self.place_blink_region = self.place_blink_region_
+        else:
+            self.place_blink_region = lambda: None
 
         #   Via "gui", assign "refresh_pupil" to function "processor.refresh_source"
         #   when the pupil has been selected.
         self.refresh_pupil = lambda x: None
 
     def load_extractors(self, extractors: list = None) -> None:
+        """
+        Wraps each extractor in the runner of its execution mode (see eyeloop.engine.dispatch).
+        """
+
         if extractors is None:
             extractors = []
         logger.info(f"loading extractors: {extractors}")
-        self.extractors = extractors
+        self.extractors = [runner(extractor, config.arguments.extractor_queue, config.arguments.extractor_policy)
+                           for extractor in extractors]
 
 
     def run_extractors(self) -> None:
@@ -53,42 +82,70 @@ class Engine:
         """
 
         for extractor in self.extractors:
-            try:
-                extractor.fetch(self)
-            except Exception as e:
-                print("Error in module class: {}".format(extractor.__name__))
-                print("Error message: ", e)
+            extractor.fetch(self)
 
-    def record(self) -> None:
+    def timestamps(self, capture: Optional[float], received: Optional[float], skipped: Optional[int]) -> dict:
+        """
+        Frame index (of the importer) and timestamps of a frame: time (wall clock, s), capture (s, clock of the source; see the importers)
+        and received (monotonic, s), when the importer got the frame.
+        Live importers also count the frames they skipped for this newer one (skipped).
+        """
+
+        dataout = {"time": time.time()}
+
+        frame = getattr(config.importer, "frame", None)
+        if frame is not None:
+            dataout["frame"] = frame
+
+        if capture is not None:
+            dataout["capture"] = capture
+        dataout["received"] = time.monotonic() if received is None else received
+        if skipped is not None:
+            dataout["skipped"] = skipped
+
+        return dataout
+
+    def record(self, img, capture: float = None, received: float = None, skipped: int = None) -> None:
         """
         Runs Core engine in record mode. Timestamps all frames in data output log.
         Runs gui update_record function with no tracking.
         Argument -s 1
         """
 
-        timestamp = time.time()
+        self.dataout = self.timestamps(capture, received, skipped)
 
-        self.dataout = {
-            "time": timestamp
-        }
-
-        config.graphical_user_interface.update_record(self.source)
+        config.graphical_user_interface.update_record(img)
 
+        self.dataout["completed"] = time.monotonic()
         self.run_extractors()
 
     def arm(self, width, height, image) -> None:
+        """
+        Loads the thresholds (params file, command line or estimated from the image),
+        arms the graphical user interface and runs the first time-step.
+        """
 
         self.width, self.height = width, height
-        config.graphical_user_interface.arm(width, height)
         self.center = (width//2, height//2)
-
-        self.iterate(image)
+        self.rotation = Rotation(self.center, (width, height))
 
         if config.arguments.blinkcalibration != "":
-            config.blink = np.load(config.arguments.blinkcalibration)
-            self.blink_sampled = lambda _:None
+            self.blink_detector.load(config.arguments.blinkcalibration)
             logger.info("(success) blink calibration loaded")
 
+        self.load_parameters(image)
+
+        if config.arguments.pupil_threshold >= 0:
+            self.pupil_processor.binarythreshold = config.arguments.pupil_threshold
+        if config.arguments.cr_threshold >= 0:
+            self.cr_processor_1.binarythreshold = self.cr_processor_2.binarythreshold = config.arguments.cr_threshold
+
+        config.graphical_user_interface.arm(width, height)
+
+        self.iterate(image)
+
+    def load_parameters(self, image) -> None:
+
         if config.arguments.clear == False or config.arguments.params != "":
 
             try:
@@ -137,18 +194,30 @@ class Engine:
         logger.info(f"loaded parameters:\n{param_dict}")
 
 
-    def blink_sampled(self, t:int = 1):
+    def blink_calibrated(self) -> None:
+        logger.info("(success) blink detection calibrated")
+        path = f"{config.file_manager.new_folderpath}/blinkcalibration_{time.time()}.npy"
+        self.blink_detector.save(path)
+        print("blink calibration file saved")
 
-        if t == 1:
-            if config.blink_i% 20 == 0:
-                print(f"calibrating blink detector {round(config.blink_i/config.blink.shape[0]*100,1)}%")
-        else:
-            logger.info("(success) blink detection calibrated")
-            path = f"{config.file_manager.new_folderpath}/blinkcalibration_{self.dataout['time']}.npy"
-            np.save(path, config.blink)
-            print("blink calibration file saved")
+    def place_blink_region_(self) -> None:
+        if self.pupil_processor.active:
+            self.blink_detector.set_region(self.width, self.height, self.pupil_processor.center, config.arguments.blink_roi)
+            self.place_blink_region = lambda: None
 
-    def track(self, img) -> None:
+    def align_(self) -> None:
+        """
+        Rotates the pupil and corneal reflection fits of dataout into the aligned axes (--rotation 1).
+        """
+
+        if self.angle == 0:
+            return
+
+        for entry in ("pupil", "cr_1", "cr_2"):
+            if self.dataout.get(entry) is not None:
+                self.dataout[entry] = self.rotation.fit(self.dataout[entry], self.angle)
+
+    def track(self, img, capture: float = None, received: float = None, skipped: int = None) -> None:
         """
         Executes the tracking algorithm on the pupil and corneal reflections.
         First, blinking is analyzed.
@@ -156,24 +225,19 @@ class Engine:
         Third, corneal reflections are inverted at pupillary overlap.
         Fourth, pupil is detected.
         Finally, data is logged and extractors are run.
+        Each stage is timed (see self.timer). The dataout carries the capture timestamps of the frame
+        and the monotonic time of completion, before the extractors (capture-to-result latency: completed - received).
         """
-        mean_img = np.mean(img)
-        try:
+        start = time.perf_counter_ns()
 
-            config.blink[config.blink_i] = mean_img
-            config.blink_i += 1
-            self.blink_sampled(1)
+        self.place_blink_region()
+        blink = self.blink_detector.track(img)
 
-        except IndexError:
-            self.blink_sampled(0)
-            self.blink_sampled = lambda _:None
-            config.blink_i = 0
+        self.timer.record("blink", time.perf_counter_ns() - start)
 
-        self.dataout = {
-            "time": time.time()
-        }
+        self.dataout = self.timestamps(capture, received, skipped)
 
-        if np.abs(mean_img - np.mean(config.blink[np.nonzero(config.blink)])) > 10:
+        if blink:
 
             self.dataout["blink"] = 1
             self.pupil_processor.fit_model.params = None
@@ -185,7 +249,9 @@ class Engine:
             self.cr_processor_1.track(img)
         #self.cr_processor_2.track(img.copy(), img)
 
+        self.align()
 
+        gui_start = time.perf_counter_ns()
         try:
             config.graphical_user_interface.update(img)
         except Exception as e:
@@ -193,8 +259,18 @@ class Engine:
             self.release()
             return
 
+        extractors_start = time.perf_counter_ns()
+        self.timer.record("gui", extractors_start - gui_start)
+
+        self.dataout["completed"] = time.monotonic()
+
         self.run_extractors()
 
+        end = time.perf_counter_ns()
+        self.timer.record("extractors", end - extractors_start)
+        self.timer.record("track", end - start)
+        self.timer.tick(end)
+
     def activate(self) -> None:
         """
         Activates all extractors.
@@ -202,10 +278,7 @@ class Engine:
         """
 
         for extractor in self.extractors:
-            try:
-                extractor.activate()
-            except AttributeError:
-                logger.warning(f"Extractor {extractor} has no activate() method")
+            extractor.activate()
 
     def release(self) -> None:
         """
@@ -216,10 +289,11 @@ class Engine:
         except:
             pass
 
+        # the centers warm-start parallel tracking (--workers)
         param_dict = {
-        "pupil" : [self.pupil_processor.binarythreshold, self.pupil_processor.blur],
-        "cr1" : [self.cr_processor_1.binarythreshold, self.cr_processor_1.blur],
-        "cr2" : [self.cr_processor_2.binarythreshold, self.cr_processor_2.blur]
+        "pupil" : [self.pupil_processor.binarythreshold, self.pupil_processor.blur, self.pupil_processor.center],
+        "cr1" : [self.cr_processor_1.binarythreshold, self.cr_processor_1.blur, self.cr_processor_1.center],
+        "cr2" : [self.cr_processor_2.binarythreshold, self.cr_processor_2.blur, self.cr_processor_2.center]
         }
 
         path = f"{config.file_manager.new_folderpath}/params_{self.dataout['time']}.npy"
@@ -229,13 +303,14 @@ class Engine:
         self.live = False
         config.graphical_user_interface.release()
 
+        logger.info(f"stage timing:\n{self.timer.summary()}")
+
 
         for extractor in self.extractors:
-            try:
-                extractor.release(self)
-            except AttributeError:
-                logger.warning(f"Extractor {extractor} has no release() method")
-            else:
-                pass
+            extractor.release(self)
+            logger.info(f"extractor {type(extractor.extractor).__name__}: {extractor.report()}")
 
         config.importer.release()
+
+        # saves the frames still buffered by the frame writers
+        config.file_manager.flush()
@@ -70,3 +70,51 @@ class Circle:
         #self.center, self.width, self.height, self.angle = self.params
 
         return self.params[0]
+
+
+def fit_circles(points, mask=None) -> tuple:
+    """
+    Batched hyperfit of many point sets at once, e.g. the walkout points of a whole video.
+    Inputs:
+        - points, numpy array of shape (frames, points, 2)
+        - mask, optional boolean numpy array of shape (frames, points); False drops a point
+    Outputs:
+        - centers (frames, 2), radii (frames,), radii (frames,), angles (frames,) of zeros,
+        in the layout of Circle.params. Frames with fewer than 3 valid points or collinear points are NaN.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    weight = np.ones(points.shape[:2], dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    points = np.where(weight[..., np.newaxis], points, 0)
+    n = weight.sum(axis=1)
+
+    with np.errstate(all='ignore'):
+        mean = points.sum(axis=1) / n[:, np.newaxis]
+        centered = np.where(weight[..., np.newaxis], points - mean[:, np.newaxis], 0)
+        Xi, Yi = centered[..., 0], centered[..., 1]
+        Xi_sq = Xi**2
+        Yi_sq = Yi**2
+        Zi = Xi_sq + Yi_sq
+
+        # compute moments
+
+        Mxy = np.sum(Xi * Yi, axis=1) / n
+        Mxx = np.sum(Xi_sq, axis=1) / n
+        Myy = np.sum(Yi_sq, axis=1) / n
+        Mxz = np.sum(Xi * Zi, axis=1) / n
+        Myz = np.sum(Yi * Zi, axis=1) / n
+
+        Mz = Mxx + Myy
+
+        det = (Mxx * Myy - Mxy**2)*2
+        Xcenter = (Mxz * Myy - Myz * Mxy) / det
+        Ycenter = (Myz * Mxx - Mxz * Mxy) / det
+
+        centers = np.column_stack((Xcenter, Ycenter)) + mean
+        radius = np.sqrt(Xcenter ** 2 + Ycenter ** 2 + Mz)
+
+    valid = (n >= 3) & (det != 0) & np.isfinite(centers).all(axis=1) & np.isfinite(radius)
+    centers[~valid] = np.nan
+    radius[~valid] = np.nan
+    angle = np.where(valid, 0., np.nan)
+
+    return centers, radius, radius.copy(), angle
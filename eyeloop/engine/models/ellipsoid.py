@@ -1,3 +1,5 @@
+from math import acos, atan, copysign, cos, degrees, hypot, pi, sqrt
+
 import numpy as np
 np.seterr('raise')
 
@@ -23,88 +25,129 @@ from eyeloop.utilities.general_operations import tuple_int
         elliptical fitting'
 """
 
+# fits with a semi-axis below this (px) are collapsed onto a pixel or two of the walkout and rejected,
+# as the original fit on uncentered coordinates did
+MIN_AXIS = 1.5
+
 
 class Ellipse:
     def __init__(self, processor):
         self.shape_processor = processor
         self.params = None
 
+        # design matrix |x^2 xy y^2 x y 1> and scatter matrix [eqn. 15-17] from (*)
+        self.design = np.ones((64, 6), dtype=np.float64)
+        self.scatter = np.empty((6, 6), dtype=np.float64)
+
     def fit(self, r):
-        """Least Squares fitting algor6ithm
+        """Least Squares fitting algorithm
         Theory taken from (*)
         Solving equation Sa=lCa. with a = |a b c d f g> and a1 = |a b c>
             a2 = |d f g>
+        The points are centered on their mean for numerical stability,
+        the scatter matrix is formed with a single product into preallocated buffers,
+        and the reduced 3x3 eigenproblem [eqn. 28] is solved in closed form.
         Args
         ----
-        data (list:list:float): list of two lists containing the x and y data of the
-            ellipse. of the form [[x1, x2, ..., xi],[y1, y2, ..., yi]]
+        r (np.ndarray): points of shape (n, 2), n >= 6
         Returns
         ------
-        coef (list): list of the coefficients describing an ellipse
-           [a,b,c,d,f,g] corresponding to ax**2+2bxy+cy**2+2dx+2fy+g
+        center (tuple): (x0, y0); all parameters are stored in self.params as
+            ((x0, y0), width, height, angle)
         """
 
-        x, y = r[:,0], r[:,1]
-        
+        n = r.shape[0]
+        if n > self.design.shape[0]:
+            self.design = np.ones((n, 6), dtype=np.float64)
 
-        # Quadratic part of design matrix [eqn. 15] from (*)
+        design = self.design[:n]
+        x, y = design[:, 3], design[:, 4]
 
-        D1 = np.mat(np.vstack([x ** 2, x * y, y ** 2])).T
-        # Linear part of design matrix [eqn. 16] from (*)
-        D2 = np.mat(np.vstack([x, y, np.ones(len(x))])).T
+        mean_x, mean_y = r.mean(axis=0)
+        np.subtract(r[:, 0], mean_x, out=x)
+        np.subtract(r[:, 1], mean_y, out=y)
+        np.multiply(x, x, out=design[:, 0])
+        np.multiply(x, y, out=design[:, 1])
+        np.multiply(y, y, out=design[:, 2])
 
-        # forming scatter matrix [eqn. 17] from (*)
-        S1 = D1.T * D1
-        S2 = D1.T * D2
-        S3 = D2.T * D2
+        np.dot(design.T, design, out=self.scatter)
+        S = self.scatter.tolist()
 
-        # Constraint matrix [eqn. 18]
-        C1 = np.mat('0. 0. 2.; 0. -1. 0.; 2. 0. 0.')
+        # S1 = quadratic, S2 = mixed, S3 = linear scatter blocks [eqn. 17]
+        (s11, s12, s13, s14, s15, s16), (_, s22, s23, s24, s25, s26), (_, _, s33, s34, s35, s36), \
+            (_, _, _, s44, s45, s46), (_, _, _, _, s55, s56), (_, _, _, _, _, s66) = S
 
-        # Reduced scatter matrix [eqn. 29]
-        M = C1.I * (S1 - S2 * S3.I * S2.T)
+        # S3^(-1) via the adjugate (S3 is symmetric)
+        i44 = s55 * s66 - s56 * s56
+        i45 = s46 * s56 - s45 * s66
+        i46 = s45 * s56 - s46 * s55
+        i55 = s44 * s66 - s46 * s46
+        i56 = s45 * s46 - s44 * s56
+        i66 = s44 * s55 - s45 * s45
+        det = s44 * i44 + s45 * i45 + s46 * i46
 
-        # M*|a b c >=l|a b c >. Find eigenvalues and eigenvectors from this equation [eqn. 28]
-        eval, evec = np.linalg.eig(M)
+        # Q = S3^(-1) * S2^(T); a2 = -Q * a1 [eqn. 24]
+        q = []
+        for s_x, s_y, s_1 in ((s14, s15, s16), (s24, s25, s26), (s34, s35, s36)):
+            q.append(((i44 * s_x + i45 * s_y + i46 * s_1) / det,
+                      (i45 * s_x + i55 * s_y + i56 * s_1) / det,
+                      (i46 * s_x + i56 * s_y + i66 * s_1) / det))
+        (q11, q21, q31), (q12, q22, q32), (q13, q23, q33) = q
 
-        # eigenvector must meet constraint 4ac - b^2 to be valid.
-        cond = 4 * np.multiply(evec[0, :], evec[2, :]) - np.power(evec[1, :], 2)
-        a1 = evec[:, np.nonzero(cond.A > 0)[1]]
-        # self.fitscore=eval[np.nonzero(cond.A > 0)[1]]
+        # reduced scatter matrix T = S1 - S2 * Q [eqn. 29]
+        t11 = s11 - (s14 * q11 + s15 * q21 + s16 * q31)
+        t12 = s12 - (s14 * q12 + s15 * q22 + s16 * q32)
+        t13 = s13 - (s14 * q13 + s15 * q23 + s16 * q33)
+        t22 = s22 - (s24 * q12 + s25 * q22 + s26 * q32)
+        t23 = s23 - (s24 * q13 + s25 * q23 + s26 * q33)
+        t33 = s33 - (s34 * q13 + s35 * q23 + s36 * q33)
+
+        # M = C1^(-1) * T, with C1 = [[0, 0, 2], [0, -1, 0], [2, 0, 0]] [eqn. 18, 29]
+        m11, m12, m13 = t13 / 2, t23 / 2, t33 / 2
+        m21, m22, m23 = -t12, -t22, -t23
+        m31, m32, m33 = t11 / 2, t12 / 2, t13 / 2
 
-        # |d f g> = -S3^(-1)*S2^(T)*|a b c> [eqn. 24]
-        #a2 = -S3.I * S2.T * a1
+        # characteristic polynomial l^3 - trace * l^2 + minors * l - det(M) = 0
+        trace = m11 + m22 + m33
+        minors = m11 * m22 - m12 * m21 + m11 * m33 - m13 * m31 + m22 * m33 - m23 * m32
+        det_m = m11 * (m22 * m33 - m23 * m32) - m12 * (m21 * m33 - m23 * m31) + m13 * (m21 * m32 - m22 * m31)
 
-        # eigenvectors |a b c d f g>
-        self.coef = np.vstack([a1, -S3.I * S2.T * a1])
+        # M has one positive eigenvalue (the ellipse) and two negative ones:
+        # the largest root of the depressed cubic t^3 + pt + q = 0 [trigonometric method]
+        shift = trace / 3
+        p = minors - trace * shift
+        q_ = -2 * shift ** 3 + minors * shift - det_m
+        if p >= 0:
+            raise IndexError("No elliptical solution")
+        scale = sqrt(-p / 3)
+        root = 2 * scale * cos(acos(max(-1., min(1., 1.5 * q_ / (p * scale)))) / 3) + shift
 
+        # M*|a b c >=l|a b c >: the eigenvector is orthogonal to the rows of (M - l*I)
+        rows = ((m11 - root, m12, m13), (m21, m22 - root, m23), (m31, m32, m33 - root))
+        best = 0
+        for (u1, u2, u3), (v1, v2, v3) in ((rows[0], rows[1]), (rows[0], rows[2]), (rows[1], rows[2])):
+            c1, c2, c3 = u2 * v3 - u3 * v2, u3 * v1 - u1 * v3, u1 * v2 - u2 * v1
+            norm = c1 * c1 + c2 * c2 + c3 * c3
+            if norm > best:
+                best, a1 = norm, (c1, c2, c3)
+
+        # eigenvector must meet constraint 4ac - b^2 to be valid.
+        if best == 0 or 4 * a1[0] * a1[2] - a1[1] ** 2 <= 0:
+            raise IndexError("No elliptical solution")
 
         """finds the important parameters of the fitted ellipse
 
         Theory taken form http://mathworld.wolfram
-        Args
-        -----
-        coef (list): list of the coefficients describing an ellipse
-           [a,b,c,d,f,g] corresponding to ax**2+2bxy+cy**2+2dx+2fy+g
-        Returns
-        _______
-        center (List): of the form [x0, y0]
-        width (float): major axis
-        height (float): minor axis
-        phi (float): rotation of major axis form the x-axis in radians
         """
 
         # eigenvectors are the coefficients of an ellipse in general form
         # a*x^2 + 2*b*x*y + c*y^2 + 2*d*x + 2*f*y + g = 0 [eqn. 15) from (**) or (***)
-        a = self.coef[0, 0]
-        b = self.coef[1, 0] / 2.
-        c = self.coef[2, 0]
-        d = self.coef[3, 0] / 2.
-        f = self.coef[4, 0] / 2.
-        g = self.coef[5, 0]
-
-    #    if (a - c) == 0:
-    #        return True
+        a = a1[0]
+        b = a1[1] / 2.
+        c = a1[2]
+        d = -(q11 * a1[0] + q12 * a1[1] + q13 * a1[2]) / 2.
+        f = -(q21 * a1[0] + q22 * a1[1] + q23 * a1[2]) / 2.
+        g = -(q31 * a1[0] + q32 * a1[1] + q33 * a1[2])
 
         # finding center of ellipse [eqn.19 and 20] from (**)
         af = a * f
@@ -114,20 +157,112 @@ class Ellipse:
 
         b_sq = b ** 2.
         z_ = (b_sq - ac)
-        x0 = (cd - b * f) / z_#(b ** 2. - a * c)
-        y0 = (af - bd) / z_#(b ** 2. - a * c)
+        x0 = (cd - b * f) / z_ + mean_x
+        y0 = (af - bd) / z_ + mean_y
 
         # Find the semi-axes lengths [eqn. 21 and 22] from (**)
         ac_subtr = a - c
         numerator = 2 * (af * f + cd * d + g * b_sq - 2 * bd * f - ac * g)
-        denom = ac_subtr * np.sqrt(1 + 4 * b_sq / ac_subtr**2)
-        denominator1, denominator2 = (np.array([-denom, denom], dtype=np.float64) - c - a) * z_
+        denom = copysign(hypot(ac_subtr, 2 * b), ac_subtr)
 
-        width = np.sqrt(numerator / denominator1)
-        height = np.sqrt(numerator / denominator2)
+        width = sqrt(numerator / ((-denom - c - a) * z_))
+        height = sqrt(numerator / ((denom - c - a) * z_))
+        if min(width, height) < MIN_AXIS:
+            raise IndexError("Degenerate ellipse")
 
-        phi = .5 * np.arctan((2. * b) / ac_subtr)
-        self.params = ((x0, y0), width, height, np.rad2deg(phi) % 360)
+        phi = .5 * atan((2. * b) / ac_subtr) if ac_subtr else copysign(pi / 4, b)
+        self.params = ((x0, y0), width, height, degrees(phi) % 360)
 
         #self.center, self.width, self.height, self.angle = self.params
         return self.params[0]
+
+
+def fit_ellipses(points, mask=None) -> tuple:
+    """Batched least squares fit of many point sets at once, e.g. the walkout points of a whole video.
+    Same algorithm as Ellipse.fit, computed with stacked linear algebra.
+    Args
+    ----
+    points (np.ndarray): point sets of shape (frames, points, 2)
+    mask (np.ndarray): optional validity mask of shape (frames, points); False drops a point
+    Returns
+    ------
+    centers (frames, 2), widths (frames,), heights (frames,), angles (frames,)
+        Frames with fewer than 5 valid points, without an elliptical solution or with a semi-axis
+        below MIN_AXIS are NaN.
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+    frames = points.shape[0]
+    weight = np.ones(points.shape[:2], dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    points = np.where(weight[..., np.newaxis], points, 0)
+    count = weight.sum(axis=1)
+
+    with np.errstate(all='ignore'):
+        mean = points.sum(axis=1) / count[:, np.newaxis]
+        centered = np.where(weight[..., np.newaxis], points - mean[:, np.newaxis], 0)
+        x, y = centered[..., 0], centered[..., 1]
+
+        # dropped points are all-zero rows of the design matrix and do not contribute to the scatter matrix
+        design = np.stack((x * x, x * y, y * y, x, y, weight), axis=-1)
+        scatter = np.einsum('fpi,fpj->fij', design, design)
+
+        S1 = scatter[:, :3, :3]
+        S2 = scatter[:, :3, 3:]
+        S3 = scatter[:, 3:, 3:]
+
+        valid = (count >= 5) & np.isfinite(scatter).all(axis=(1, 2))
+        valid &= np.linalg.det(np.where(valid[:, np.newaxis, np.newaxis], S3, np.eye(3))) != 0
+        S3 = np.where(valid[:, np.newaxis, np.newaxis], S3, np.eye(3))
+
+        Q = np.linalg.solve(S3, S2.transpose(0, 2, 1))
+        T = S1 - S2 @ Q
+        M = np.stack((T[:, 2] / 2, -T[:, 1], T[:, 0] / 2), axis=1)
+
+        valid &= np.isfinite(M).all(axis=(1, 2))
+        M[~valid] = np.eye(3)
+
+        eigvec = np.linalg.eig(M)[1].real
+
+        # eigenvector must meet constraint 4ac - b^2 to be valid.
+        cond = 4 * eigvec[:, 0] * eigvec[:, 2] - eigvec[:, 1] ** 2
+        index = np.argmax(cond, axis=1)
+        frame = np.arange(frames)
+        valid &= cond[frame, index] > 0
+
+        a1 = eigvec[frame, :, index]
+        a2 = -np.einsum('fij,fj->fi', Q, a1)
+
+        a = a1[:, 0]
+        b = a1[:, 1] / 2.
+        c = a1[:, 2]
+        d = a2[:, 0] / 2.
+        f = a2[:, 1] / 2.
+        g = a2[:, 2]
+
+        af = a * f
+        cd = c * d
+        bd = b * d
+        ac = a * c
+
+        b_sq = b ** 2.
+        z_ = (b_sq - ac)
+        centers = np.column_stack(((cd - b * f) / z_, (af - bd) / z_)) + mean
+
+        ac_subtr = a - c
+        numerator = 2 * (af * f + cd * d + g * b_sq - 2 * bd * f - ac * g)
+        denom = np.copysign(np.hypot(ac_subtr, 2 * b), ac_subtr)
+
+        width = np.sqrt(numerator / ((-denom - c - a) * z_))
+        height = np.sqrt(numerator / ((denom - c - a) * z_))
+
+        phi = np.where(ac_subtr != 0, .5 * np.arctan((2. * b) / ac_subtr), np.copysign(pi / 4, b))
+        angle = np.rad2deg(phi) % 360
+
+    valid &= np.isfinite(centers).all(axis=1) & np.isfinite(width) & np.isfinite(height)
+    valid &= np.fmin(width, height) >= MIN_AXIS
+    centers[~valid] = np.nan
+    width[~valid] = np.nan
+    height[~valid] = np.nan
+    angle[~valid] = np.nan
+
+    return centers, width, height, angle
@@ -0,0 +1,251 @@
+"""
+Parallel offline tracking (--workers).
+The video or image sequence is split into frame ranges (chunks), which are tracked in worker processes.
+Every chunk is tracked headless (eyeloop.guis.headless), warm-started from the thresholds and pupil/cr seeds
+of a params file (--params) or the command line (--pupil_seed, --cr_seed, ...),
+and its datalog is merged back into one datalog in frame order.
+Thresholds not in a params file are estimated once, from the first frame of the video, and shared by all chunks.
+"""
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import eyeloop.config as config
+from eyeloop.constants.engine_constants import preroll
+from eyeloop.engine.engine import Engine
+from eyeloop.guis.headless import GUI, PROCESSORS, argument_seeds
+from eyeloop.utilities.datalog import Binary_Datalog
+from eyeloop.utilities.frame_stack import Frame_Stack, is_stack
+
+logger = logging.getLogger(__name__)
+
+
+def count_frames(path: Path) -> int:
+    """
+    Number of frames of a video file, a frame stack, or of an image sequence (--img_format) counted from frame 0.
+    """
+
+    if is_stack(path):
+        return len(Frame_Stack(path))
+
+    if path.is_dir():
+        config.file_manager.input_folderpath = path
+        return len(config.file_manager.sequence_paths())
+
+    capture = cv2.VideoCapture(str(path))
+    frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return frames
+
+
+def chunk_ranges(frames: int, chunk_size: int) -> list:
+    """
+    Splits frames 0..frames into consecutive (start, stop) ranges.
+    The last range is open-ended (stop = None), since frame counts of compressed videos are estimates.
+    """
+
+    starts = range(0, max(frames, 1), chunk_size)
+    return [(start, start + chunk_size) for start in starts[:-1]] + [(starts[-1], None)]
+
+
+def read_frames(path: Path, start: int, stop: int = None):
+    """
+    Yields (position, grayscale image) of frames start..stop of a video file, frame stack or image sequence.
+    The position is the frame index of an image sequence or frame stack, or the presentation time (ms) of a video frame.
+    Seeking in compressed videos may land a few frames off, so frame indices are not trusted there.
+    """
+
+    frames = itertools.count(start) if stop is None else range(start, stop)
+    scale = config.arguments.scale
+
+    if is_stack(path):
+        stack = Frame_Stack(path)
+
+        def read(frame):
+            if frame >= len(stack):
+                raise ValueError("No more frames.")
+            return frame, np.array(stack[frame])
+
+        close = stack.close
+    elif path.is_dir():
+        config.file_manager.input_folderpath = path
+        sequence = config.file_manager.open_sequence(config.arguments.prefetch, config.arguments.read_workers)
+        read = lambda frame: (frame, sequence.read(frame))
+        close = sequence.close
+    else:
+        capture = cv2.VideoCapture(str(path))
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+        def read(_):
+            _, image = capture.read()
+            if image is None:
+                raise ValueError("No more frames.")
+            return capture.get(cv2.CAP_PROP_POS_MSEC), cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        close = capture.release
+
+    try:
+        for frame in frames:
+            try:
+                position, image = read(frame)
+            except ValueError:
+                break
+
+            if scale != 1:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+            yield position, image
+    finally:
+        close()
+
+
+def shared_thresholds(video: Path) -> dict:
+    """
+    Thresholds and blurs of every processor as Engine.load_parameters finds them for the first frame of the video:
+    loaded from the params file, or else estimated from the frame, e.g. {"pupil": (threshold, blur), ...}.
+    """
+
+    frames = read_frames(video, 0, 1)
+    try:
+        _, image = next(frames)
+    except StopIteration:
+        raise ValueError(f"No frames to track in {video}")
+    finally:
+        frames.close()
+
+    engine = Engine(None)
+    engine.load_parameters(image)
+
+    return {key: (getattr(engine, processor).binarythreshold, getattr(engine, processor).blur)
+            for key, processor in PROCESSORS.items()}
+
+
+def load_thresholds(engine: Engine, thresholds: dict) -> None:
+    for key, (threshold, blur) in thresholds.items():
+        processor = getattr(engine, PROCESSORS[key])
+        processor.binarythreshold, processor.blur = threshold, blur
+
+
+def track_chunk(chunk: tuple) -> Path:
+    """
+    Tracks one chunk in a worker process and writes its datalog.
+    The chunk is read with a margin (preroll) on both sides, which overlaps the neighbouring chunks;
+    every entry carries its position, by which the overlap is resolved when the chunks are merged.
+    Returns the chunk datalog path.
+    """
+
+    arguments, file_manager, seeds, thresholds, start, stop, datalog_path = chunk
+
+    config.arguments = arguments
+    config.file_manager = file_manager
+    config.graphical_user_interface = GUI(seeds)
+    config.engine = engine = Engine(None)
+
+    # the thresholds of the whole video (shared_thresholds), not estimated from the first frame of the chunk
+    engine.load_parameters = lambda image: load_thresholds(engine, thresholds)
+
+    frames = read_frames(arguments.video, max(start - preroll, 0), None if stop is None else stop + preroll)
+
+    with open(datalog_path, "w") as datalog:
+        try:
+            position, image = next(frames)
+        except StopIteration:
+            return datalog_path
+
+        height, width = image.shape
+        engine.arm(width, height, image)
+
+        # blink calibration fills silently from the first frames of the chunk
+        engine.blink_detector.progress = lambda fraction: None
+        engine.blink_detector.calibrated = lambda: None
+
+        # the position of a video frame is its capture (presentation) time in ms
+        frame_indexed = arguments.video.is_dir() or is_stack(arguments.video)
+        capture = (lambda position: None) if frame_indexed else (lambda position: position / 1000)
+
+        for position, image in itertools.chain([(position, image)], frames):
+            engine.iterate(image, capture(position))
+
+            engine.dataout["position"] = position
+            datalog.write(json.dumps(engine.dataout) + "\n")
+
+    return datalog_path
+
+
+def track_parallel(workers: int) -> None:
+    """
+    Tracks the video (--video) in chunks on a pool of worker processes
+    and merges the chunk datalogs into one datalog (--datalog) in frame order.
+    """
+
+    video = config.arguments.video
+    if not (video.is_file() or video.is_dir()):
+        raise ValueError(f"Parallel tracking needs a video file or image sequence, got {video}")
+
+    seeds = argument_seeds()
+    if not seeds:
+        raise ValueError("Parallel tracking needs pupil/cr seeds to warm-start each chunk; pass a params file "
+                         "with centers (--params), saved by tracking a session first, or --pupil_seed x,y")
+
+    thresholds = shared_thresholds(video)
+
+    frames = count_frames(video)
+    chunk_size = config.arguments.chunk_size
+    if chunk_size <= 0:
+        chunk_size = max(math.ceil(frames / (workers * 4)), 1)
+
+    chunk_dir = Path(config.file_manager.new_folderpath, "chunks")
+    chunk_dir.mkdir(exist_ok=True)
+
+    chunks = [(config.arguments, config.file_manager, seeds, thresholds, start, stop,
+               Path(chunk_dir, f"datalog_{start}.json"))
+              for start, stop in chunk_ranges(frames, chunk_size)]
+
+    logger.info(f"tracking {frames} frames in {len(chunks)} chunks on {workers} workers; seeds {seeds}, "
+                f"thresholds {thresholds}")
+    print(f"Tracking {video} in {len(chunks)} chunks on {workers} workers..")
+
+    # spawn, so workers do not inherit windows or capture devices of the main process
+    context = multiprocessing.get_context("spawn")
+
+    if config.arguments.datalog == "binary":
+        datalog_path = Path(config.file_manager.new_folderpath, "datalog.bin")
+        datalog = Binary_Datalog(datalog_path)
+        write = datalog.append
+    else:
+        datalog_path = Path(config.file_manager.new_folderpath, "datalog.json")
+        datalog = open(datalog_path, "w")
+        write = lambda entry: datalog.write(json.dumps(entry) + "\n")
+
+    # entries of a chunk up to the last position merged so far belong to the previous chunk, which has settled there
+    frame = 0
+    last_position = -math.inf
+    with context.Pool(workers) as pool:
+        for i, chunk_path in enumerate(pool.imap(track_chunk, chunks), 1):
+            overlap = True
+            with open(chunk_path, "r") as chunk:
+                for line in chunk:
+                    entry = json.loads(line)
+                    position = entry.pop("position")
+
+                    if overlap and position <= last_position:
+                        continue
+                    overlap = False
+                    last_position = position
+
+                    entry["frame"] = frame
+                    write(entry)
+                    frame += 1
+
+            chunk_path.unlink()
+            print(f"chunk {i}/{len(chunks)} merged ({frame} frames)")
+
+    datalog.close()
+    chunk_dir.rmdir()
+    print(f"Parallel tracking finished; {frame} frames logged to {datalog_path}")
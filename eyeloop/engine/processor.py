@@ -4,6 +4,8 @@ import eyeloop.config as config
 from eyeloop.constants.processor_constants import *
 from eyeloop.engine.models.circular import Circle
 from eyeloop.engine.models.ellipsoid import Ellipse
+from eyeloop.engine.rays import ray_fan
+from eyeloop.engine.timing import Stage_Timer
 from eyeloop.utilities.general_operations import to_int, tuple_int
 import time
 import logging
@@ -17,7 +19,7 @@ class Center_class():
         return self.params
 
 class Shape():
-    def __init__(self, type = 1, n = 0):
+    def __init__(self, type = 1, n = 0, timer = None):
 
         self.active = False
         self.center = -1
@@ -33,6 +35,10 @@ class Shape():
         self.type_entry = None
         self.track = lambda x:None
 
+        # Tracking window; origin is its top-left corner in frame coordinates.
+        self.origin = np.zeros(2, dtype=int)
+        self.window = lambda source: source
+
 
 
         if type == 1:
@@ -53,10 +59,12 @@ class Shape():
             self.center_adj = self.center_adj_
 
             self.walkout = self.pupil_walkout
+            self.rays = ray_fan(config.arguments.pupil_rays)
 
             self.track = self.track_
         else:
             self.walkout = self.cr_walkout
+            self.rays = ray_fan(config.arguments.cr_rays)
             self.type_entry = f"cr_{n}"
             self.center_adj = lambda:None
             self.cond = lambda r,_:r
@@ -71,7 +79,12 @@ class Shape():
 
             self.thresh = self.cr_thresh
 
-        self.threshold = len(crop_stock) * self.min_radius *1.05
+        # Stage durations are recorded by the engine's timer.
+        self.timer = Stage_Timer() if timer is None else timer
+        self.thresh_stage, self.walkout_stage, self.fit_stage = (f"{self.type_entry}_{stage}" for stage in ("thresh", "walkout", "fit"))
+
+        self.extent = self.max_radius
+        self.threshold = self.rays.n * self.min_radius *1.05
 
     def pupil_thresh(self):
         # Pupil
@@ -88,7 +101,7 @@ class Shape():
     def reset(self, center):
 
         self.active = True
-        self.margin = 0
+        self.margin = config.arguments.roi_margin
         self.walkout_offset = 0
         self.center = center
         self.fit_ = self.fit
@@ -97,19 +110,50 @@ class Shape():
         self.standard_corners = [(0, 0), (config.engine.width, config.engine.height)]
 
         self.corners = self.standard_corners.copy()
+        self.extent = self.max_radius
+
+        if config.arguments.roi == 1:
+            self.window = self.roi_window
 
         #self.tracker = cv2.TrackerMedianFlow_create()
 
+    def roi_window(self, source):
+        """
+        Crops the frame to a square window around the last fit.
+        The window is sized from the extent of the last fit plus the margin (--roi_margin).
+        """
+
+        try:
+            x, y = tuple_int(self.center)
+            radius = to_int(min(self.extent * roi_expand, self.max_radius)) + self.margin
+        except (TypeError, ValueError):
+            self.origin[:] = 0
+            return source
+
+        x0, y0 = max(x - radius, 0), max(y - radius, 0)
+        x1, y1 = min(x + radius + 1, config.engine.width), min(y + radius + 1, config.engine.height)
+
+        if x1 <= x0 or y1 <= y0:
+            self.origin[:] = 0
+            return source
+
+        self.corners = [(x0, y0), (x1, y1)]
+        self.origin[:] = x0, y0
+
+        return source[y0:y1, x0:x1]
+
     def track_(self, source):
         self.raw = source
-        self.source = source.copy()
+        self.source = self.window(source).copy()
 
         #self.img = img
 
 
         # Performs a simple binarization and applies a smoothing gaussian kernel.
 
+        start = time.perf_counter_ns()
         self.thresh() #either pupil or cr
+        self.timer.record(self.thresh_stage, time.perf_counter_ns() - start)
 
         self.fit_() #gets fit model
 
@@ -131,9 +175,6 @@ class Shape():
 
                 score = self.distance(circle[:2], self.center) + np.mean(self.raw[int(circle[1])-self.min_radius:int(circle[1])+self.min_radius, int(circle[0]-self.min_radius):int(circle[0]+self.min_radius)])
 
-                self.raw[int(circle[1]), int(circle[0])] = 100
-                cv2.imshow("kk", self.raw)
-                cv2.waitKey(0)
                 if smallest == -1:
                     smallest = score
                     current = circle[:2]
@@ -157,11 +198,17 @@ class Shape():
     def fit(self):
         try:
 
+            start = time.perf_counter_ns()
             r = self.walkout()
 
-
+            walked = time.perf_counter_ns()
             self.center = self.fit_model.fit(r)
 
+            self.timer.record(self.walkout_stage, walked - start)
+            self.timer.record(self.fit_stage, time.perf_counter_ns() - walked)
+
+            self.extent = max(np.max(np.abs(r - self.center)), self.extent * roi_decay)
+
             params = self.fit_model.params
 
             #self.artefact(params)
@@ -170,10 +217,12 @@ class Shape():
         except IndexError:
 
             logger.info(f"fit index error")
+            self.extent = self.max_radius
             self.center_adj()
         except Exception as e:
 
             logger.info(f"fit-func error: {e}")
+            self.extent = self.max_radius
             self.center_adj()
 
 
@@ -199,195 +248,53 @@ class Shape():
     def clip_(self, crop_list):
         np.clip(crop_list, self.min_radius, self.max_radius, out = crop_list)
 
-    def pupil_walkout(self):
+    def canvas(self):
+        """
+        Copy of the binarized source with a black border, which stops the rays before they leave the image.
+        The source itself is left unchanged.
+        """
 
+        canvas = self.source.copy()
+        canvas[-1,:] = canvas[:,-1] = canvas[0,:] = canvas[:,0] = 0
+        return canvas
 
-        #diag_matrix = main_diagonal[:canvas_.shape[0], :canvas_.shape[1]]
+    def pupil_walkout(self):
 
         try:
 
-            center = np.round(self.center).astype(int)
+            center = np.round(self.center).astype(int) - self.origin
         except:
 
             return
 
+        canvas = self.canvas()
 
-        canvas = np.array(self.source, dtype=int)#.copy()
-        canvas[-1,:] = canvas[:,-1] = canvas[0,:] = canvas[:,0] = 0
-
-
-        r = rr_2d.copy()
-
-        crop_list = crop_stock.copy()
-
-
-        canvas_ = canvas[center[1]:, center[0]:]
-        canv_shape0, canv_shape1 = canvas_.shape
-        crop_canvas = np.flip(canvas[:center[1], :center[0]])
-        crop_canv_shape0, crop_canv_shape1 = crop_canvas.shape
-
-        crop_canvas2 = np.fliplr(canvas[center[1]:, :center[0]])
-        crop_canv2_shape0, crop_canv2_shape1 = crop_canvas2.shape
-
-        crop_canvas3 = np.flipud(canvas[:center[1], center[0]:])###
-        crop_canv3_shape0, crop_canv3_shape1 = crop_canvas3.shape
-
-        canvas2 = np.flip(canvas) # flip once
-
-
-        crop_list=np.array([
-        np.argmax(canvas_[:, 0][self.min_radius:self.max_radius] == 0), np.argmax(canvas_[0, :][self.min_radius:self.max_radius] == 0), np.argmax(canvas_[main_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas[main_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas2[main_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas3[main_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(canvas2[-center[1], -center[0]:][self.min_radius:self.max_radius] == 0), np.argmax(canvas2[-center[1]:, -center[0]][self.min_radius:self.max_radius] == 0),
-        np.argmax(canvas_[ half_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas[half_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas2[half_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas3[half_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(canvas_[invhalf_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas[invhalf_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas2[invhalf_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas3[invhalf_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(canvas_[fourth_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas3[fourth_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas[fourth_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas2[fourth_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(canvas_[invfourth_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas2[invfourth_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas[invfourth_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas3[invfourth_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(canvas_[third_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas2[third_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas[third_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas3[third_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(canvas_[invthird_diagonal[:canv_shape0, :canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas2[invthird_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][self.min_radius:self.max_radius] == 0),
-        np.argmax(crop_canvas[invthird_diagonal[:crop_canv_shape0, :crop_canv_shape1]][self.min_radius:self.max_radius] == 0), np.argmax(crop_canvas3[invthird_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][self.min_radius:self.max_radius] == 0)
-        ], dtype=int) + self.min_radius
-
-
+        crop_list = self.rays.cast(canvas, center, self.min_radius, self.max_radius)
 
         if np.sum(crop_list) < self.threshold:
             #origin inside corneal reflection?
-            offset_list = np.array([
-            np.argmax(canvas_[:, 0][1:] == 255), np.argmax(canvas_[0, :][1:] == 255), np.argmax(canvas_[main_diagonal[:canv_shape0, :canv_shape1]][1:] == 255),
-            np.argmax(crop_canvas[main_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255), np.argmax(crop_canvas2[main_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255),
-            np.argmax(crop_canvas3[main_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255), np.argmax(canvas2[-center[1], -center[0]:][1:] == 255), np.argmax(canvas2[-center[1]:, -center[0]][1:] == 255),
-            np.argmax(canvas_[ half_diagonal[:canv_shape0, :canv_shape1]][1:] == 255), np.argmax(crop_canvas[half_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255), np.argmax(crop_canvas2[half_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255),
-            np.argmax(crop_canvas3[half_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255), np.argmax(canvas_[invhalf_diagonal[:canv_shape0, :canv_shape1]][1:] == 255),
-            np.argmax(crop_canvas[invhalf_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255), np.argmax(crop_canvas2[invhalf_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255),
-            np.argmax(crop_canvas3[invhalf_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255), np.argmax(canvas_[fourth_diagonal[:canv_shape0, :canv_shape1]][1:] == 255), np.argmax(crop_canvas3[fourth_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255),
-            np.argmax(crop_canvas[fourth_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255), np.argmax(crop_canvas2[fourth_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255), np.argmax(canvas_[invfourth_diagonal[:canv_shape0, :canv_shape1]][1:] == 255),
-            np.argmax(crop_canvas2[invfourth_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255), np.argmax(crop_canvas[invfourth_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255), np.argmax(crop_canvas3[invfourth_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255),
-            np.argmax(canvas_[third_diagonal[:canv_shape0, :canv_shape1]][1:] == 255), np.argmax(crop_canvas2[third_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255), np.argmax(crop_canvas[third_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255),
-            np.argmax(crop_canvas3[third_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255), np.argmax(canvas_[invthird_diagonal[:canv_shape0, :canv_shape1]][1:] == 255), np.argmax(crop_canvas2[invthird_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][1:] == 255),
-            np.argmax(crop_canvas[invthird_diagonal[:crop_canv_shape0, :crop_canv_shape1]][1:] == 255), np.argmax(crop_canvas3[invthird_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][1:] == 255)
-            ], dtype=int) + 1
-
-
-            crop_list=np.array([
-            np.argmax(canvas_[:, 0][offset_list[0]:] == 0), np.argmax(canvas_[0, :][offset_list[1]:] == 0), np.argmax(canvas_[main_diagonal[:canv_shape0, :canv_shape1]][offset_list[2]:] == 0),
-            np.argmax(crop_canvas[main_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[3]:] == 0), np.argmax(crop_canvas2[main_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[4]:] == 0),
-            np.argmax(crop_canvas3[main_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[5]:] == 0), np.argmax(canvas2[-center[1], -center[0]:][offset_list[6]:] == 0), np.argmax(canvas2[-center[1]:, -center[0]][offset_list[7]:] == 0),
-            np.argmax(canvas_[ half_diagonal[:canv_shape0, :canv_shape1]][offset_list[8]:] == 0), np.argmax(crop_canvas[half_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[9]:] == 0), np.argmax(crop_canvas2[half_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[10]:] == 0),
-            np.argmax(crop_canvas3[half_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[11]:] == 0), np.argmax(canvas_[invhalf_diagonal[:canv_shape0, :canv_shape1]][offset_list[12]:] == 0),
-            np.argmax(crop_canvas[invhalf_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[13]:] == 0), np.argmax(crop_canvas2[invhalf_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[14]:] == 0),
-            np.argmax(crop_canvas3[invhalf_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[15]:] == 0), np.argmax(canvas_[fourth_diagonal[:canv_shape0, :canv_shape1]][offset_list[16]:] == 0), np.argmax(crop_canvas3[fourth_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[17]:] == 0),
-            np.argmax(crop_canvas[fourth_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[18]:] == 0), np.argmax(crop_canvas2[fourth_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[19]:] == 0), np.argmax(canvas_[invfourth_diagonal[:canv_shape0, :canv_shape1]][offset_list[20]:] == 0),
-            np.argmax(crop_canvas2[invfourth_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[21]:] == 0), np.argmax(crop_canvas[invfourth_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[22]:] == 0), np.argmax(crop_canvas3[invfourth_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[23]:] == 0),
-            np.argmax(canvas_[third_diagonal[:canv_shape0, :canv_shape1]][offset_list[24]:] == 0), np.argmax(crop_canvas2[third_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[25]:] == 0), np.argmax(crop_canvas[third_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[26]:] == 0),
-            np.argmax(crop_canvas3[third_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[27]:] == 0), np.argmax(canvas_[invthird_diagonal[:canv_shape0, :canv_shape1]][offset_list[28]:] == 0), np.argmax(crop_canvas2[invthird_diagonal[:crop_canv2_shape0, :crop_canv2_shape1]][offset_list[29]:] == 0),
-            np.argmax(crop_canvas[invthird_diagonal[:crop_canv_shape0, :crop_canv_shape1]][offset_list[30]:] == 0), np.argmax(crop_canvas3[invthird_diagonal[:crop_canv3_shape0, :crop_canv3_shape1]][offset_list[31]:] == 0)
-            ], dtype=int) + offset_list
-
+            crop_list = self.rays.recast(canvas, center)
 
             if np.sum(crop_list) < self.threshold:
                 raise IndexError("Lost track, do reset")
 
-        #simple:
-
-        r[:8,:] = center
-        r[ry_add, 1] += crop_list[ry_add]
-        r[rx_add, 0] += crop_list[rx_add]
-        r[ry_subtract, 1] -= crop_list[ry_subtract] #
-        r[rx_subtract, 0] -= crop_list[rx_subtract]
-        r[rx_multiplied, 0] *= rx_multiply
-        r[ry_multiplied, 1] *= ry_multiply
-        r[8:,:] += center
-
-
-            #return
-        # try:
-        #    canvas_rgb = cv2.cvtColor(self.source, cv2.COLOR_GRAY2RGB)
-        #    cy, cx = np.mean(ry, dtype=int), np.mean(rx, dtype=int)
-        #    canvas_rgb[cy,cx] = [0,0,255]
-        #    canvas_rgb[ry.astype("int"), rx.astype("int")] = [0,0,255]
-        #    canvas_rgb[center[1], center[0]] = [255,0,0]
-        #    rx1,ry1 = self.cond(rx, ry, crop_list)
-        #    canvas_rgb[ry1.astype("int"), rx1.astype("int")] = [0,255,0]
-        #    cv2.imshow("JJJ", canvas_rgb)
-        #    cv2.waitKey(5)
-        # except Exception as e:
-        #    print(e)
-
-        return self.cond(r, crop_list)#rx[cond_], ry[cond_]#rx, ry
+        r = center + crop_list[:, np.newaxis] * self.rays.directions
+        r += self.origin
 
-    def cr_walkout(self):
+        return self.cond(r, crop_list)
 
-
-        #diag_matrix = main_diagonal[:canvas_.shape[0], :canvas_.shape[1]]
+    def cr_walkout(self):
 
         try:
-            center = np.round(self.center).astype(int)
+            center = np.round(self.center).astype(int) - self.origin
         except:
             return
 
-        #canvas = np.array(self.source, dtype=int)#.copy()
-
-        r = rr_2d_cr.copy()
-
-
-        crop_list = crop_stock_cr.copy()
-        #rx = np.zeros(4)
-        #ry = np.zeros(4)
-
-        canvas_ = self.source[center[1]:, center[0]:]
-
-        crop_list[0] = np.argmax(canvas_[:, 0] == 0) #- 1
-        #crop_ = np.argmax(canvas_[:, 0] == 0) #- 1
-
-        #ry[0], rx[0] = crop_ + center[1], center[0]
-
-
-        crop_list[2] = np.argmax(canvas_[0, :] == 0) #- 1
-        #crop_ = np.argmax(canvas_[0, :] == 0) #- 1
+        canvas = self.canvas()
 
-    #    ry[2], rx[2] = center[1], crop_ + center[0]
+        crop_list = self.rays.cast(canvas, center, 0, max(canvas.shape))
 
+        r = center + crop_list[:, np.newaxis] * self.rays.directions
+        r += self.origin
 
-        canvas = np.flip(self.source) # flip once
-
-        crop_list[3] = -np.argmax(canvas[-center[1], -center[0]:] == 0)
-        #crop_ = np.argmax(canvas[-center[1], -center[0]:] == 0)# - 1
-
-        #ry[3], rx[3] = center[1], -crop_ + center[0]
-
-
-        crop_list[1]= -np.argmax(canvas[-center[1]:, -center[0]] == 0)
-    #    crop_ = np.argmax(canvas[-center[1]:, -center[0]] == 0)
-
-        #ry[1], rx[1] = -crop_ + center[1], center[0]
-        #print()
-
-        #print(r, crop_list)
-        r[:,:] = center
-
-        r[:2, 1] += crop_list[:2]
-        r[2:, 0] += crop_list[2:]
-
-
-
-        #print(r, rx, ry)
-
-        # try:
-        #
-        #    canvas_rgb = cv2.cvtColor(self.source, cv2.COLOR_GRAY2RGB)
-        #
-        #   # canvas_rgb[cy,cx] = [0,0,255]
-        #    #canvas_rgb[ry.astype("int"), rx.astype("int")] = [0,255,0]
-        #    canvas_rgb[r[:,1].astype("int"), r[:,0].astype("int")] = [0,0,255]
-        #    #canvas_rgb[center[1], center[0]] = [255,0,0]
-        #    #rx1,ry1 = self.cond(rx, ry, crop_list)
-        #   # canvas_rgb[ry1.astype("int"), rx1.astype("int")] = [0,255,0]
-        #    cv2.imshow("JJJ", canvas_rgb)
-        #    cv2.waitKey(5)
-        # except Exception as e:
-        #    print(e)
-
-
-        return r#rx[cond_], ry[cond_]#rx, ry
+        return r
@@ -0,0 +1,174 @@
+import numpy as np
+
+from eyeloop.constants.processor_constants import *
+
+
+class Rays:
+    """
+    Table-driven ray casting for the walkout.
+    A ray is defined by its contour direction (x, y), scaled so that the larger component is 1,
+    and the quadrant it is cast in. Sample k of a ray lies at pixel steps
+    (floor(k * |y|), floor(k * |x|)) from the center, mirrored into its quadrant.
+    Rays cast up or left are shifted one pixel further (shift = 1), as the flipped crops of
+    the original walkout were; evenly spread fans (see ray_fan) are symmetric (shift = 0).
+    Step tables are built lazily and cached per length, so any frame size is supported,
+    and all rays are sampled with a single fancy-index on the binarized image.
+    Offset tables are cached for the last few image widths only, as the window of --roi 1 resizes every frame.
+    """
+
+    offsets_cache = 8  # image widths with a cached offset table
+
+    def __init__(self, directions: np.ndarray, quadrants: list, shift: int = 1) -> None:
+        self.directions = directions  # (rays, 2) contour point per unit of walkout distance
+        self.n = len(directions)
+        self.shift = shift
+
+        self.down = np.array([quadrant[0] == "b" for quadrant in quadrants])[:, np.newaxis]
+        self.right = np.array([quadrant[1] == "r" for quadrant in quadrants])[:, np.newaxis]
+
+        self.steps_ = {}
+        self.offsets_ = {}
+
+    def steps(self, length: int) -> tuple:
+        """
+        Pixel steps (dy, dx) of samples 0..length of every ray, each of shape (rays, length).
+        Tables are built for the next power of two to keep the cache small.
+        """
+
+        size = table_size(length)
+        try:
+            dy, dx = self.steps_[size]
+        except KeyError:
+            k = np.arange(size, dtype=np.float64)
+
+            fy = np.floor(np.abs(self.directions[:, 1:]) * k + 1e-9).astype(np.int32)
+            fx = np.floor(np.abs(self.directions[:, :1]) * k + 1e-9).astype(np.int32)
+
+            dy = np.where(self.down, fy, -self.shift - fy)
+            dx = np.where(self.right, fx, -self.shift - fx)
+
+            self.steps_[size] = dy, dx
+
+        return dy[:, :length], dx[:, :length]
+
+    def offsets(self, width: int, start: int, stop: int) -> np.ndarray:
+        """
+        Flat pixel offsets of samples start..stop of every ray.
+        Tables span the step table of stop and are cached per image width; the oldest width is evicted
+        beyond offsets_cache widths.
+        """
+
+        offsets = self.offsets_.get(width)
+        if offsets is None or offsets.shape[1] < stop:
+            dy, dx = self.steps(table_size(stop))
+            offsets = dy * width + dx
+
+            self.offsets_.pop(width, None)
+            if len(self.offsets_) >= self.offsets_cache:
+                del self.offsets_[next(iter(self.offsets_))]
+            self.offsets_[width] = offsets
+
+        return offsets[:, start:stop]
+
+    def cast(self, canvas: np.ndarray, center: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the distance from the center to the first black pixel of every ray,
+        searching samples start..stop. Rays without a black pixel return start.
+        The canvas border must be black, which stops rays before they leave the image.
+        """
+
+        height, width = canvas.shape
+        cx, cy = center
+
+        if min(cx, cy, width - 1 - cx, height - 1 - cy) < start:
+            raise IndexError("Walkout center too close to the border")
+
+        index = self.offsets(width, start, stop) + (cy * width + cx)
+        np.clip(index, 0, canvas.size - 1, out=index)
+
+        samples = canvas.ravel()[index]
+
+        return np.argmax(samples == 0, axis=1) + start
+
+    def recast(self, canvas: np.ndarray, center: np.ndarray) -> np.ndarray:
+        """
+        Walks every ray to the border: skips to the first white pixel (if any),
+        then returns the distance to the next black pixel.
+        Used when the center is inside a dark artefact, such as a corneal reflection.
+        """
+
+        height, width = canvas.shape
+        cx, cy = center
+
+        length = max(height, width)
+        dy, dx = self.steps(length)
+
+        y = dy + cy
+        x = dx + cx
+        inside = (y >= 0) & (y < height) & (x >= 0) & (x < width)
+
+        samples = np.where(inside, canvas[np.clip(y, 0, height - 1), np.clip(x, 0, width - 1)], 0)
+
+        offset_list = np.argmax(samples[:, 1:] == 255, axis=1) + 1
+
+        black = (samples == 0) & (np.arange(length) >= offset_list[:, np.newaxis])
+
+        return np.where(black.any(axis=1), np.argmax(black, axis=1), offset_list)
+
+
+def table_size(length: int) -> int:
+    """
+    Length of the cached tables for rays of the given length: the next power of two.
+    """
+
+    return 1 << max(int(length) - 1, 1).bit_length()
+
+
+def walkout_rays() -> Rays:
+    """
+    The 32 rays of the pupil walkout: horizontal, vertical and diagonal rays,
+    and rays of slope 1/2, 1/4 and 1/3 (and inverses) in all four quadrants.
+    """
+
+    directions = np.zeros((len(walkout_quadrants), 2), dtype=np.float64)
+    directions[rx_add, 0] = 1
+    directions[ry_add, 1] = 1
+    directions[rx_subtract, 0] = -1
+    directions[ry_subtract, 1] = -1
+    directions[rx_multiplied, 0] *= rx_multiply
+    directions[ry_multiplied, 1] *= ry_multiply
+
+    return Rays(directions, walkout_quadrants)
+
+
+def cr_walkout_rays() -> Rays:
+    """
+    The 4 rays of the corneal reflection walkout.
+    """
+
+    return Rays(np.array(cr_walkout_directions, dtype=np.float64), cr_walkout_quadrants)
+
+
+def ray_fan(n: int) -> Rays:
+    """
+    Returns n rays spread evenly around the center (--pupil_rays, --cr_rays).
+    n must be a multiple of 4. The default 32 pupil rays and 4 corneal reflection rays
+    keep their original layout, so tracking output is unchanged unless the ray count is changed;
+    other fans are symmetric about the center.
+    """
+
+    if n < 4 or n % 4 != 0:
+        raise ValueError(f"Ray count must be a positive multiple of 4, got {n}")
+
+    if n == len(walkout_quadrants):
+        return walkout_rays()
+    elif n == len(cr_walkout_quadrants):
+        return cr_walkout_rays()
+
+    angles = np.arange(n) * 2 * np.pi / n
+    directions = np.round(np.column_stack((np.cos(angles), np.sin(angles))), 12)
+    directions /= np.max(np.abs(directions), axis=1, keepdims=True)
+
+    quadrants = [("t" if y < 0 else "b") + ("l" if x < 0 else "r") for x, y in directions]
+
+    return Rays(directions, quadrants, shift=0)
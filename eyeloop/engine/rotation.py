@@ -0,0 +1,59 @@
+"""
+Axis alignment (--rotation 1).
+Frames are tracked as captured; the fits are rotated into the aligned axes instead of the pixels.
+The affine transform of each angle (set with O/P in minimum-gui) is computed once and cached,
+so aligning a frame costs a few multiplications. Pixels are only rotated for display and saved frames,
+off the tracking thread (preview render thread, frame writers).
+"""
+import cv2
+import numpy as np
+
+
+class Rotation:
+    """
+    Rotation by an angle (degrees, counter-clockwise as displayed) about the frame center, as cv2.getRotationMatrix2D.
+    """
+
+    def __init__(self, center: tuple, size: tuple) -> None:
+        self.center = (float(center[0]), float(center[1]))
+        self.size = tuple(size)  # (width, height)
+        self.cache = {}  # angle: (forward, inverse) affine transforms
+
+    def matrices(self, angle: float) -> tuple:
+        try:
+            return self.cache[angle]
+        except KeyError:
+            forward = cv2.getRotationMatrix2D(self.center, angle, 1)
+            matrices = self.cache[angle] = (forward, cv2.invertAffineTransform(forward))
+            return matrices
+
+    def point(self, point: tuple, angle: float, inverse: bool = False) -> tuple:
+        """
+        The point in the aligned axes (or, inverse, the aligned point in the frame).
+        """
+
+        matrix = self.matrices(angle)[inverse]
+        x, y = point[0], point[1]
+        return (float(matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2]),
+                float(matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2]))
+
+    def fit(self, params, angle: float):
+        """
+        Fit params in the aligned axes: a center (x, y), or a model fit ((x, y), width, height, angle).
+        The params are not changed in place, since the processors keep tracking in frame coordinates.
+        """
+
+        if len(params) == 4:
+            center, width, height, fit_angle = params
+            return self.point(center, angle), width, height, (fit_angle - angle) % 360
+
+        return self.point(params, angle)
+
+    def image(self, image: np.ndarray, angle: float) -> np.ndarray:
+        """
+        The rotated frame, for display and saving.
+        """
+
+        if angle == 0:
+            return image
+        return cv2.warpAffine(image, self.matrices(angle)[0], self.size)
@@ -0,0 +1,79 @@
+"""
+Per-stage timing of the tracking loop.
+Durations (perf_counter_ns) of the last `size` frames are kept per stage in preallocated ring buffers.
+Recording one duration costs a few hundred nanoseconds, so the timer is always on.
+"""
+import array
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("blink",
+          "pupil_thresh", "pupil_walkout", "pupil_fit",
+          "cr_1_thresh", "cr_1_walkout", "cr_1_fit",
+          "cr_2_thresh", "cr_2_walkout", "cr_2_fit",
+          "gui", "extractors", "track")
+
+
+class Stage_Timer:
+    """
+    Records per-stage durations and summarizes them as rolling p50/p95/p99/max (ms) of the last `size` frames.
+    With interval > 0 (--timing_interval, seconds), the summary is logged periodically via tick().
+    """
+
+    def __init__(self, stages: tuple = STAGES, size: int = 4096, interval: float = 0) -> None:
+        self.size = size
+        self.buffers = {stage: array.array("q", bytes(8 * size)) for stage in stages}
+        self.counts = dict.fromkeys(stages, 0)
+
+        self.interval = int(interval * 1e9)
+        self.next_summary = time.perf_counter_ns() + self.interval
+
+        if interval <= 0:
+            self.tick = lambda now: None
+
+    def record(self, stage: str, duration: int) -> None:
+        n = self.counts[stage]
+        self.buffers[stage][n % self.size] = duration
+        self.counts[stage] = n + 1
+
+    def durations(self, stage: str) -> np.ndarray:
+        """
+        The recorded durations of stage (ns), at most the last `size`.
+        """
+
+        n = min(self.counts[stage], self.size)
+        return np.frombuffer(self.buffers[stage], dtype=np.int64)[:n]
+
+    def percentiles(self) -> dict:
+        """
+        p50, p95, p99 and max (ms) of each stage with recorded durations.
+        """
+
+        summary = {}
+        for stage in self.buffers:
+            durations = self.durations(stage)
+            if len(durations) == 0:
+                continue
+
+            p50, p95, p99 = np.percentile(durations, (50, 95, 99)) / 1e6
+            summary[stage] = {"p50": p50, "p95": p95, "p99": p99, "max": durations.max() / 1e6}
+
+        return summary
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<14}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9} (ms)"]
+        for stage, stats in self.percentiles().items():
+            lines.append(f"{stage:<14}" + "".join(f"{value:>9.3f}" for value in stats.values()))
+
+        return "\n".join(lines)
+
+    def tick(self, now: int) -> None:
+        if now < self.next_summary:
+            return
+
+        self.next_summary = now + self.interval
+        logger.info(f"stage timing:\n{self.summary()}")
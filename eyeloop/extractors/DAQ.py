@@ -2,8 +2,14 @@ import json
 import logging
 from pathlib import Path
 
+from eyeloop.utilities.datalog import Binary_Datalog
+
 
 class DAQ_extractor:
+    # writes the datalog off the tracking thread, without losing entries
+    mode = "thread"
+    policy = "block"
+
     def __init__(self, output_dir):
         self.output_dir = output_dir
         self.datalog_path = Path(output_dir, f"datalog.json")
@@ -40,3 +46,27 @@ class DAQ_extractor:
     #                                 None,
     #                                 None)
     # digital_output.ClearTask()
+
+
+class Binary_DAQ_extractor:
+    """
+    Logs dataout as fixed-dtype records to datalog.bin (--datalog binary), written in blocks.
+    See eyeloop.utilities.datalog for the schema and the converter to json-lines.
+    """
+
+    mode = "thread"
+    policy = "block"
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.datalog_path = Path(output_dir, f"datalog.bin")
+        self.datalog = Binary_Datalog(self.datalog_path)
+
+    def activate(self):
+        return
+
+    def fetch(self, core):
+        self.datalog.append(core.dataout)
+
+    def release(self, core):
+        self.datalog.close()
@@ -0,0 +1,138 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+import eyeloop.config as config
+
+logger = logging.getLogger(__name__)
+
+#   Bins (ms) of the inter-frame interval histograms; the last bin is open-ended.
+INTERVAL_EDGES = (0, 1, 2, 4, 6, 8, 10, 12, 16, 20, 25, 33, 50, 100, 250, 1000)
+
+
+def percentiles(values: list) -> dict:
+    if len(values) == 0:
+        return {}
+
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return {"p50": p50, "p95": p95, "p99": p99, "max": max(values)}
+
+
+class Telemetry_extractor:
+    """
+    Throughput and latency telemetry of the tracking loop, from activation (start of tracking) to release.
+    Every `interval` seconds (--telemetry_interval), one json line is appended to telemetry.json in the trial folder:
+    - fps: frames per second of the period
+    - interval_ms: inter-frame interval percentiles, and interval_hist: counts per bin of INTERVAL_EDGES
+    - latency_ms: percentiles of the capture-to-result latency, from the receipt of a frame to its completion
+    - dropped: frames skipped by the importer (skipped, and gaps in the frame index), late: intervals above `late` x the median
+    - lost_track, blink: fraction of the frames of the period without a pupil fit, or with a blink
+    Counts (frames, dropped, late, lost_track_frames, blink_frames) are totals since activation.
+    The first line holds the histogram edges.
+    """
+
+    def __init__(self, output_dir, interval: float = 1, late: float = 1.5, edges: tuple = INTERVAL_EDGES) -> None:
+        self.path = Path(output_dir, "telemetry.json")
+        self.interval = interval
+        self.late_factor = late
+        self.edges = np.array(edges + (np.inf,))
+
+        self.file = open(self.path, "w")
+        self.file.write(json.dumps({"interval_edges_ms": list(edges)}) + "\n")
+
+        self.fetch = lambda core: None
+
+    def activate(self) -> None:
+        self.frames = self.dropped = self.late = self.lost = self.blinks = 0
+
+        self.times = []
+        self.latencies = []
+        self.period_lost = self.period_blinks = 0
+
+        self.last_time = None
+        self.last_frame = None
+        self.next_write = time.monotonic() + self.interval
+
+        self.fetch = self.fetch_
+
+    def fetch_(self, core) -> None:
+        now = time.monotonic()
+        dataout = core.dataout
+        frame = getattr(config.importer, "frame", None)
+
+        self.times.append(dataout["received"])
+        self.latencies.append(dataout["completed"] - dataout["received"])
+
+        if dataout.get("blink") == 1:
+            self.period_blinks += 1
+        elif "pupil" not in dataout:
+            self.period_lost += 1
+
+        self.dropped += dataout.get("skipped", 0)
+
+        if frame is not None:
+            if self.last_frame is not None and frame > self.last_frame + 1:
+                self.dropped += frame - self.last_frame - 1
+            self.last_frame = frame
+
+        if now >= self.next_write:
+            self.next_write = now + self.interval
+            self.write()
+
+    def write(self) -> dict:
+        """
+        Appends the statistics of the period since the last write, and returns them.
+        """
+
+        frames = len(self.times)
+        times = self.times if self.last_time is None else [self.last_time] + self.times
+        intervals = np.diff(times) * 1e3
+
+        late = 0
+        if len(intervals) > 0:
+            late = int(np.count_nonzero(intervals > self.late_factor * np.median(intervals)))
+            self.last_time = times[-1]
+
+        self.frames += frames
+        self.late += late
+        self.lost += self.period_lost
+        self.blinks += self.period_blinks
+
+        span = times[-1] - times[0] if len(times) > 1 else 0
+        stats = {
+            "time": time.time(),
+            "frames": self.frames,
+            "fps": len(intervals) / span if span > 0 else 0,
+            "interval_ms": percentiles(intervals),
+            "interval_hist": np.histogram(intervals, self.edges)[0].tolist(),
+            "latency_ms": percentiles(np.multiply(self.latencies, 1e3)),
+            "dropped": self.dropped,
+            "late": self.late,
+            "lost_track": self.period_lost / max(frames, 1),
+            "blink": self.period_blinks / max(frames, 1),
+            "lost_track_frames": self.lost,
+            "blink_frames": self.blinks
+        }
+
+        self.file.write(json.dumps(stats) + "\n")
+        self.file.flush()
+        print(f"    Processing {round(stats['fps'])} frames per second.")
+
+        self.times.clear()
+        self.latencies.clear()
+        self.period_lost = self.period_blinks = 0
+
+        return stats
+
+    def release(self, core) -> None:
+        # the engine may be released twice (e.g. quitting releases the importer, which releases the engine)
+        if self.file.closed:
+            return
+
+        if self.fetch == self.fetch_:
+            logger.info(f"telemetry: {self.write()}")
+            self.fetch = lambda core: None
+        self.file.close()
@@ -0,0 +1,78 @@
+import glob
+import logging
+import os
+
+import numpy as np
+
+import eyeloop.config as config
+
+logger = logging.getLogger(__name__)
+
+PROCESSORS = {"pupil": "pupil_processor", "cr1": "cr_processor_1", "cr2": "cr_processor_2"}
+
+
+def load_seeds(params: str) -> dict:
+    """
+    Returns the pupil/cr centers saved by Engine.release, e.g. {"pupil": (x, y), "cr1": (x, y)}.
+    Parameter files without centers give an empty dictionary.
+    """
+
+    latest_params = max(glob.glob(params), key=os.path.getctime)
+    params_ = np.load(latest_params, allow_pickle=True).tolist()
+
+    seeds = {}
+    for key in PROCESSORS:
+        try:
+            seeds[key] = tuple(float(coordinate) for coordinate in params_[key][2])
+        except (KeyError, IndexError, TypeError, ValueError):
+            pass
+
+    return seeds
+
+
+def argument_seeds() -> dict:
+    """
+    Seeds of the params file (--params), overridden by the command-line seeds (--pupil_seed, --cr_seed, --cr2_seed).
+    """
+
+    seeds = load_seeds(config.arguments.params) if config.arguments.params != "" else {}
+
+    for key, seed in (("pupil", config.arguments.pupil_seed), ("cr1", config.arguments.cr_seed),
+                      ("cr2", config.arguments.cr2_seed)):
+        if seed != "":
+            x, y = seed.split(",")
+            seeds[key] = (float(x), float(y))
+
+    return seeds
+
+
+class GUI:
+    """
+    Graphical user interface for running without a display (--headless 1), e.g. offline batches on compute nodes.
+    Nothing is rendered and no keys are read: the pupil and corneal reflections are selected at their seeds
+    when the engine is armed, and tracking starts immediately.
+    Thresholds come from the params file or the command line (--pupil_threshold, --cr_threshold).
+    """
+
+    def __init__(self, seeds: dict = None) -> None:
+        self.seeds = argument_seeds() if seeds is None else seeds
+
+        if not self.seeds:
+            raise ValueError("Headless tracking needs pupil/cr seeds; pass --pupil_seed x,y (and --cr_seed x,y) "
+                             "or a params file with centers (--params)")
+
+    def arm(self, width: int, height: int) -> None:
+        for key, seed in self.seeds.items():
+            getattr(config.engine, PROCESSORS[key]).reset(seed)
+
+        logger.info(f"headless tracking from seeds {self.seeds}")
+        config.engine.activate()
+
+    def update(self, img) -> None:
+        return
+
+    def update_record(self, img) -> None:
+        return
+
+    def release(self) -> None:
+        return
@@ -1,12 +1,13 @@
 import os
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 
 import eyeloop.config as config
 from eyeloop.constants.minimum_gui_constants import *
+from eyeloop.guis.minimum.preview import Preview_Renderer, place_cross
 from eyeloop.utilities.general_operations import to_int, tuple_int
-import threading
 
 import logging
 logger = logging.getLogger(__name__)
@@ -24,7 +25,7 @@ class GUI:
         self._state = "adjustment"
         self.inquiry = "none"
         self.terminate = -1
-        self.update = self.adj_update#real_update
+        self.update = self.adj_update
         self.skip = 0
         self.first_run = True
 
@@ -47,10 +48,11 @@ class GUI:
 
     def mousecallback(self, event, x, y, flags, params) -> None:
         x = x % self.width
-        self.cursor = (x, y)
+        self.cursor = tuple_int(self.unrotate((x, y)))
 
     def release(self):
         #self.out.release()
+        self.preview.stop()
         cv2.destroyAllWindows()
 
     def remove_mousecallback(self) -> None:
@@ -77,13 +79,11 @@ class GUI:
                 cv2.destroyWindow("BINARY")
                 cv2.destroyWindow("Tool tip")
 
-                cv2.imshow("TRACKING", self.bin_stock)
-                cv2.moveWindow("TRACKING", 100, 100)
-
                 self._state = "tracking"
                 self.inquiry = "none"
 
-                self.update = self.real_update
+                self.update = self.track_update
+                self.preview.start()
 
                 config.engine.activate()
 
@@ -198,6 +198,7 @@ class GUI:
 
     def arm(self, width: int, height: int) -> None:
         self.fps = np.round(1/config.arguments.fps, 2)
+        self.preview = Preview_Renderer(self.fps, show=self.show_tracking, transform=lambda image: self.rotate(image))
 
         self.pupil_processor = config.engine.pupil_processor
 
@@ -206,6 +207,15 @@ class GUI:
         self.cr_processor_1 = config.engine.cr_processor_1
         self.cr_processor_2 = config.engine.cr_processor_2
 
+        #   With --rotation 1, frames are displayed in the aligned axes (see eyeloop.engine.rotation),
+        #   and the cursor is mapped back to the frame.
+        if config.arguments.rotation == 1:
+            self.rotate = lambda image: config.engine.rotation.image(image, config.engine.angle)
+            self.unrotate = lambda point: config.engine.rotation.point(point, config.engine.angle, inverse=True)
+        else:
+            self.rotate = lambda image: image
+            self.unrotate = lambda point: point
+
         self.width, self.height = width, height
         self.binary_width = max(width, 300)
         self.binary_height = max(height, 200)
@@ -214,10 +224,13 @@ class GUI:
         output_vid = Path(config.file_manager.new_folderpath, "output.avi")
         self.out = cv2.VideoWriter(str(output_vid), fourcc, 50.0, (self.width, self.height))
 
-        self.bin_stock = np.zeros((self.binary_height, self.binary_width))
-        self.bin_P = self.bin_stock.copy()
-        self.bin_CR = self.bin_stock.copy()
-        #self.CRStock = self.bin_stock.copy()
+        #   Adjustment mode draws into persistent uint8 buffers in place (see adj_update):
+        #   the binary panel holds the pupil (top) and corneal reflection (bottom) halves.
+        self.binary_panel = np.zeros((self.binary_height * 2, self.binary_width), dtype=np.uint8)
+        self.bin_P = self.binary_panel[:self.binary_height]
+        self.bin_CR = self.binary_panel[self.binary_height:]
+        self.regions = {"pupil": None, "cr": None}
+        self.source_rgb = np.zeros((height, width, 3), dtype=np.uint8)
 
         self.src_txt = np.zeros((20, width, 3))
         self.prev_txt = self.src_txt.copy()
@@ -225,20 +238,20 @@ class GUI:
         cv2.putText(self.prev_txt, 'Preview', (15, 12), font, .7, (255, 255, 255), 0, cv2.LINE_4)
         cv2.putText(self.prev_txt, 'EyeLoop', (width - 50, 12), font, .5, (255, 255, 255), 0, cv2.LINE_8)
 
-        self.bin_stock_txt = np.zeros((20, self.binary_width))
+        self.bin_stock_txt = np.zeros((20, self.binary_width), dtype=np.uint8)
         self.bin_stock_txt_selected = self.bin_stock_txt.copy()
         self.crstock_txt = self.bin_stock_txt.copy()
-        self.crstock_txt[0:1, 0:self.binary_width] = 1
+        self.crstock_txt[0:1, 0:self.binary_width] = 255
         self.crstock_txt_selected = self.crstock_txt.copy()
 
-        cv2.putText(self.bin_stock_txt, 'P | R/F | T/G || bin/blur', (10, 15), font, .7, 1, 0, cv2.LINE_4)
-        cv2.putText(self.bin_stock_txt_selected, '(*) P | R/F | T/G || bin/blur', (10, 15), font, .7, 1, 0, cv2.LINE_4)
+        cv2.putText(self.bin_stock_txt, 'P | R/F | T/G || bin/blur', (10, 15), font, .7, 255, 0, cv2.LINE_4)
+        cv2.putText(self.bin_stock_txt_selected, '(*) P | R/F | T/G || bin/blur', (10, 15), font, .7, 255, 0, cv2.LINE_4)
 
-        cv2.putText(self.crstock_txt, 'CR | W/S | E/D || bin/blur', (10, 15), font, .7, 1, 0, cv2.LINE_4)
-        cv2.putText(self.crstock_txt_selected, '(*) CR | W/S | E/D || bin/blur', (10, 15), font, .7, 1, 0, cv2.LINE_4)
+        cv2.putText(self.crstock_txt, 'CR | W/S | E/D || bin/blur', (10, 15), font, .7, 255, 0, cv2.LINE_4)
+        cv2.putText(self.crstock_txt_selected, '(*) CR | W/S | E/D || bin/blur', (10, 15), font, .7, 255, 0, cv2.LINE_4)
 
-        cv2.imshow("CONFIGURATION", np.hstack((self.bin_stock, self.bin_stock)))
-        cv2.imshow("BINARY", np.vstack((self.bin_stock, self.bin_stock)))
+        cv2.imshow("CONFIGURATION", self.source_rgb)
+        cv2.imshow("BINARY", self.binary_panel)
 
         cv2.moveWindow("BINARY", 105 + width * 2, 100)
         cv2.moveWindow("CONFIGURATION", 100, 100)
@@ -253,21 +266,14 @@ class GUI:
             print("Could not bind mouse-buttons.")
 
     def place_cross(self, source: np.ndarray, point: tuple, color: tuple) -> None:
-        try:
-            source[to_int(point[1] - 3):to_int(point[1] + 4), to_int(point[0])] = color
-            source[to_int(point[1]), to_int(point[0] - 3):to_int(point[0] + 4)] = color
-        except:
-            pass
+        place_cross(source, point, color)
 
 
     def update_record(self, frame_preview) -> None:
-        cv2.imshow("Recording", frame_preview)
+        cv2.imshow("Recording", self.rotate(frame_preview))
         if cv2.waitKey(1) == ord('q'):
             config.engine.release()
 
-    def skip_track(self):
-        self.update = self.real_update
-
 
     def pupil(self, source_rgb):
         try:
@@ -302,52 +308,53 @@ class GUI:
             logger.info(f"cr2 func: {e}")
             return False
 
-    def adj_update(self, img):
-        source_rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-
-        #if self.pupil_(source_rgb):
-        self.bin_P = self.bin_stock.copy()
+    def paste(self, panel: np.ndarray, key: str, area: Optional[np.ndarray]) -> None:
+        """
+        Copies the binary area (or nothing) centered into the panel, in place.
+        Only the previous area is cleared, and only when the new one does not cover it.
+        """
 
-        if self.pupil_(source_rgb):
-            self.bin_P[0:20, 0:self.binary_width] = self.bin_stock_txt_selected
-        else:
-            self.bin_P[0:20, 0:self.binary_width] = self.bin_stock_txt
+        region = None
+        if area is not None:
+            offset_y = int((self.binary_height - area.shape[0]) / 2)
+            offset_x = int((self.binary_width - area.shape[1]) / 2)
+            region = (offset_y, min(offset_y + area.shape[0], self.binary_height),
+                      offset_x, min(offset_x + area.shape[1], self.binary_width))
 
-        #self.bin_CR = self.bin_stock.copy()
+        previous = self.regions[key]
+        if previous is not None and previous != region:
+            y0, y1, x0, x1 = previous
+            panel[y0:y1, x0:x1] = 0
 
-        try:
-            pupil_area = self.pupil_processor.source
+        if region is not None:
+            y0, y1, x0, x1 = region
+            panel[y0:y1, x0:x1] = area[:y1 - y0, :x1 - x0]
 
-            offset_y = int((self.binary_height - pupil_area.shape[0]) / 2)
-            offset_x = int((self.binary_width - pupil_area.shape[1]) / 2)
-            self.bin_P[offset_y:min(offset_y + pupil_area.shape[0], self.binary_height),
-            offset_x:min(offset_x + pupil_area.shape[1], self.binary_width)] = pupil_area
-        except:
-            pass
+        self.regions[key] = region
 
-        self.cr1_(source_rgb)
-        self.cr2_(source_rgb)
+    def adj_update(self, img):
+        source_rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR, dst=self.source_rgb)
 
-        self.bin_CR = self.bin_stock.copy()
-
-        try:
-            cr_area = self.current_cr_processor.source
-            offset_y = int((self.binary_height - cr_area.shape[0]) / 2)
-            offset_x = int((self.binary_width - cr_area.shape[1]) / 2)
-            self.bin_CR[offset_y:min(offset_y + cr_area.shape[0], self.binary_height),
-            offset_x:min(offset_x + cr_area.shape[1], self.binary_width)] = cr_area
-            self.bin_CR[0:20, 0:self.binary_width] = self.crstock_txt_selected
-        except:
-            self.bin_CR[0:20, 0:self.binary_width] = self.crstock_txt
-            pass
+        self.paste(self.bin_P, "pupil", getattr(self.pupil_processor, "source", None))
 
+        if self.pupil_(source_rgb):
+            self.bin_P[0:20] = self.bin_stock_txt_selected
+        else:
+            self.bin_P[0:20] = self.bin_stock_txt
 
+        self.cr1_(source_rgb)
+        self.cr2_(source_rgb)
 
+        cr_area = getattr(self.current_cr_processor, "source", None)
+        self.paste(self.bin_CR, "cr", cr_area)
 
-        #print(cr_area)
+        if cr_area is not None:
+            self.bin_CR[0:20] = self.crstock_txt_selected
+        else:
+            self.bin_CR[0:20] = self.crstock_txt
 
-        cv2.imshow("BINARY", np.vstack((self.bin_P, self.bin_CR)))
-        cv2.imshow("CONFIGURATION", source_rgb)
+        cv2.imshow("BINARY", self.binary_panel)
+        cv2.imshow("CONFIGURATION", self.rotate(source_rgb))
         #self.out.write(source_rgb)
 
         self.key_listener(cv2.waitKey(50))
@@ -356,18 +363,20 @@ class GUI:
             self.first_run = False
 
 
-    def real_update(self, img) -> None:
-        source_rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-        self.pupil_(source_rgb)
-        self.cr1_(source_rgb)
-        self.cr2_(source_rgb)
-
-        cv2.imshow("TRACKING", source_rgb)
-
-        threading.Timer(self.fps, self.skip_track).start() #run feed every n secs (n=1)
-        self.update = lambda _: None
-
-        if cv2.waitKey(1) == ord("q"):
+    def track_update(self, img) -> None:
+        """
+        Posts the frame and its fits to the preview renderer when a preview frame is due (see preview.py),
+        and shows the last drawn preview frame.
+        """
 
+        crs = tuple(processor.center if processor.active else None for processor in (self.cr_processor_1, self.cr_processor_2))
+        self.preview.post(img, self.pupil_processor.fit_model.params if self.pupil_processor.active else None, crs)
+        self.preview.refresh()
 
+        if self.preview.quit:
             config.engine.release()
+
+    def show_tracking(self, source_rgb: np.ndarray) -> None:
+        cv2.imshow("TRACKING", source_rgb)
+        if self.preview.rendered == 0:
+            cv2.moveWindow("TRACKING", 100, 100)
@@ -0,0 +1,144 @@
+"""
+Tracking preview of minimum-gui, drawn off the tracking thread.
+Once per preview interval (--framerate), the tracking thread posts a copy of the frame and its fits to a single-slot
+mailbox; other frames are not touched. A render thread draws the fits on the post, and the tracking thread shows
+the drawn frame on its next update. Showing and window events stay on the tracking (main) thread, since HighGUI is
+not thread-safe, and on macOS only works on the main thread.
+"""
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from eyeloop.constants.minimum_gui_constants import green, red
+from eyeloop.utilities.general_operations import to_int, tuple_int
+
+logger = logging.getLogger(__name__)
+
+
+def place_cross(source: np.ndarray, point: tuple, color: tuple) -> None:
+    try:
+        source[to_int(point[1] - 3):to_int(point[1] + 4), to_int(point[0])] = color
+        source[to_int(point[1]), to_int(point[0] - 3):to_int(point[0] + 4)] = color
+    except:
+        pass
+
+
+def render(img: np.ndarray, pupil: tuple = None, crs: tuple = ()) -> np.ndarray:
+    """
+    Returns the frame in color with the pupil fit (center, width, height, angle) and the corneal reflection centers.
+    """
+
+    source_rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+    if pupil is not None:
+        pupil_center, pupil_width, pupil_height, pupil_angle = pupil
+        try:
+            cv2.ellipse(source_rgb, tuple_int(pupil_center), tuple_int((pupil_width, pupil_height)), pupil_angle, 0, 360, red, 1)
+        except (cv2.error, ValueError, OverflowError):
+            pass
+        place_cross(source_rgb, pupil_center, red)
+
+    for cr in crs:
+        if cr is not None:
+            place_cross(source_rgb, cr, green)
+
+    return source_rgb
+
+
+class Mailbox:
+    """
+    Single slot holding the newest post. post() overwrites it; take() returns a post once, or None.
+    Safe for one posting and one taking thread: the slot is swapped in a single assignment.
+    """
+
+    def __init__(self) -> None:
+        self.slot = (0, None)
+        self.taken = 0
+
+    def post(self, item) -> None:
+        self.slot = (self.slot[0] + 1, item)
+
+    def take(self):
+        n, item = self.slot
+        if n == self.taken:
+            return None
+
+        self.taken = n
+        return item
+
+    def posted(self) -> int:
+        return self.slot[0]
+
+
+class Preview_Renderer:
+    """
+    Draws the fits on one frame every `interval` seconds on its own thread; see the module docstring.
+    The tracking thread calls post() and refresh() on every frame: post() returns at once unless a frame is due,
+    and refresh() shows the newest drawn frame, if any, and reads the keys; pressing q sets `quit`.
+    transform (e.g. rotation for display) runs on the render thread.
+    """
+
+    def __init__(self, interval: float, window: str = "TRACKING", show=None, wait=None, transform=None,
+                 clock=time.monotonic) -> None:
+        self.interval = interval
+        self.window = window
+        self.show = show or (lambda image: cv2.imshow(self.window, image))
+        self.wait = wait or cv2.waitKey
+        self.transform = transform or (lambda image: image)
+        self.clock = clock
+
+        self.mailbox = Mailbox()
+        self.drawn = Mailbox()
+        self.due = -float("inf")
+        self.rendered = 0
+        self.quit = False
+
+        self.posted = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="preview", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def post(self, img: np.ndarray, pupil: tuple = None, crs: tuple = ()) -> None:
+        now = self.clock()
+        if now < self.due:
+            return
+        self.due = now + self.interval
+
+        # the frame is copied, since importers reuse its buffer (e.g. Frame_Ring slots) while it waits to be drawn
+        self.mailbox.post((img.copy(), pupil, crs))
+        self.posted.set()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            if not self.posted.wait(.1):
+                continue
+            self.posted.clear()
+
+            item = self.mailbox.take()
+            if item is not None:
+                self.drawn.post(self.transform(render(*item)))
+
+    def refresh(self) -> None:
+        image = self.drawn.take()
+        if image is None:
+            return
+
+        self.show(image)
+        self.rendered += 1
+
+        if self.wait(1) & 0xFF == ord("q"):
+            self.quit = True
+
+    def stop(self) -> None:
+        if not self.thread.is_alive():
+            return
+
+        self.stopped.set()
+        self.thread.join()
+
+        logger.info(f"preview: {self.rendered} of {self.mailbox.posted()} posted frames shown")
@@ -1,11 +1,16 @@
 import logging
+import queue
+import threading
+import time
 from pathlib import Path
 from typing import Optional, Callable
 
 import cv2
+import numpy as np
 
 import eyeloop.config as config
 from eyeloop.importers.importer import IMPORTER
+from eyeloop.importers.live import Capture_Thread, Frame_Ring
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,24 @@ class Importer(IMPORTER):
     def __init__(self) -> None:
         super().__init__()
         self.route_frame: Optional[Callable] = None  # Dynamically assigned at runtime depending on input type
+        self.read_frame: Optional[Callable] = None  # Reads (and decodes) frame n; assigned with route_frame
+
+        # Pipelined mode (--pipeline 1): decode -> track -> save stages, connected by bounded queues.
+        self.pipeline = config.arguments.pipeline == 1
+        self.queue_size = config.arguments.queue_size
+        self.stopped = threading.Event()
+        self.stages = []
+        self.depth_peak = {"decode": 0, "save": 0}
+        self.depth_sum = {"decode": 0, "save": 0}
+        self.depth_samples = 0
+
+        # Live capture (webcams): frames are grabbed on a capture thread into a latest-frame-wins ring (--ring_size).
+        self.live_capture = False
+        self.ring = Frame_Ring(config.arguments.ring_size)
+        self.capture_thread = None
+        self.bgr = None
+
+        self.sequence = None  # image sequence reader (directories)
 
     def first_frame(self) -> None:
         self.vid_path = Path(config.arguments.video)
@@ -24,10 +47,14 @@ class Importer(IMPORTER):
         if str(self.vid_path.name) == "0" or self.vid_path.is_file():  # or stream
             if str(self.vid_path.name) == "0":
                 self.capture = cv2.VideoCapture(0)
+                self.capture_time = lambda: time.monotonic()
+                self.live_capture = True
             else:
                 self.capture = cv2.VideoCapture(str(self.vid_path))
+                self.capture_time = lambda: self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
 
             self.route_frame = self.route_cam
+            self.read_frame = self.read_cam
             width = self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)
             height = self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
 
@@ -46,50 +73,61 @@ class Importer(IMPORTER):
 
             config.file_manager.input_folderpath = self.vid_path
 
-            config.file_manager.input_folderpath = self.vid_path
+            # frames are decoded in grayscale, ahead of tracking (--prefetch)
+            self.sequence = config.file_manager.open_sequence(config.arguments.prefetch, config.arguments.read_workers)
+            if len(self.sequence) == 0:
+                raise ValueError(f"No image sequence {config.arguments.img_format} (from frame 0) at {self.vid_path}")
 
-            image = config.file_manager.read_image(self.frame)
+            self.route_frame = self.route_sequence
+            self.read_frame = self.sequence.read
 
-            try:
-                height, width, _ = image.shape
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                self.route_frame = self.route_sequence_sing
-            except Exception:  # TODO fix bare except
-                logger.exception("first_frame() error: ")
-                height, width = image.shape
-                self.route_frame = self.route_sequence_flat
+            image = self.read_frame(self.frame)
+            height, width = image.shape
 
         else:
             raise ValueError(f"Video path at {self.vid_path} is not a file or directory!")
 
+        self.shape = image.shape
         self.arm(width, height, image)
 
     def route(self) -> None:
         self.first_frame()
+        if self.live_capture:
+            if self.pipeline:
+                logger.info("--pipeline is ignored for live capture, which grabs frames on its own thread")
+            self.start_capture()
+        elif self.pipeline:
+            self.start_pipeline()
         while True:
             if self.route_frame is not None:
                 self.route_frame()
             else:
                 break
 
-    def proceed(self, image) -> None:
+    def proceed(self, image, capture: float = None, received: float = None, skipped: int = None) -> None:
         image = self.resize(image)
-        self.rotate_(image, config.engine.angle)
-        config.engine.iterate(image)
-        self.save_(image)
+        config.engine.iterate(image, capture, received, skipped)
+        self.save_(image, capture, received)
         self.frame += 1
 
-    def route_sequence_sing(self) -> None:
-
-        image = config.file_manager.read_image(self.frame)
-
-        self.proceed(image[..., 0])
+    def read(self, frame: int) -> tuple:
+        """
+        Reads frame n with its capture timestamps (capture, received); see IMPORTER.capture_time.
+        """
 
-    def route_sequence_flat(self) -> None:
+        image = self.read_frame(frame)
+        received = time.monotonic()
+        return image, self.capture_time(), received
 
-        image = config.file_manager.read_image(self.frame)
+    def route_sequence(self) -> None:
+        try:
+            image = self.read_frame(self.frame)
+        except ValueError:  # end of image sequence
+            logger.info("No more frames to process, exiting.")
+            self.release()
+            return
 
-        self.proceed(image)
+        self.proceed(image, self.capture_time(), time.monotonic())
 
     def route_cam(self) -> None:
         """
@@ -98,19 +136,190 @@ class Importer(IMPORTER):
         2: frame save for offline processing
         """
 
+        image, capture, received = self.read(self.frame)
+        if image is not None:
+            self.proceed(image, capture, received)
+        else:
+            logger.info("No more frames to process, exiting.")
+            self.release()
+
+    def read_cam(self, frame: int = None) -> Optional[np.ndarray]:
         _, image = self.capture.read()
         if image is not None:
             image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            self.proceed(image)
+        return image
+
+    def start_capture(self) -> None:
+        """
+        Grabs frames continually on a capture thread into the frame ring, so that tracking always gets
+        the newest frame instead of frames queued by the driver while it was busy; see eyeloop.importers.live.
+        """
+
+        self.capture_thread = Capture_Thread(self.ring, self.grab, self.shape)
+        self.capture_thread.start()
+
+        self.route_frame = self.route_live
+
+    def grab(self, slot: np.ndarray) -> Optional[float]:
+        """
+        Capture thread: reads the next frame into the slot, in grayscale; returns its capture timestamp.
+        """
+
+        grabbed, self.bgr = self.capture.read(self.bgr)
+        if not grabbed:
+            return None
+
+        cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY, dst=slot)
+        return self.capture_time()
+
+    def route_live(self) -> None:
+        """
+        Tracking: routes the newest frame of the ring to eyeloop, with the number of frames skipped before it.
+        """
+
+        latest = self.ring.take(.1)
+        if latest is not None:
+            self.proceed(*latest)
+        elif self.ring.closed:
+            logger.info("No more frames to process, exiting.")
+            self.release()
+
+    def start_pipeline(self) -> None:
+        """
+        Splits routing into three stages (--pipeline 1):
+        capture/decode (thread) -> resize/track (this thread) -> save (thread).
+        The stages are connected by bounded queues (--queue_size), so a stage waits when its
+        successor falls behind, and throughput is set by the slowest stage instead of the sum.
+        OpenCV releases the GIL while decoding and encoding, so the stages overlap.
+        """
+
+        self.decoded = queue.Queue(maxsize=self.queue_size)
+        self.saved = queue.Queue(maxsize=self.queue_size)
+
+        if config.arguments.save == 1:
+            self.save_ = lambda image, *stamps: self.put(self.saved, (image, self.frame, *stamps))
+
+        self.stages = [threading.Thread(target=self.decode, name="decode", daemon=True),
+                       threading.Thread(target=self.persist, name="save", daemon=True)]
+        for stage in self.stages:
+            stage.start()
+
+        self.route_frame = self.route_pipeline
+
+    def put(self, stage_queue: queue.Queue, item) -> None:
+        """
+        Blocking put which gives up once the importer is released.
+        """
+
+        while not self.stopped.is_set():
+            try:
+                stage_queue.put(item, timeout=.1)
+                return
+            except queue.Full:
+                pass
+
+    def decode(self) -> None:
+        """
+        Capture/decode stage: reads frames into the decode queue until the stream ends (None).
+        A failing read also ends the stream, so the tracking stage never waits for frames that will not come.
+        """
+
+        frame = self.frame
+        try:
+            while not self.stopped.is_set():
+                try:
+                    item = self.read(frame)
+                except ValueError:  # end of image sequence
+                    return
+                if item[0] is None:
+                    return
+
+                self.put(self.decoded, item)
+                frame += 1
+        except Exception:
+            logger.exception(f"pipeline decode stage failed at frame {frame}; ending the stream")
+        finally:
+            self.put(self.decoded, None)
+
+    def persist(self) -> None:
+        """
+        Save stage: writes frames of the save queue until it receives None.
+        Frames which fail to save are logged and skipped, so the queue keeps draining.
+        """
+
+        while True:
+            item = self.saved.get()
+            if item is None:
+                return
+            try:
+                config.file_manager.save_image(*item)
+            except Exception:
+                logger.exception(f"pipeline save stage failed to save frame {item[1]}")
+
+    def route_pipeline(self) -> None:
+        """
+        Tracking stage: routes the next decoded frame to eyeloop.
+        """
+
+        item = self.decoded.get()
+        self.sample_queue_depths()
+
+        if item is not None:
+            self.proceed(*item)
         else:
             logger.info("No more frames to process, exiting.")
             self.release()
 
+    def queue_depths(self) -> dict:
+        """
+        Current number of frames waiting in front of the tracking (decode) and save stages.
+        A full decode queue means tracking is the bottleneck; an empty one means decoding is.
+        A full save queue means saving is the bottleneck.
+        """
+
+        try:
+            return {"decode": self.decoded.qsize(), "save": self.saved.qsize()}
+        except AttributeError:
+            return {}
+
+    def sample_queue_depths(self) -> None:
+        for stage, depth in self.queue_depths().items():
+            self.depth_peak[stage] = max(self.depth_peak[stage], depth)
+            self.depth_sum[stage] += depth
+        self.depth_samples += 1
+
+    def stop_pipeline(self) -> None:
+        """
+        Stops decoding and flushes the save queue.
+        """
+
+        if not self.stages:
+            return
+
+        self.stopped.set()
+        decode, persist = self.stages
+        decode.join()
+
+        self.saved.put(None)
+        persist.join()
+
+        self.stages = []
+
+        samples = max(self.depth_samples, 1)
+        for stage in self.depth_peak:
+            logger.info(f"pipeline {stage} queue: mean depth {self.depth_sum[stage] / samples:.1f}, "
+                        f"peak {self.depth_peak[stage]}/{self.queue_size}")
+
     def release(self) -> None:
         logger.debug(f"cv.Importer.release() called")
+        self.stop_pipeline()
+        if self.capture_thread is not None:
+            self.capture_thread.stop()
+            logger.info(f"live capture: {self.ring.written} frames grabbed, {self.ring.skipped} skipped for newer frames")
         if self.capture is not None:
             self.capture.release()
+        if self.sequence is not None:
+            self.sequence.close()
 
         self.route_frame = None
-        cv2.destroyAllWindows()
         super().release()
@@ -15,15 +15,19 @@ class IMPORTER:
         self.vid_path = config.arguments.video
         self.capture = None
 
+        #   Capture timestamp (s) of the frame just read, in the clock of the source:
+        #   video position for files, monotonic time for webcams, camera time for Vimba; None if unknown.
+        self.capture_time = lambda: None
+
         if config.arguments.save == 1:
             self.save_ = self.save
         else:
-            self.save_ = lambda _: None
+            self.save_ = lambda *_: None
 
+        #   Frames are tracked unrotated (the engine rotates the fits, see eyeloop.engine.rotation);
+        #   saved frames are rotated by the frame writers.
         if config.arguments.rotation == 1:
-            self.rotate_ = self.rotate
-        else:
-            self.rotate_ = lambda img, _: None
+            config.file_manager.transform = lambda image: config.engine.rotation.image(image, config.engine.angle)
 
     def arm(self, width, height, image):
 
@@ -40,22 +44,8 @@ class IMPORTER:
 
         self.resize(image)
 
-        # image = self.rotate(image, self.ENGINE.angle)
-        
         config.engine.arm(width, height, image)
 
-    def rotate(self, image: np.ndarray, angle: int) -> np.ndarray:
-        """
-        Performs rotaiton of the image to align visual axes.
-        """
-
-        if angle == 0:
-            return
-
-        M = cv2.getRotationMatrix2D(self.center, angle, 1)
-
-        image[:] = cv2.warpAffine(image, M, self.dimensions, cv2.INTER_NEAREST)
-
     def resize_image(self, image: np.ndarray) -> np.ndarray:
         """
         Resizes image to scale value. -sc 1 (default)
@@ -63,8 +53,8 @@ class IMPORTER:
 
         return cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_NEAREST)
 
-    def save(self, image: np.ndarray) -> None:
-        config.file_manager.save_image(image, self.frame)
+    def save(self, image: np.ndarray, capture: float = None, received: float = None) -> None:
+        config.file_manager.save_image(image, self.frame, capture, received)
 
     def release(self):
         self.release = lambda:None
@@ -0,0 +1,125 @@
+"""
+Latest-frame-wins capture for live importers (webcams, cameras).
+Frames are written into a small ring of preallocated slots by a capture thread (or a camera callback), which never
+waits for tracking; the tracker always takes the newest frame, and is told how many frames it skipped.
+Loop latency thus stays bounded when tracking is momentarily slow, instead of the driver queueing stale frames.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class Frame_Ring:
+    """
+    Ring of `size` (at least 3) frame slots: the newest frame, the frame being tracked, and the one being written.
+    The writer claim()s a slot which is neither the newest nor tracked, fills it and publish()es it;
+    take() returns the newest frame, which stays valid until the next take().
+    The slots are views of one preallocated block, so frame writers copy them before they are reused.
+    """
+
+    def __init__(self, size: int = 4) -> None:
+        if size < 3:
+            raise ValueError(f"A frame ring needs at least 3 slots, got {size}")
+
+        self.size = size
+        self.block = None
+        self.stamps = [None] * size
+        self.ready = threading.Condition()
+
+        self.newest = -1  # slot of the newest untaken frame, -1: none
+        self.tracked = -1  # slot of the last taken frame
+        self.writing = 0
+        self.written = 0  # frames published
+        self.taken = 0  # frames published at the last take
+        self.skipped = 0  # frames never taken, in total
+        self.closed = False
+
+    def claim(self, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        """
+        The slot to write the next frame into. The block is allocated with the shape of the first frame.
+        """
+
+        if self.block is None:
+            self.block = np.empty((self.size, *shape), dtype=dtype)
+
+        with self.ready:
+            index = (self.writing + 1) % self.size
+            while index in (self.newest, self.tracked):
+                index = (index + 1) % self.size
+            self.writing = index
+
+        return self.block[index]
+
+    def publish(self, capture: Optional[float], received: float) -> None:
+        """
+        Makes the claimed slot the newest frame, replacing (skipping) any untaken one.
+        """
+
+        with self.ready:
+            self.stamps[self.writing] = (capture, received)
+            self.newest = self.writing
+            self.written += 1
+            self.ready.notify()
+
+    def close(self) -> None:
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+
+    def take(self, timeout: float):
+        """
+        The newest frame as (image, capture, received, skipped), where skipped counts the frames published
+        since the previous take and replaced before they were taken. None if no frame arrived within timeout.
+        """
+
+        with self.ready:
+            if self.newest < 0 and not self.closed:
+                self.ready.wait(timeout)
+            if self.newest < 0:
+                return None
+
+            index, self.newest = self.newest, -1
+            self.tracked = index
+
+            skipped = self.written - self.taken - 1
+            self.taken = self.written
+            self.skipped += skipped
+
+        capture, received = self.stamps[index]
+        return self.block[index], capture, received, skipped
+
+
+class Capture_Thread:
+    """
+    Reads frames into a frame ring on a daemon thread, until stopped or the stream ends.
+    read(slot) fills the slot and returns the capture timestamp of the frame, or None at the end of the stream.
+    """
+
+    def __init__(self, ring: Frame_Ring, read: Callable, shape: tuple) -> None:
+        self.ring = ring
+        self.read = read
+        self.shape = shape
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="capture", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            slot = self.ring.claim(self.shape)
+            capture = self.read(slot)
+            if capture is None:
+                break
+
+            self.ring.publish(capture, time.monotonic())
+
+        self.ring.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
@@ -0,0 +1,67 @@
+import logging
+import time
+
+import numpy as np
+
+import eyeloop.config as config
+from eyeloop.importers.importer import IMPORTER
+from eyeloop.utilities.frame_stack import Frame_Stack
+
+logger = logging.getLogger(__name__)
+
+
+class Importer(IMPORTER):
+    """
+    Replays a raw frame stack saved with --save_format stack (--video [trial folder]/frames.stack.json).
+    Frames are read from the memory-mapped stack, without decoding; see eyeloop.utilities.frame_stack.
+    Each frame carries its recorded capture timestamp.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.stack = None
+
+    def first_frame(self) -> None:
+        self.stack = Frame_Stack(config.arguments.video)
+        if len(self.stack) == 0:
+            raise ValueError(f"The frame stack at {config.arguments.video} has no frames")
+
+        image = self.read(self.frame)[0]
+        height, width = image.shape[:2]
+
+        self.arm(width, height, image)
+
+    def read(self, frame: int) -> tuple:
+        """
+        Frame n (copied, since the stack is mapped read-only) with its capture timestamps (capture, received).
+        """
+
+        image = np.array(self.stack[frame])
+        received = time.monotonic()
+
+        capture = self.stack.times["capture"][frame] if frame < len(self.stack.times) else np.nan
+        return image, None if np.isnan(capture) else float(capture), received
+
+    def proceed(self, image, capture: float = None, received: float = None) -> None:
+        image = self.resize(image)
+        config.engine.iterate(image, capture, received)
+        self.save_(image, capture, received)
+        self.frame += 1
+
+    def route(self) -> None:
+        self.first_frame()
+
+        while self.live:
+            if self.frame < len(self.stack):
+                self.proceed(*self.read(self.frame))
+            else:
+                logger.info("No more frames to process, exiting.")
+                self.release()
+
+    def release(self) -> None:
+        logger.debug(f"stack.Importer.release() called")
+        self.live = False
+        if self.stack is not None:
+            self.stack.close()
+
+        super().release()
@@ -1,49 +1,79 @@
+import logging
 import time
 
+import numpy as np
 from pymba import Frame
 from pymba import Vimba
 
 import eyeloop.config as config
 from eyeloop.importers.importer import IMPORTER
+from eyeloop.importers.live import Frame_Ring
+
+logger = logging.getLogger(__name__)
 
 
 # For pymba documentation, see:
 # https://github.com/morefigs/pymba
 
 class Importer(IMPORTER):
+    """
+    One persistent Vimba session: the camera (--camera) is opened and configured once (--exposure, --camera_fps),
+    armed for continuous acquisition with --vimba_buffers announced frame buffers, and closed at release.
+    The frame callback copies the frame into a latest-frame-wins ring (--ring_size; see eyeloop.importers.live)
+    and returns, so Vimba requeues its buffer at once. Tracking always takes the newest frame: frames replaced
+    before tracking took them are skipped and counted (per frame in the datalog, "skipped"). Gaps in the camera
+    frame IDs (frames the camera had no free buffer for) are counted in missed, which is logged at release.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        self.ring = Frame_Ring(config.arguments.ring_size)
+        self.last_id = None
+        self.missed = 0
+
+    def configure(self, camera) -> None:
+        camera.ExposureAuto = "Off"
+        camera.ExposureTime = config.arguments.exposure  # play around with this if exposure is too low
+        camera.AcquisitionFrameRateMode = 'Basic'
+
+        if config.arguments.camera_fps > 0:
+            camera.AcquisitionFrameRate = config.arguments.camera_fps
+        else:
+            max_fps = camera.AcquisitionFrameRate
+            camera.AcquisitionFrameRate = max_fps
 
-    def first_frame(self) -> None:
-        # load first frame
-        with Vimba() as vimba:
-            camera = vimba.camera(0)
-            camera.open()
-            camera.arm('SingleFrame')
-            frame = camera.acquire_frame()
-            camera.disarm()
+    def acquire_frame(self, frame: Frame) -> None:
+        """
+        Frame callback (Vimba thread): copies the frame into the ring as the newest frame, with its capture timestamps.
+        The camera timestamp is in ns ticks of the camera clock.
+        """
 
+        received = time.monotonic()
         image = frame.buffer_data_numpy()
-        height, width = image.shape
+        np.copyto(self.ring.claim(image.shape, image.dtype), image)
 
-        self.arm(width, height, image)
+        frame_id = frame.data.frameID
+        if self.last_id is not None and frame_id > self.last_id + 1:
+            self.missed += frame_id - self.last_id - 1
+        self.last_id = frame_id
 
-    def acquire_frame(self, frame: Frame, delay: int = 1) -> None:
-        """
-        Routes the capture frame to two destinations:
-        1: EyeLoop for online processing
-        2: frame save for offline processing
+        self.ring.publish(frame.data.timestamp / 1e9, received)
 
-        :param frame: The frame object to display.
-        :param delay: Display delay in milliseconds, use 0 for indefinite.
-        """
+    def first_frame(self) -> None:
+        latest = self.ring.take(config.arguments.camera_timeout)
+        if latest is None:
+            raise ValueError(f"No frames from camera {config.arguments.camera} in {config.arguments.camera_timeout} s.")
 
-        image = frame.buffer_data_numpy()
+        image, capture, received, skipped = latest
+        height, width = image.shape[:2]
 
-        # image = cv2.cvtColor(image,cv2.COLOR_GRAY2RGB)
+        self.arm(width, height, image)
 
+    def proceed(self, image, capture: float, received: float, skipped: int) -> None:
         image = self.resize(image)
-        self.rotate_(image, config.engine.angle)
-        config.engine.iterate(image)
-        self.save(image)
+        config.engine.iterate(image, capture, received, skipped)
+        self.save_(image, capture, received)
 
         self.frame += 1
 
@@ -51,30 +81,32 @@ class Importer(IMPORTER):
         self.live = False
 
     def route(self) -> None:
-        self.first_frame()
-
         with Vimba() as vimba:
-            camera = vimba.camera(0)
-
+            camera = vimba.camera(config.arguments.camera)
             camera.open()
 
-            camera.ExposureTime = 200  # play around with this if exposure is too low
-            camera.ExposureAuto = "Off"
-            camera.AcquisitionFrameRateMode = 'Basic'
+            try:
+                self.configure(camera)
 
-            max_fps = camera.AcquisitionFrameRate
-            camera.AcquisitionFrameRate = max_fps
+                # arm the camera and provide a function to be called upon frame ready
+                camera.arm('Continuous', self.acquire_frame, frame_buffer_count=config.arguments.vimba_buffers)
+                camera.start_frame_acquisition()
 
-            # arm the camera and provide a function to be called upon frame ready
-            camera.arm('Continuous', self.acquire_frame)
-            camera.start_frame_acquisition()
+                try:
+                    self.first_frame()
 
-            while self.live:
-                time.sleep(0.1)
+                    while self.live:
+                        latest = self.ring.take(.1)
+                        if latest is not None:
+                            self.proceed(*latest)
 
-            print("Terminating capture...")
+                finally:
+                    print("Terminating capture...")
+                    camera.stop_frame_acquisition()
+                    camera.disarm()
 
-            camera.stop_frame_acquisition()
-            camera.disarm()
+            finally:
+                camera.close()
 
-            camera.close()
+        logger.info(f"vimba: {self.frame} frames tracked, {self.ring.skipped} skipped for newer frames, "
+                    f"{self.missed} missed by the camera")
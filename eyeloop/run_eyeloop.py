@@ -2,15 +2,13 @@ import importlib
 import logging
 import sys
 from pathlib import Path
-import tkinter as tk
-from tkinter import filedialog
 import os
 import numpy as np
 
 import eyeloop.config as config
 from eyeloop.engine.engine import Engine
-from eyeloop.extractors.DAQ import DAQ_extractor
-from eyeloop.extractors.frametimer import FPS_extractor
+from eyeloop.extractors.DAQ import Binary_DAQ_extractor, DAQ_extractor
+from eyeloop.extractors.telemetry import Telemetry_extractor
 
 from eyeloop.utilities.argument_parser import Arguments
 from eyeloop.utilities.file_manager import File_Manager
@@ -35,7 +33,9 @@ class EyeLoop:
         welcome("Server")
 
         config.arguments = Arguments(args)
-        config.file_manager = File_Manager(output_root=config.arguments.output_dir, img_format = config.arguments.img_format)
+        config.file_manager = File_Manager(output_root=config.arguments.output_dir, img_format = config.arguments.img_format,
+                                          save_workers=config.arguments.save_workers, save_buffer=config.arguments.save_buffer,
+                                          save_policy=config.arguments.save_policy, save_format=config.arguments.save_format)
         if logger is None:
             logger, logger_filename = setup_logging(log_dir=config.file_manager.new_folderpath, module_name="run_eyeloop")
 
@@ -51,23 +51,37 @@ class EyeLoop:
         self.run_importer()
 
     def run(self):
+        if config.arguments.workers > 0:
+            from eyeloop.engine.parallel import track_parallel
+            track_parallel(config.arguments.workers)
+            return
+
         #try:
         #    config.blink = np.load(f"{EYELOOP_DIR}/blink_.npy")[0] * .8
         #except:
         #    print("\n(!) NO BLINK DETECTION. Run 'eyeloop --blink 1' to calibrate\n")
 
 
-        from eyeloop.guis.minimum.minimum_gui import GUI
+        if config.arguments.headless:
+            from eyeloop.guis.headless import GUI
+        else:
+            from eyeloop.guis.minimum.minimum_gui import GUI
         config.graphical_user_interface = GUI()
 
         config.engine = Engine(self)
 
-        fps_counter = FPS_extractor()
-        data_acquisition = DAQ_extractor(config.file_manager.new_folderpath)
+        telemetry = Telemetry_extractor(config.file_manager.new_folderpath, interval=config.arguments.telemetry_interval)
+        if config.arguments.datalog == "binary":
+            data_acquisition = Binary_DAQ_extractor(config.file_manager.new_folderpath)
+        else:
+            data_acquisition = DAQ_extractor(config.file_manager.new_folderpath)
 
         file_path = config.arguments.extractors
 
-        if file_path == "p":
+        if file_path == "p" and not config.arguments.headless:
+            import tkinter as tk
+            from tkinter import filedialog
+
             root = tk.Tk()
             root.withdraw()
             file_path = filedialog.askopenfilename()
@@ -86,7 +100,7 @@ class EyeLoop:
             except Exception as e:
                 logger.info(f"extractors not included, {e}")
 
-        extractors_base = [fps_counter, data_acquisition]
+        extractors_base = [telemetry, data_acquisition]
         extractors = extractors_add + extractors_base
 
         config.engine.load_extractors(extractors)
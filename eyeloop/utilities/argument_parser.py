@@ -66,7 +66,112 @@ class Arguments:
         parser.add_argument("-b", "--blink", default="", type=str,
                             help="Load blink calibration file (.npy)")
 
-        return parser.parse_args(args)
+        parser.add_argument("-br", "--blink_roi", default=0, type=int,
+                            help="Detect blinks inside a window of this radius around the selected pupil instead of the full frame (default = 0, full frame)")
+
+        parser.add_argument("-roi", "--roi", default=0, type=int,
+                            help="Track inside a window around the last fit instead of the full frame (yes/no, 1/0; default = 0)")
+
+        parser.add_argument("-roim", "--roi_margin", default=10, type=int,
+                            help="Margin added to the tracking window in pixels (default = 10)")
+
+        parser.add_argument("-pr", "--pupil_rays", default=32, type=int,
+                            help="Number of walkout rays for the pupil; multiple of 4, at least 16 (ellipsoid) or 8 (circular) (default = 32)")
+
+        parser.add_argument("-crr", "--cr_rays", default=4, type=int,
+                            help="Number of walkout rays for the corneal reflections; multiple of 4 (default = 4)")
+
+        parser.add_argument("-dl", "--datalog", default="json", type=str,
+                            help="Datalog format: json (json-lines) or binary (fixed-dtype records, see eyeloop.utilities.datalog) (default = json)")
+
+        parser.add_argument("-svf", "--save_format", default="img", type=str,
+                            help="Save frames as images (img, see --img_format) or as a raw frame stack (stack, see eyeloop.utilities.frame_stack) (default = img)")
+
+        parser.add_argument("-svw", "--save_workers", default=2, type=int,
+                            help="Threads encoding saved frames in the background (default = 2; 0 = save on the tracking thread)")
+
+        parser.add_argument("-svb", "--save_buffer", default=64, type=int,
+                            help="Frames buffered for the background writers (default = 64)")
+
+        parser.add_argument("-svp", "--save_policy", default="block", type=str,
+                            help="When the save buffer is full: block, drop (counted) or spill (raw to disk, encoded at the end) (default = block)")
+
+        parser.add_argument("-pl", "--pipeline", default=0, type=int,
+                            help="Decode, track and save frames in separate threads (cv importer; yes/no, 1/0; default = 0)")
+
+        parser.add_argument("-qs", "--queue_size", default=8, type=int,
+                            help="Frames buffered between pipeline stages (default = 8)")
+
+        parser.add_argument("-pf", "--prefetch", default=8, type=int,
+                            help="Image sequence frames decoded ahead of tracking (default = 8; 0 = decode on the tracking thread)")
+
+        parser.add_argument("-rdw", "--read_workers", default=2, type=int,
+                            help="Threads decoding prefetched image sequence frames (default = 2)")
+
+        parser.add_argument("-rs", "--ring_size", default=4, type=int,
+                            help="Frame slots of live capture (webcam, vimba); tracking takes the newest frame (default = 4, at least 3)")
+
+        parser.add_argument("-cam", "--camera", default=0, type=int,
+                            help="Index of the Vimba camera (vimba importer; default = 0)")
+
+        parser.add_argument("-et", "--exposure", default=200, type=float,
+                            help="Exposure time of the Vimba camera in microseconds (default = 200)")
+
+        parser.add_argument("-cfps", "--camera_fps", default=0, type=float,
+                            help="Frame rate of the Vimba camera (default = 0: the camera maximum)")
+
+        parser.add_argument("-vb", "--vimba_buffers", default=8, type=int,
+                            help="Frame buffers announced to the Vimba camera (default = 8)")
+
+        parser.add_argument("-cto", "--camera_timeout", default=5, type=float,
+                            help="Seconds to wait for the first camera frame (default = 5)")
+
+        parser.add_argument("-exq", "--extractor_queue", default=64, type=int,
+                            help="Samples buffered for each threaded or subprocess extractor (default = 64)")
+
+        parser.add_argument("-exp", "--extractor_policy", default="drop", type=str,
+                            help="When an extractor queue is full: block (wait) or drop (default = drop); extractors may override")
+
+        parser.add_argument("-ti", "--timing_interval", default=30, type=float,
+                            help="Log the timing of the tracking stages every n seconds (default = 30; 0 = off)")
+
+        parser.add_argument("-tmi", "--telemetry_interval", default=1, type=float,
+                            help="Append throughput and latency telemetry to telemetry.json every n seconds (default = 1)")
+
+        parser.add_argument("-hl", "--headless", default=0, type=int,
+                            help="Track without a display: no preview, tracking starts at the seeds (yes/no, 1/0; default = 0)")
+
+        parser.add_argument("-ps", "--pupil_seed", default="", type=str,
+                            help="Pupil seed point x,y for headless tracking (default: center saved in --params)")
+
+        parser.add_argument("-crs", "--cr_seed", default="", type=str,
+                            help="Corneal reflection seed point x,y for headless tracking (default: center saved in --params)")
+
+        parser.add_argument("-crs2", "--cr2_seed", default="", type=str,
+                            help="Second corneal reflection seed point x,y for headless tracking (default: center saved in --params)")
+
+        parser.add_argument("-pt", "--pupil_threshold", default=-1, type=float,
+                            help="Pupil binarization threshold; overrides --params and the estimate from the first frame (default = -1: off)")
+
+        parser.add_argument("-ct", "--cr_threshold", default=-1, type=float,
+                            help="Corneal reflection binarization threshold; overrides --params and the estimate from the first frame (default = -1: off)")
+
+        parser.add_argument("-wk", "--workers", default=0, type=int,
+                            help="Track a video file or image sequence offline in parallel on n worker processes; needs seeds, see --headless (default = 0: off)")
+
+        parser.add_argument("-chs", "--chunk_size", default=0, type=int,
+                            help="Frames per parallel chunk (default = 0: four chunks per worker)")
+
+        parsed_args = parser.parse_args(args)
+
+        # the ellipse fit needs at least 16 walkout rays, the circle fit 8
+        min_pupil_rays = 8 if parsed_args.model.lower() == "circular" else 16
+        for flag, rays, minimum in (("--pupil_rays", parsed_args.pupil_rays, min_pupil_rays),
+                                    ("--cr_rays", parsed_args.cr_rays, 4)):
+            if rays < minimum or rays % 4 != 0:
+                parser.error(f"{flag} must be a multiple of 4 and at least {minimum} (got {rays})")
+
+        return parsed_args
 
     def build_config(self, parsed_args):
         self.config = parsed_args.config
@@ -89,6 +194,38 @@ class Arguments:
         self.clear = parsed_args.clear
         self.params = parsed_args.params
         self.blinkcalibration = parsed_args.blink
+        self.blink_roi = parsed_args.blink_roi
+        self.roi = parsed_args.roi
+        self.roi_margin = parsed_args.roi_margin
+        self.pupil_rays = parsed_args.pupil_rays
+        self.cr_rays = parsed_args.cr_rays
+        self.datalog = parsed_args.datalog.lower()
+        self.save_format = parsed_args.save_format.lower()
+        self.save_workers = parsed_args.save_workers
+        self.save_buffer = parsed_args.save_buffer
+        self.save_policy = parsed_args.save_policy.lower()
+        self.pipeline = parsed_args.pipeline
+        self.queue_size = parsed_args.queue_size
+        self.prefetch = parsed_args.prefetch
+        self.read_workers = parsed_args.read_workers
+        self.ring_size = parsed_args.ring_size
+        self.camera = parsed_args.camera
+        self.exposure = parsed_args.exposure
+        self.camera_fps = parsed_args.camera_fps
+        self.vimba_buffers = parsed_args.vimba_buffers
+        self.camera_timeout = parsed_args.camera_timeout
+        self.extractor_queue = parsed_args.extractor_queue
+        self.extractor_policy = parsed_args.extractor_policy.lower()
+        self.timing_interval = parsed_args.timing_interval
+        self.telemetry_interval = parsed_args.telemetry_interval
+        self.headless = parsed_args.headless
+        self.pupil_seed = parsed_args.pupil_seed
+        self.cr_seed = parsed_args.cr_seed
+        self.cr2_seed = parsed_args.cr2_seed
+        self.pupil_threshold = parsed_args.pupil_threshold
+        self.cr_threshold = parsed_args.cr_threshold
+        self.workers = parsed_args.workers
+        self.chunk_size = parsed_args.chunk_size
         #self.blink = parsed_args.blink
 
     def parse_config(self, config: str) -> None:
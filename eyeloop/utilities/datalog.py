@@ -0,0 +1,189 @@
+"""
+Binary datalog (--datalog binary).
+Each time-step is a fixed-dtype record, appended to datalog.bin in blocks.
+The dtype is stored in the sidecar schema datalog.schema.json,
+and binary datalogs convert back to the json-lines datalog:
+
+    python -m eyeloop.utilities.datalog datalog.bin [datalog.json]
+
+Absent values are NaN (frame, skipped: -1, blink: 0), and are left out of the converted entries.
+Keys added to dataout by custom extractors are not stored.
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+DATALOG_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("frame", "<i8"),
+    ("blink", "u1"),
+    ("pupil_x", "<f8"),
+    ("pupil_y", "<f8"),
+    ("pupil_width", "<f8"),
+    ("pupil_height", "<f8"),
+    ("pupil_angle", "<f8"),
+    ("cr_1_x", "<f8"),
+    ("cr_1_y", "<f8"),
+    ("cr_2_x", "<f8"),
+    ("cr_2_y", "<f8"),
+    ("capture", "<f8"),
+    ("received", "<f8"),
+    ("completed", "<f8"),
+    ("skipped", "<i8"),
+])
+
+SCHEMA_VERSION = 1
+
+TIMESTAMPS = ("capture", "received", "completed")
+
+nan = float("nan")
+
+
+def schema_path(path: Union[Path, str]) -> Path:
+    return Path(path).with_suffix(".schema.json")
+
+
+def center(params) -> tuple:
+    """
+    (x, y) of corneal reflection params: (x, y), or ((x, y), width, height, angle) of a fitted model.
+    """
+
+    if params is None:
+        return nan, nan
+    if len(params) == 4:
+        params = params[0]
+    return params[0], params[1]
+
+
+def to_record(dataout: dict) -> tuple:
+    try:
+        (pupil_x, pupil_y), pupil_width, pupil_height, pupil_angle = dataout["pupil"]
+    except (KeyError, TypeError, ValueError):
+        pupil_x = pupil_y = pupil_width = pupil_height = pupil_angle = nan
+
+    return (dataout.get("time", nan), dataout.get("frame", -1), dataout.get("blink", 0) == 1,
+            pupil_x, pupil_y, pupil_width, pupil_height, pupil_angle,
+            *center(dataout.get("cr_1")), *center(dataout.get("cr_2")),
+            *(dataout.get(timestamp, nan) for timestamp in TIMESTAMPS), dataout.get("skipped", -1))
+
+
+def to_entry(record: np.void) -> dict:
+    """
+    The json-lines entry of a record, with the keys and nesting of Engine.dataout.
+    """
+
+    entry = {"time": float(record["time"])}
+
+    if record["frame"] >= 0:
+        entry["frame"] = int(record["frame"])
+    if record["blink"]:
+        entry["blink"] = 1
+
+    if not np.isnan(record["pupil_x"]):
+        entry["pupil"] = [[float(record["pupil_x"]), float(record["pupil_y"])], float(record["pupil_width"]),
+                          float(record["pupil_height"]), float(record["pupil_angle"])]
+
+    for cr in ("cr_1", "cr_2"):
+        if not np.isnan(record[f"{cr}_x"]):
+            entry[cr] = [float(record[f"{cr}_x"]), float(record[f"{cr}_y"])]
+
+    for timestamp in TIMESTAMPS:
+        if not np.isnan(record[timestamp]):
+            entry[timestamp] = float(record[timestamp])
+
+    if record["skipped"] >= 0:
+        entry["skipped"] = int(record["skipped"])
+
+    return entry
+
+
+class Binary_Datalog:
+    """
+    Appends dataout dictionaries to a binary datalog. Records are collected in a preallocated block,
+    which is written to disk in one call when full, and on close().
+    """
+
+    def __init__(self, path: Union[Path, str], block_size: int = 4096) -> None:
+        self.path = Path(path)
+        self.block = np.zeros(block_size, dtype=DATALOG_DTYPE)
+        self.n = 0
+
+        schema = {
+            "format": "eyeloop binary datalog",
+            "version": SCHEMA_VERSION,
+            "datalog": self.path.name,
+            "dtype": DATALOG_DTYPE.descr
+        }
+        schema_path(self.path).write_text(json.dumps(schema, indent=1))
+
+        self.file = open(self.path, "ab")
+
+    def append(self, dataout: dict) -> None:
+        self.block[self.n] = to_record(dataout)
+        self.n += 1
+
+        if self.n == len(self.block):
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(self.block[:self.n].tobytes())
+        self.file.flush()
+        self.n = 0
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+
+        self.flush()
+        self.file.close()
+
+
+def load(path: Union[Path, str]) -> np.ndarray:
+    """
+    Reads a binary datalog into a structured array, with the dtype of its schema.
+    """
+
+    schema = json.loads(schema_path(path).read_text())
+    if schema.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported datalog schema version {schema.get('version')}")
+
+    dtype = np.dtype([tuple(field) for field in schema["dtype"]])
+    return np.fromfile(path, dtype=dtype)
+
+
+def entries(path: Union[Path, str]) -> list:
+    """
+    Entries of a binary datalog, as loaded from a json-lines datalog.
+    """
+
+    return [to_entry(record) for record in load(path)]
+
+
+def to_json(path: Union[Path, str], json_path: Union[Path, str] = None) -> Path:
+    """
+    Converts a binary datalog to the json-lines datalog (default: same path, .json).
+    """
+
+    json_path = Path(path).with_suffix(".json") if json_path is None else Path(json_path)
+
+    with open(json_path, "w") as datalog:
+        for entry in entries(path):
+            datalog.write(json.dumps(entry) + "\n")
+
+    return json_path
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print("usage: python -m eyeloop.utilities.datalog datalog.bin [datalog.json]")
+        return
+
+    json_path = to_json(*sys.argv[1:3])
+    print(f"Datalog converted to {json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,171 @@
+import collections
+import json
+import logging
+import queue
+import re
+import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Union
 
 import cv2
 import numpy as np
 
+from eyeloop.utilities.frame_stack import Frame_Stack_Writer
+
+logger = logging.getLogger(__name__)
+
+
+class Frame_Writer:
+    """
+    Saves frames on a pool of writer threads (--save_workers), off the tracking thread.
+    Frames wait in a bounded buffer (--save_buffer). When the buffer is full, the policy (--save_policy) decides:
+    - block: wait for a free slot (no frame is lost)
+    - drop: discard the frame and count it
+    - spill: dump the raw frame to disk (no encoding), to be encoded at flush
+    """
+
+    def __init__(self, save, spill_dir: Path, workers: int = 2, buffer_size: int = 64, policy: str = "block") -> None:
+        self.save = save
+        self.spill_dir = spill_dir
+        self.policy = policy
+
+        try:
+            self.put = {"block": self.put_block, "drop": self.put_drop, "spill": self.put_spill}[policy]
+        except KeyError:
+            raise ValueError(f"Unknown save policy {policy}; use block, drop or spill")
+
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.lock = threading.Lock()
+        self.saved = 0
+        self.dropped = []
+        self.spilled = []
+
+        self.workers = [threading.Thread(target=self.run, name=f"frame writer {i}", daemon=True) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def write(self, image: np.ndarray, frame: int, *stamps) -> None:
+        # buffers may be reused by the camera driver once the caller returns
+        if not image.flags.owndata:
+            image = image.copy()
+
+        self.put((image, frame, *stamps))
+
+    def put_block(self, item: tuple) -> None:
+        self.buffer.put(item)
+
+    def put_drop(self, item: tuple) -> None:
+        try:
+            self.buffer.put_nowait(item)
+        except queue.Full:
+            self.dropped.append(item[1])
+
+    def put_spill(self, item: tuple) -> None:
+        try:
+            self.buffer.put_nowait(item)
+        except queue.Full:
+            image, frame = item[:2]
+            self.spill_dir.mkdir(exist_ok=True)
+            np.save(Path(self.spill_dir, f"{frame}.npy"), image)
+            self.spilled.append(frame)
+
+    def run(self) -> None:
+        while True:
+            item = self.buffer.get()
+            try:
+                if item is None:
+                    return
+
+                self.save(*item)
+                with self.lock:
+                    self.saved += 1
+            except Exception:
+                logger.exception(f"failed to save frame {item[1]}")
+            finally:
+                self.buffer.task_done()
+
+    def flush(self) -> dict:
+        """
+        Encodes the spilled frames, waits for the buffer to empty and stops the writers.
+        Returns a report of saved, spilled and dropped frames.
+        """
+
+        for frame in self.spilled:
+            self.put_block((np.load(Path(self.spill_dir, f"{frame}.npy")), frame))
+
+        self.buffer.join()
+        for _ in self.workers:
+            self.buffer.put(None)
+        for worker in self.workers:
+            worker.join()
+
+        if self.spilled:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+        return {"policy": self.policy, "saved": self.saved, "spilled": len(self.spilled), "dropped": self.dropped}
+
+
+class Sequence_Reader:
+    """
+    Reads the frames of an image sequence in grayscale (frame n = paths[n]).
+    Frames are read in order, so the next `prefetch` frames are decoded ahead on a pool of `workers` threads,
+    while the current frame is tracked (OpenCV releases the GIL while decoding). prefetch = 0 decodes on read().
+    Reading out of order discards the prefetched frames and restarts prefetching from the frame read.
+    """
+
+    def __init__(self, paths: list, prefetch: int = 8, workers: int = 2) -> None:
+        self.paths = paths
+        self.prefetch = prefetch
+
+        self.pool = ThreadPoolExecutor(max(workers, 1), thread_name_prefix="prefetch") if prefetch > 0 else None
+        self.pending = collections.deque()  # decoding frames next, next + 1, ...
+        self.next = 0
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def decode(self, frame: int) -> np.ndarray:
+        image = cv2.imread(str(self.paths[frame]), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Failed to read frame {frame} at {self.paths[frame]}")
+        return image
+
+    def fill(self) -> None:
+        while len(self.pending) <= self.prefetch and self.next + len(self.pending) < len(self.paths):
+            self.pending.append(self.pool.submit(self.decode, self.next + len(self.pending)))
+
+    def discard(self) -> None:
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+
+    def read(self, frame: int) -> np.ndarray:
+        if not 0 <= frame < len(self.paths):
+            raise ValueError("No more frames.")
+
+        if self.pool is None:
+            return self.decode(frame)
+
+        if frame != self.next:
+            self.discard()
+            self.next = frame
+
+        self.fill()
+        future = self.pending.popleft()
+        self.next += 1
+        self.fill()
+
+        return future.result()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.discard()
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
 
 class File_Manager:
     """
@@ -12,10 +173,11 @@ class File_Manager:
     - Generates a unique, time-stamped folder
     which extractors may access via file_manager.new_folderpath.
     - Reads image sequences for offline analysis.
-    - Saves images from camera streams.
+    - Saves images from camera streams, as images (--img_format) or as a raw frame stack (--save_format stack).
     """
 
-    def __init__(self, output_root: Union[Path, str], img_format:str) -> None:
+    def __init__(self, output_root: Union[Path, str], img_format:str, save_workers: int = 0, save_buffer: int = 64,
+                 save_policy: str = "block", save_format: str = "img") -> None:
         self.output_root = output_root
         self.input_folderpath = ""
         self.img_format = img_format
@@ -28,23 +190,104 @@ class File_Manager:
         self.new_folderpath.mkdir(exist_ok=True)
         print(f"Outputting data to {self.new_folderpath}")  # TODO convert to logging call
 
-    def save_image(self, image: np.ndarray, frame: int) -> None:
+        # Applied to frames by the frame writers before they are written (e.g. the rotation of --rotation 1).
+        self.transform = None
+
+        # A frame stack is appended in frame order, by a single writer; spilling gains nothing over appending raw frames.
+        self.stack = None
+        self.write = self.write_image
+        if save_format == "stack":
+            self.stack = Frame_Stack_Writer(Path(self.new_folderpath, "frames.stack.json"))
+            self.write = self.stack.append
+            save_workers = min(save_workers, 1)
+            if save_policy == "spill":
+                save_policy = "block"
+        elif save_format != "img":
+            raise ValueError(f"Unknown save format {save_format}; use img or stack")
+
+        # Frames are saved synchronously without writers (--save_workers 0), and after flush().
+        self.writer = None
+        if save_workers > 0:
+            self.writer = Frame_Writer(self.write_frame, Path(self.new_folderpath, "spill"), save_workers, save_buffer,
+                                       save_policy)
+
+    def __getstate__(self) -> dict:
+        # writer threads stay in their process
+        state = self.__dict__.copy()
+        state["writer"] = None
+        return state
+
+    def save_image(self, image: np.ndarray, frame: int, *stamps) -> None:
         """
-        Saves video sequence to new folderpath.
+        Saves video sequence to new folderpath, via the frame writers if any.
+        The (capture, received) timestamps of the frame are kept by frame stacks.
         """
+        if self.writer is None:
+            self.write_frame(image, frame, *stamps)
+        else:
+            self.writer.write(image, frame, *stamps)
+
+    def write_frame(self, image: np.ndarray, frame: int, *stamps) -> None:
+        if self.transform is not None:
+            image = self.transform(image)
+        self.write(image, frame, *stamps)
+
+    def write_image(self, image: np.ndarray, frame: int, *_) -> None:
         img_pth = Path(self.new_folderpath, self.img_format.replace("$", str(frame), 1))
         cv2.imwrite(str(img_pth), image)
 
-    def read_image(self, frame: int) -> np.ndarray:
+    def flush(self) -> None:
         """
-        Reads video sequence from the input folderpath.
-        Command-line argument -v [dir] sets this vid_path.
+        Waits for the frame writers to save all buffered frames and reports dropped frames.
+        The frame numbers of dropped frames are saved to dropped_frames.json.
         """
+        if self.writer is None:
+            self.close_stack()
+            return
 
-        img_pth = Path(self.input_folderpath, self.img_format.replace("$", str(frame), 1))
-        image=cv2.imread(str(img_pth))
+        writer, self.writer = self.writer, None
+        report = writer.flush()
 
-        if image is None:
-            raise ValueError("No more frames.")
+        logger.info(f"frame writers flushed: {report['saved']} frames saved ({report['spilled']} spilled), "
+                    f"{len(report['dropped'])} dropped (--save_policy {report['policy']})")
+
+        if report["dropped"]:
+            Path(self.new_folderpath, "dropped_frames.json").write_text(json.dumps(report["dropped"]))
+            print(f"(!) {len(report['dropped'])} frames were not saved; see dropped_frames.json")
+
+        self.close_stack()
+
+    def close_stack(self) -> None:
+        if self.stack is None:
+            return
+
+        stack, self.stack = self.stack, None
+        stack.close()
+        logger.info(f"frame stack: {stack.frames} frames saved to {stack.header_path}")
+
+    def sequence_paths(self) -> list:
+        """
+        Paths of the image sequence (--img_format) in the input folderpath: frames 0, 1, ... up to the first missing frame.
+        The folder is listed once, instead of probing for every frame.
+        """
+
+        head, _, tail = self.img_format.partition("$")
+        pattern = re.compile(re.escape(head) + r"(0|[1-9][0-9]*)" + re.escape(tail))
+
+        found = {}
+        for path in Path(self.input_folderpath).iterdir():
+            match = pattern.fullmatch(path.name)
+            if match is not None:
+                found[int(match.group(1))] = path
+
+        paths = []
+        while len(paths) in found:
+            paths.append(found[len(paths)])
+        return paths
+
+    def open_sequence(self, prefetch: int = 8, workers: int = 2) -> Sequence_Reader:
+        """
+        Reader of the image sequence in the input folderpath, decoding frames in grayscale ahead of reading.
+        """
 
-        return np.array(image)
+        return Sequence_Reader(self.sequence_paths(), prefetch, workers)
@@ -0,0 +1,168 @@
+"""
+Raw frame stacks (--save_format stack).
+Saved frames are appended uncompressed to frames.raw, in blocks of several MB, and their
+(frame, capture, received) timestamps to frames.times. The header frames.stack.json stores the
+frame shape and dtype, the number of frames and the mean frame rate.
+
+Frame stacks are read by memory-mapping frames.raw (see Frame_Stack, and the stack importer):
+no frame is decoded, and any frame is read at its offset, so re-tracking a session is bound by
+memory bandwidth instead of by decoding. To re-track a recording:
+
+    eyeloop --importer stack --video [trial folder]/frames.stack.json
+"""
+import json
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+STACK_VERSION = 1
+STACK_SUFFIX = ".stack.json"
+
+TIMES_DTYPE = np.dtype([
+    ("frame", "<i8"),
+    ("capture", "<f8"),
+    ("received", "<f8"),
+])
+
+nan = float("nan")
+
+
+def is_stack(path: Union[Path, str]) -> bool:
+    return Path(path).name.endswith(STACK_SUFFIX)
+
+
+def stack_paths(path: Union[Path, str]) -> tuple:
+    """
+    (header, frames, times) paths of the frame stack with this header, or raw frames path.
+    """
+
+    path = Path(path)
+    stem = path.name[:-len(STACK_SUFFIX)] if is_stack(path) else path.stem
+    return (path.with_name(stem + STACK_SUFFIX), path.with_name(stem + ".raw"), path.with_name(stem + ".times"))
+
+
+def mean_fps(times: np.ndarray) -> float:
+    """
+    Mean frame rate, from the capture timestamps if known, else from the received timestamps. NaN if unknown.
+    """
+
+    for clock in ("capture", "received"):
+        stamps = times[clock][np.isfinite(times[clock])]
+        if len(stamps) > 1 and stamps[-1] > stamps[0]:
+            return float((len(stamps) - 1) / (stamps[-1] - stamps[0]))
+    return nan
+
+
+class Frame_Stack_Writer:
+    """
+    Appends frames to a frame stack. Frames are collected in a preallocated block of about block_bytes,
+    which is written to disk in one call when full, and on close().
+    The block is allocated, and the header written, with the shape and dtype of the first frame.
+    """
+
+    def __init__(self, path: Union[Path, str], block_bytes: int = 16 * 2 ** 20) -> None:
+        self.header_path, self.frames_path, self.times_path = stack_paths(path)
+        self.block_bytes = block_bytes
+
+        self.block = None
+        self.times = None
+        self.n = 0
+        self.frames = 0
+
+        self.frames_file = None
+        self.times_file = None
+
+    def open(self, image: np.ndarray) -> None:
+        self.shape = image.shape
+        self.dtype = image.dtype
+
+        block_size = max(self.block_bytes // image.nbytes, 1)
+        self.block = np.empty((block_size, *image.shape), dtype=image.dtype)
+        self.times = np.empty(block_size, dtype=TIMES_DTYPE)
+
+        self.write_header()
+        self.frames_file = open(self.frames_path, "wb")
+        self.times_file = open(self.times_path, "wb")
+
+    def write_header(self, fps: float = nan) -> None:
+        header = {
+            "format": "eyeloop frame stack",
+            "version": STACK_VERSION,
+            "frames": self.frames,
+            "shape": list(self.shape),
+            "dtype": self.dtype.str,
+            "fps": None if np.isnan(fps) else fps,
+            "raw": self.frames_path.name,
+            "times": self.times_path.name,
+            "times_dtype": TIMES_DTYPE.descr
+        }
+        self.header_path.write_text(json.dumps(header, indent=1))
+
+    def append(self, image: np.ndarray, frame: int, capture: float = None, received: float = None) -> None:
+        if self.block is None:
+            self.open(image)
+        elif image.shape != self.shape:
+            raise ValueError(f"Frame {frame} has shape {image.shape}; the frame stack has {self.shape}")
+
+        self.block[self.n] = image
+        self.times[self.n] = (frame, nan if capture is None else capture, nan if received is None else received)
+        self.n += 1
+
+        if self.n == len(self.block):
+            self.flush()
+
+    def flush(self) -> None:
+        if self.n == 0:
+            return
+
+        self.frames_file.write(self.block[:self.n].data)
+        self.times_file.write(self.times[:self.n].data)
+
+        self.frames += self.n
+        self.n = 0
+
+    def close(self) -> None:
+        if self.frames_file is None or self.frames_file.closed:
+            return
+
+        self.flush()
+        self.frames_file.close()
+        self.times_file.close()
+
+        self.write_header(mean_fps(np.fromfile(self.times_path, dtype=TIMES_DTYPE)))
+
+
+class Frame_Stack:
+    """
+    A frame stack, read by memory-mapping its raw frames: frames[n] is frame n, without decoding or copying.
+    The frame count is taken from the size of the raw frames, so stacks of interrupted recordings load too.
+    """
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        self.header_path, self.frames_path, self.times_path = stack_paths(path)
+
+        self.header = json.loads(self.header_path.read_text())
+        if self.header.get("version") != STACK_VERSION:
+            raise ValueError(f"Unsupported frame stack version {self.header.get('version')}")
+
+        self.shape = tuple(self.header["shape"])
+        self.dtype = np.dtype(self.header["dtype"])
+        self.fps = self.header["fps"]
+
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        count = self.frames_path.stat().st_size // frame_bytes
+
+        self.frames = np.memmap(self.frames_path, dtype=self.dtype, mode="r", shape=(count, *self.shape)) \
+            if count > 0 else np.empty((0, *self.shape), dtype=self.dtype)
+        self.times = np.fromfile(self.times_path, dtype=TIMES_DTYPE, count=count)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, frame: int) -> np.ndarray:
+        return self.frames[frame]
+
+    def close(self) -> None:
+        # the file is unmapped once no frame views remain
+        self.frames = self.frames[:0]
@@ -3,6 +3,7 @@ from tkinter import filedialog
 
 import numpy as np
 from eyeloop.extractors.converter import Conversion_extractor
+from eyeloop.utilities import datalog
 
 class Parser():
     data = []
@@ -13,7 +14,15 @@ class Parser():
 
     def load_log(self, file_path="") -> None:
         if file_path == "":
-            file_path = filedialog.askopenfilename(filetypes=(("json files", "*.json"), ("all files", "*.*")))
+            file_path = filedialog.askopenfilename(filetypes=(("json files", "*.json"), ("binary datalogs", "*.bin"), ("all files", "*.*")))
+
+        if str(file_path).endswith(".bin"):  # binary datalog (--datalog binary)
+            try:
+                self.data.extend(datalog.entries(file_path))
+            except FileNotFoundError:
+                raise ValueError("Please select a valid log.")
+            self.file_path = file_path
+            return
 
         try:
             file = open(file_path, "r")
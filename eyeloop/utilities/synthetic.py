@@ -0,0 +1,323 @@
+"""
+Synthetic eye videos with ground truth, for checking the accuracy of the tracking without recordings.
+Frames show a dark elliptical pupil inside an iris, one or two corneal reflections, an upper eyelid and blinks,
+with noise and blur. The pupil moves on a Lissajous path, dilates and rotates; the reflections follow it partly.
+
+    python -m eyeloop.utilities.synthetic [output.avi or folder] --frames 300 --width 640 --height 480
+
+The ground truth is written next to the frames (ground_truth.json), one json line per frame:
+{"frame", "time", "blink", "occlusion", "pupil": [[x, y], width, height, angle], "cr_1": [x, y], ...}
+with the semi-axes and angle (degrees) of the pupil ellipse as in the ellipsoid model.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+SHIFT = 4  # sub-pixel bits of the drawing coordinates of the iris and eyelid
+SUBSAMPLES = 4  # per pixel side, for the exact coverage of the pupil and reflections
+
+background = 140
+iris = 100
+pupil = 25
+reflection = 250
+skin = 190
+
+
+def fixed(value) -> int:
+    return int(round(value * (1 << SHIFT)))
+
+
+def paint_ellipse(image: np.ndarray, center: tuple, axes: tuple, angle: float, value: float) -> None:
+    """
+    Blends value into the float image by the exact (subsampled) coverage of each pixel by the ellipse.
+    Pixel centers lie at integer coordinates. cv2.ellipse is not used, since it draws about half a pixel too wide.
+    """
+
+    x, y = center
+    reach = max(axes) + 1
+    x0, x1 = max(int(x - reach), 0), min(int(x + reach) + 2, image.shape[1])
+    y0, y1 = max(int(y - reach), 0), min(int(y + reach) + 2, image.shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    offsets = (np.arange(SUBSAMPLES) + .5) / SUBSAMPLES - .5
+    xs = (np.arange(x0, x1)[:, np.newaxis] + offsets).ravel() - x
+    ys = (np.arange(y0, y1)[:, np.newaxis] + offsets).ravel() - y
+
+    phi = np.deg2rad(angle)
+    u = xs[np.newaxis, :] * np.cos(phi) + ys[:, np.newaxis] * np.sin(phi)
+    v = -xs[np.newaxis, :] * np.sin(phi) + ys[:, np.newaxis] * np.cos(phi)
+    inside = (u / axes[0]) ** 2 + (v / axes[1]) ** 2 <= 1
+
+    coverage = inside.reshape(y1 - y0, SUBSAMPLES, x1 - x0, SUBSAMPLES).mean(axis=(1, 3))
+    window = image[y0:y1, x0:x1]
+    window += (value - window) * coverage
+
+
+class Synthetic_Eye:
+    """
+    Renders the frames of a synthetic eye video and their ground truth.
+    - eyelid: fraction of the pupil height covered by the upper eyelid when the eye is open
+      (0: the eyelid rests above the eye)
+    - blinks: first frames of blinks, each closing and opening the eyelid over blink_frames;
+      frames with at least half of the pupil covered are blinks in the ground truth
+    - motion: amplitude of the pupil path, as a fraction of the frame height
+    """
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 120., frames: int = 300,
+                 pupil_radius: float = None, crs: int = 1, noise: float = 3., blur: float = 1., eyelid: float = 0.,
+                 blinks: tuple = (), blink_frames: int = 8, motion: float = .1, seed: int = 0) -> None:
+        self.width, self.height = width, height
+        self.fps = fps
+        self.frames = frames
+        self.pupil_radius = min(width, height) / 10 if pupil_radius is None else pupil_radius
+        self.crs = crs
+        self.noise = noise
+        self.blur = blur
+        self.eyelid = eyelid
+        self.blinks = tuple(blinks)
+        self.blink_frames = blink_frames
+        self.motion = motion
+        self.seed = seed
+
+        self.center = np.array((width / 2, height / 2))
+
+    def closure(self, frame: int) -> float:
+        """
+        Closure of the eyelid by blinks, from 0 (open) to 1 (closed).
+        """
+
+        closure = 0.
+        for start in self.blinks:
+            phase = (frame - start) / self.blink_frames
+            if 0 <= phase < 1:
+                closure = max(closure, 1 - abs(2 * phase - 1))
+
+        return closure
+
+    def lid_edge(self, frame: int, x: float, y: float) -> float:
+        """
+        Height of the eyelid edge at column x, for the pupil at (x, y).
+        The edge rests above the eye, or covering the eyelid fraction of the pupil, and closes below the pupil.
+        """
+
+        radius = self.pupil_radius
+        if self.eyelid > 0:
+            rest = y - radius + 2 * radius * self.eyelid
+        else:
+            rest = self.center[1] - 3.5 * radius - self.motion * self.height
+        closed = y + 3 * radius
+
+        edge = rest + (closed - rest) * self.closure(frame)
+        return edge - self.curvature(x)
+
+    def curvature(self, x):
+        return ((x - self.center[0]) / self.width) ** 2 * self.height * .5
+
+    def ground_truth(self, frame: int) -> dict:
+        t = frame / self.fps
+        amplitude = self.motion * self.height
+
+        offset = amplitude * np.array((np.sin(2 * np.pi * .5 * t), .7 * np.sin(2 * np.pi * .8 * t + 1)))
+        x, y = self.center + offset
+
+        radius = self.pupil_radius * (1 + .15 * np.sin(2 * np.pi * .3 * t))
+        width, height = radius, radius * (.85 + .1 * np.cos(2 * np.pi * .2 * t))
+        angle = (30 + 20 * np.sin(2 * np.pi * .1 * t)) % 360
+
+        occlusion = np.clip((self.lid_edge(frame, x, y) - (y - radius)) / (2 * radius), 0, 1)
+        truth = {
+            "frame": frame,
+            "time": t,
+            "blink": int(occlusion >= .5),
+            "occlusion": float(occlusion),
+            "pupil": [[float(x), float(y)], float(width), float(height), float(angle)]
+        }
+
+        for n in range(1, self.crs + 1):
+            side = -1 if n == 1 else 1
+            cr = self.center + .3 * offset + (side * .25 * self.pupil_radius, -.25 * self.pupil_radius)
+            truth[f"cr_{n}"] = [float(cr[0]), float(cr[1])]
+
+        return truth
+
+    def render(self, frame: int, truth: dict = None) -> np.ndarray:
+        if truth is None:
+            truth = self.ground_truth(frame)
+
+        image = np.full((self.height, self.width), background, dtype=np.float32)
+        cv2.circle(image, (fixed(self.center[0]), fixed(self.center[1])), fixed(self.pupil_radius * 2.5), iris, -1,
+                   cv2.LINE_AA, SHIFT)
+
+        (x, y), width, height, angle = truth["pupil"]
+        paint_ellipse(image, (x, y), (width, height), angle, pupil)
+
+        cr_radius = max(self.pupil_radius / 8, 2)
+        for n in range(1, self.crs + 1):
+            paint_ellipse(image, truth[f"cr_{n}"], (cr_radius, cr_radius), 0, reflection)
+
+        # upper eyelid: skin above a downward-curved edge
+        edge = self.lid_edge(frame, self.center[0], y)
+        xs = np.arange(0, self.width + 9, 8)
+        polygon = np.vstack((np.column_stack((xs, edge - self.curvature(xs))), ((xs[-1], -1), (0, -1))))
+        cv2.fillPoly(image, [np.round(polygon * (1 << SHIFT)).astype(np.int32)], skin, cv2.LINE_AA, SHIFT)
+
+        if self.blur > 0:
+            image = cv2.GaussianBlur(image, (0, 0), self.blur)
+
+        if self.noise > 0:
+            image += np.random.default_rng((self.seed, frame)).normal(0, self.noise, image.shape).astype(np.float32)
+
+        return np.clip(np.round(image), 0, 255).astype(np.uint8)
+
+    def __iter__(self):
+        """
+        Yields (image, ground truth) of every frame.
+        """
+
+        for frame in range(self.frames):
+            truth = self.ground_truth(frame)
+            yield self.render(frame, truth), truth
+
+    def arrays(self) -> tuple:
+        """
+        All frames as an array of shape (frames, height, width), and the list of ground truths.
+        """
+
+        images = np.empty((self.frames, self.height, self.width), dtype=np.uint8)
+        truths = []
+        for frame, (image, truth) in enumerate(self):
+            images[frame] = image
+            truths.append(truth)
+
+        return images, truths
+
+    def write_video(self, path: Union[Path, str], codec: str = "MJPG") -> Path:
+        """
+        Writes the frames to a video file and the ground truth to ground_truth.json in its folder.
+        Lossy codecs blur the edges; image sequences (write_sequence) are exact.
+        """
+
+        path = Path(path)
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*codec), self.fps, (self.width, self.height), False)
+
+        truths = []
+        for image, truth in self:
+            writer.write(image)
+            truths.append(truth)
+        writer.release()
+
+        return write_ground_truth(path.parent, truths)
+
+    def write_sequence(self, folder: Union[Path, str], img_format: str = "frame_$.png") -> Path:
+        """
+        Writes the frames as an image sequence (--img_format) and the ground truth to ground_truth.json.
+        """
+
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+
+        truths = []
+        for image, truth in self:
+            cv2.imwrite(str(Path(folder, img_format.replace("$", str(truth["frame"]), 1))), image)
+            truths.append(truth)
+
+        return write_ground_truth(folder, truths)
+
+
+def write_ground_truth(folder: Path, truths: list) -> Path:
+    path = Path(folder, "ground_truth.json")
+    with open(path, "w") as file:
+        for truth in truths:
+            file.write(json.dumps(truth) + "\n")
+
+    return path
+
+
+def load_ground_truth(path: Union[Path, str]) -> list:
+    return [json.loads(line) for line in Path(path).read_text().splitlines()]
+
+
+def accuracy(entries: list, truths: list) -> dict:
+    """
+    Compares datalog entries with the ground truth of their frames ("frame" key).
+    Returns the pupil and corneal reflection center errors (px) of frames without eyelid occlusion,
+    the number of those frames without a pupil (other than false blinks), and the recall and precision of the blinks.
+    """
+
+    truths = {truth["frame"]: truth for truth in truths}
+
+    errors = {"pupil": [], "cr_1": [], "cr_2": []}
+    missed = 0
+    blinks = detected = hits = 0
+
+    for entry in entries:
+        truth = truths.get(entry.get("frame"))
+        if truth is None:
+            continue
+
+        blink = truth["blink"] == 1
+        blinks += blink
+        detected += entry.get("blink") == 1
+        hits += blink and entry.get("blink") == 1
+
+        if blink or truth["occlusion"] > 0:
+            continue
+
+        if "pupil" not in entry:
+            missed += entry.get("blink") != 1
+            continue
+
+        errors["pupil"].append(np.hypot(*np.subtract(entry["pupil"][0], truth["pupil"][0])))
+        for cr in ("cr_1", "cr_2"):
+            if cr in entry and cr in truth:
+                errors[cr].append(np.hypot(*np.subtract(entry[cr][:2], truth[cr])))
+
+    report = {"pupil_missed": missed}
+    for key, error in errors.items():
+        if error:
+            report[f"{key}_error_mean"] = float(np.mean(error))
+            report[f"{key}_error_max"] = float(np.max(error))
+
+    report["blink_recall"] = hits / blinks if blinks else 1.
+    report["blink_precision"] = hits / detected if detected else 1.
+    return report
+
+
+def main(args: list = None) -> None:
+    parser = argparse.ArgumentParser(description="Renders a synthetic eye video with ground truth.")
+    parser.add_argument("output", help="Video file (.avi) or folder of an image sequence")
+    parser.add_argument("--frames", default=300, type=int)
+    parser.add_argument("--width", default=640, type=int)
+    parser.add_argument("--height", default=480, type=int)
+    parser.add_argument("--fps", default=120., type=float)
+    parser.add_argument("--crs", default=1, type=int, help="Corneal reflections (1 or 2)")
+    parser.add_argument("--noise", default=3., type=float, help="Standard deviation of the noise")
+    parser.add_argument("--blur", default=1., type=float, help="Standard deviation of the blur (px)")
+    parser.add_argument("--eyelid", default=0., type=float, help="Fraction of the pupil covered by the eyelid")
+    parser.add_argument("--blinks", default="", help="First frames of blinks, comma-separated")
+    parser.add_argument("--img_format", default="frame_$.png", help="Image sequence file names")
+    parser.add_argument("--seed", default=0, type=int)
+    parsed_args = parser.parse_args(args)
+
+    eye = Synthetic_Eye(parsed_args.width, parsed_args.height, parsed_args.fps, parsed_args.frames,
+                        crs=parsed_args.crs, noise=parsed_args.noise, blur=parsed_args.blur,
+                        eyelid=parsed_args.eyelid, seed=parsed_args.seed,
+                        blinks=[int(frame) for frame in parsed_args.blinks.split(",") if frame])
+
+    output = Path(parsed_args.output)
+    if output.suffix:
+        truth_path = eye.write_video(output)
+    else:
+        truth_path = eye.write_sequence(output, parsed_args.img_format)
+
+    print(f"{parsed_args.frames} frames written to {output}, ground truth to {truth_path}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
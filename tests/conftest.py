@@ -0,0 +1,65 @@
+# Shared stand-ins of the importer tests: an engine which records the routed frames, and a route fixture
+import time
+
+import pytest
+
+import eyeloop.config as config
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.file_manager import File_Manager
+
+
+class Recording_Engine:
+    """
+    Stand-in engine which records copies of the routed frames, with their timestamps and skipped counts.
+    A slow engine tracks for `delay` seconds per frame; with `frames`, it releases the importer after that many frames.
+    """
+
+    def __init__(self, delay: float = 0, frames: int = None):
+        self.delay = delay
+        self.last_frame = frames
+
+        self.angle = 0
+        self.frames = []
+        self.captures = []
+        self.received = []
+        self.skipped = []
+        self.released = False
+
+    def arm(self, width, height, image):
+        self.shape = (height, width)
+
+    def iterate(self, image, capture=None, received=None, skipped=None):
+        self.frames.append(image.copy())
+        self.captures.append(capture)
+        self.received.append(received)
+        self.skipped.append(skipped)
+
+        if self.delay > 0:
+            time.sleep(self.delay)
+        if len(self.frames) == self.last_frame:
+            config.importer.release()
+
+    def release(self):
+        self.released = True
+        config.file_manager.flush()  # as Engine.release
+
+
+@pytest.fixture
+def route():
+    """
+    route(importer class, output folder, *arguments, delay=0, frames=None) routes all frames of the importer
+    to a Recording_Engine (see there for delay and frames), and returns the engine.
+    """
+
+    def route(importer, output_dir, *args, delay: float = 0, frames: int = None) -> Recording_Engine:
+        config.arguments = Arguments(["--output_dir", str(output_dir), *args])
+        config.file_manager = File_Manager(output_root=config.arguments.output_dir,
+                                           img_format=config.arguments.img_format,
+                                           save_workers=config.arguments.save_workers,
+                                           save_format=config.arguments.save_format)
+        config.engine = Recording_Engine(delay, frames)
+        config.importer = importer()
+        config.importer.route()
+        return config.engine
+
+    return route
@@ -0,0 +1,88 @@
+"""
+Stand-in for the pymba module (Vimba cameras): a camera which generates frames locally on its own thread,
+with the Vimba, Camera and Frame interface used by eyeloop.importers.vimba.
+Like Vimba, it reuses its announced frame buffers: a buffer is overwritten once its frame is requeued.
+Each frame is filled with its frame ID (mod 256).
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+cameras = []  # every camera opened, for inspection by tests
+
+
+class Frame:
+    def __init__(self, shape: tuple) -> None:
+        self.buffer = np.zeros(shape, dtype=np.uint8)
+        self.data = SimpleNamespace(frameID=0, timestamp=0)
+
+    def buffer_data_numpy(self) -> np.ndarray:
+        return self.buffer
+
+
+class Camera:
+    def __init__(self, camera_id: int, width: int = 64, height: int = 48, max_fps: float = 500) -> None:
+        self.camera_id = camera_id
+        self.shape = (height, width)
+
+        self.ExposureTime = 5000
+        self.ExposureAuto = "Continuous"
+        self.AcquisitionFrameRateMode = "Off"
+        self.AcquisitionFrameRate = max_fps
+
+        self.is_open = False
+        self.armed = False
+        self.frames_generated = 0
+        self.stopped = threading.Event()
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def arm(self, mode: str, callback=None, frame_buffer_count: int = 10) -> None:
+        assert self.is_open and mode == "Continuous"
+        self.callback = callback
+        self.frame_buffer = [Frame(self.shape) for _ in range(frame_buffer_count)]
+        self.armed = True
+
+    def disarm(self) -> None:
+        self.armed = False
+
+    def start_frame_acquisition(self) -> None:
+        self.thread = threading.Thread(target=self.acquire, daemon=True)
+        self.thread.start()
+
+    def stop_frame_acquisition(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def acquire(self) -> None:
+        interval = 1 / self.AcquisitionFrameRate
+        start = time.monotonic()
+
+        while not self.stopped.is_set():
+            frame = self.frame_buffer[self.frames_generated % len(self.frame_buffer)]
+            frame.buffer[:] = self.frames_generated % 256
+            frame.data.frameID = self.frames_generated
+            frame.data.timestamp = int(self.frames_generated * interval * 1e9)
+
+            self.callback(frame)
+            self.frames_generated += 1
+
+            time.sleep(max(start + self.frames_generated * interval - time.monotonic(), 0))
+
+
+class Vimba:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        return
+
+    def camera(self, camera_id: int) -> Camera:
+        cameras.append(Camera(camera_id))
+        return cameras[-1]
@@ -0,0 +1,29 @@
+# Smoke tests of the kernel microbenchmarks
+import json
+
+from benchmarks.kernels import KERNELS, compare, main, run
+
+
+class TestBenchmarks:
+    def test_run(self):
+        results = run(sizes=[(160, 120)], rays=[16, 32], repeat=2)
+
+        assert {result["kernel"] for result in results["results"]} == set(KERNELS)
+        assert len(results["results"]) == 2 * len(KERNELS)
+        assert all(result["median_us"] > 0 for result in results["results"])
+        json.dumps(results)
+
+    def test_compare(self):
+        baseline = run(sizes=[(160, 120)], rays=[16], repeat=2)
+        results = json.loads(json.dumps(baseline))
+        results["results"][0]["median_us"] = baseline["results"][0]["median_us"] * 2
+
+        regressions = compare(results, baseline, tolerance=.25)
+        assert [result["kernel"] for result in regressions] == [results["results"][0]["kernel"]]
+        assert compare(baseline, baseline, tolerance=.25) == []
+
+    def test_main(self, tmpdir):
+        output = str(tmpdir / "results.json")
+        assert main(["--sizes", "160x120", "--rays", "16", "--repeat", "2", "--output", output]) == 0
+        assert main(["--sizes", "160x120", "--rays", "16", "--repeat", "2", "--compare", output,
+                     "--tolerance", "1000"]) == 0
@@ -0,0 +1,78 @@
+# Unit tests of the incremental blink detector
+import numpy as np
+import pytest
+
+from eyeloop.engine.blink import Blink_Detector
+
+
+def frame(intensity: float, shape=(480, 640)) -> np.ndarray:
+    return np.full(shape, intensity, dtype=np.uint8)
+
+
+class TestBlinkDetector:
+    @pytest.mark.parametrize("shape", [(48, 64), (480, 640), (2048, 2448)])
+    def test_constant_sample_count(self, shape):
+        detector = Blink_Detector(samples=4096)
+        detector.sample(frame(100, shape))
+
+        sampled = np.zeros(shape, dtype=np.uint8)[detector.window].size
+        assert sampled == shape[0] * shape[1] or 4096 <= sampled < 4 * 4096
+
+    def test_detects_blinks(self):
+        detector = Blink_Detector(calibration=50)
+        intensities = [100 + (i % 3) for i in range(100)] + [130] * 5 + [101] * 20
+        blinks = [detector.track(frame(intensity, (32, 32))) for intensity in intensities]
+
+        assert np.nonzero(blinks)[0].tolist() == list(range(100, 105))
+        assert detector.mean == pytest.approx(101, abs=3)
+
+    def test_variance_leaves_out_blinks(self):
+        detector = Blink_Detector(calibration=50)
+        for intensity in [100, 102] * 50 + [150] * 3:
+            detector.track(frame(intensity, (32, 32)))
+
+        assert np.sqrt(detector.variance) == pytest.approx(1, abs=.1)
+
+    def test_follows_drift(self):
+        detector = Blink_Detector(calibration=20)
+        blinks = [detector.track(frame(100 + i // 10, (32, 32))) for i in range(400)]
+
+        assert not any(blinks)
+
+    def test_region(self):
+        detector = Blink_Detector()
+        detector.set_region(640, 480, center=(600, 20), radius=50)
+
+        img = frame(0)
+        img[:71, 550:] = 200
+        assert detector.sample(img) == 200
+
+    def test_calibration_callbacks(self):
+        detector = Blink_Detector(calibration=40)
+        progress, calibrated = [], []
+        detector.progress = progress.append
+        detector.calibrated = lambda: calibrated.append(detector.n)
+
+        for _ in range(100):
+            detector.track(frame(100, (8, 8)))
+
+        assert progress == [.5] and calibrated == [40]
+
+    @pytest.mark.parametrize("legacy", [False, True])
+    def test_load(self, tmpdir, legacy):
+        path = str(tmpdir / "blinkcalibration.npy")
+        if legacy:
+            np.save(path, np.r_[np.full(200, 90.), np.full(100, 110.)])
+        else:
+            calibrated = Blink_Detector(calibration=10)
+            for intensity in [90, 110] * 5:
+                calibrated.track(frame(intensity, (8, 8)))
+            calibrated.save(path)
+
+        detector = Blink_Detector(calibration=10)
+        detector.load(path)
+
+        assert detector.mean == pytest.approx(100, abs=4)
+        assert detector.n == detector.calibration
+        assert detector.track(frame(140, (8, 8)))
+        assert not detector.track(frame(100, (8, 8)))
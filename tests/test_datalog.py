@@ -0,0 +1,113 @@
+# Tests of the binary datalog (--datalog binary)
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.engine.engine import Engine
+from eyeloop.extractors.DAQ import Binary_DAQ_extractor, DAQ_extractor
+from eyeloop.utilities import datalog
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.parser import Parser
+
+
+class Core:
+    def __init__(self):
+        self.dataout = {}
+
+
+def dataouts(n=100):
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        dataout = {"time": 1600000000 + i / 500, "received": 1000 + i / 500, "completed": 1000.002 + i / 500}
+        if i % 3:
+            dataout["capture"] = i / 500
+        if i % 10 == 3:
+            dataout["blink"] = 1
+        elif i % 10 != 7:
+            dataout["pupil"] = ((float(rng.uniform(0, 640)), float(rng.uniform(0, 480))), float(rng.uniform(5, 40)),
+                                float(rng.uniform(5, 40)), float(rng.uniform(0, 360)))
+            dataout["cr_1"] = (float(rng.uniform(0, 640)), float(rng.uniform(0, 480)))
+        if i % 2:
+            dataout["frame"] = i
+        if i % 4 == 1:
+            dataout["skipped"] = i % 3
+        yield dataout
+
+
+def log(extractor, n=100) -> list:
+    core = Core()
+    logged = []
+    for dataout in dataouts(n):
+        core.dataout = dataout
+        extractor.fetch(core)
+        logged.append(json.loads(json.dumps(dataout)))
+    extractor.release(core)
+    return logged
+
+
+class TestBinaryDatalog:
+    def test_converts_to_json_lines(self, tmpdir):
+        extractor = Binary_DAQ_extractor(tmpdir)
+        extractor.datalog.block = np.zeros(16, dtype=datalog.DATALOG_DTYPE)  # several blocks
+        logged = log(extractor)
+
+        records = datalog.load(extractor.datalog_path)
+        assert len(records) == len(logged)
+        assert records.dtype == datalog.DATALOG_DTYPE
+
+        json_path = datalog.to_json(extractor.datalog_path)
+        assert [json.loads(line) for line in json_path.read_text().splitlines()] == logged
+
+    def test_engine_records_frames(self, tmpdir):
+        """Entries logged by the engine carry the frame index of the importer."""
+        config.arguments = Arguments([])
+        config.importer = SimpleNamespace(frame=0)
+        engine = Engine(None)
+        engine.load_extractors([Binary_DAQ_extractor(tmpdir)])
+
+        for frame in range(5, 10):
+            config.importer.frame = frame
+            engine.dataout = engine.timestamps(None, None, None)
+            engine.run_extractors()
+        for extractor in engine.extractors:
+            extractor.release(engine)
+
+        assert datalog.load(Path(tmpdir, "datalog.bin"))["frame"].tolist() == list(range(5, 10))
+
+    def test_schema_sidecar(self, tmpdir):
+        extractor = Binary_DAQ_extractor(tmpdir)
+        log(extractor, n=3)
+
+        schema = json.loads(Path(tmpdir, "datalog.schema.json").read_text())
+        assert schema["version"] == datalog.SCHEMA_VERSION
+        assert np.dtype([tuple(field) for field in schema["dtype"]]) == datalog.DATALOG_DTYPE
+        assert Path(tmpdir, "datalog.bin").stat().st_size == 3 * datalog.DATALOG_DTYPE.itemsize
+
+    def test_unsupported_version(self, tmpdir):
+        extractor = Binary_DAQ_extractor(tmpdir)
+        log(extractor, n=3)
+
+        schema_path = datalog.schema_path(extractor.datalog_path)
+        schema_path.write_text(json.dumps({**json.loads(schema_path.read_text()), "version": 2}))
+        with pytest.raises(ValueError):
+            datalog.load(extractor.datalog_path)
+
+    def test_parser_loads_binary(self, tmpdir):
+        binary = Binary_DAQ_extractor(Path(tmpdir))
+        log(binary)
+        json_lines = DAQ_extractor(Path(tmpdir))
+        log(json_lines)
+
+        parser = Parser("mouse")
+        parser.data = []
+        parser.load_log(str(binary.datalog_path))
+        from_binary = parser.data
+
+        parser.data = []
+        parser.load_log(str(json_lines.datalog_path))
+        assert from_binary == parser.data[:len(from_binary)]
+        assert np.array_equal(parser.extract_unique_key("cr_1")[:80], [entry["cr_1"] for entry in from_binary if "cr_1" in entry])
@@ -0,0 +1,221 @@
+# Tests of inline, threaded and subprocess extractors
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from eyeloop.engine.dispatch import Inline_Runner, Process_Runner, Thread_Runner, runner
+
+
+class Recording_Extractor:
+    """Records the fetched dataouts; optionally waits for a gate on every fetch."""
+
+    def __init__(self, mode="inline", policy="drop", gate=None):
+        self.mode = mode
+        self.policy = policy
+        self.gate = gate
+        self.events = []
+
+    def activate(self):
+        self.events.append("activate")
+
+    def fetch(self, core):
+        if self.gate is not None:
+            self.gate.wait()
+        self.events.append(core.dataout["frame"])
+
+    def release(self, core):
+        self.events.append("release")
+
+
+class File_Extractor:
+    """Picklable extractor which logs the fetched frames to a file in its process."""
+
+    mode = "process"
+    policy = "block"
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def activate(self):
+        self.frames = []
+
+    def fetch(self, core):
+        self.frames.append(core.dataout["frame"])
+
+    def release(self, core):
+        Path(self.path).write_text(",".join(map(str, self.frames)))
+
+
+class Failing_Activation:
+    """Extractor whose activate() and release() raise; it should still fetch every sample."""
+
+    policy = "block"
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.frames = []
+
+    def activate(self):
+        raise RuntimeError("activation failed")
+
+    def fetch(self, core):
+        self.frames.append(core.dataout["frame"])
+
+    def release(self, core):
+        raise RuntimeError("release failed")
+
+
+class Exiting_Extractor:
+    """Picklable extractor whose process dies at release, before its statistics are sent back."""
+
+    mode = "process"
+    policy = "block"
+
+    def fetch(self, core):
+        pass
+
+    def release(self, core):
+        os._exit(3)
+
+
+def run(extractor_runner, frames=20) -> SimpleNamespace:
+    engine = SimpleNamespace(dataout={})
+    extractor_runner.activate()
+    for frame in range(frames):
+        engine.dataout = {"frame": frame}
+        extractor_runner.fetch(engine)
+    extractor_runner.release(engine)
+    return engine
+
+
+class TestRunners:
+    @pytest.mark.parametrize("mode, runner_class", [
+        ("inline", Inline_Runner),
+        ("thread", Thread_Runner),
+        ("process", Process_Runner),
+    ])
+    def test_mode(self, tmpdir, mode, runner_class):
+        extractor = Recording_Extractor(mode=mode)
+        if mode == "process":
+            extractor = File_Extractor(Path(tmpdir, "frames.txt"))
+
+        extractor_runner = runner(extractor)
+        run(extractor_runner, frames=0)
+        assert type(extractor_runner) is runner_class
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            runner(Recording_Extractor(mode="gpu"))
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            runner(Recording_Extractor(mode="thread", policy="spill"))
+
+    @pytest.mark.parametrize("mode", ["inline", "thread"])
+    def test_order(self, mode):
+        extractor = Recording_Extractor(mode=mode, policy="block")
+        extractor_runner = runner(extractor, queue_size=4)
+        run(extractor_runner)
+
+        assert extractor.events == ["activate", *range(20), "release"]
+        assert extractor_runner.report()["fetched"] == 20
+
+    def test_samples_are_snapshots(self):
+        gate = threading.Event()
+        extractor = Recording_Extractor(mode="thread", policy="block", gate=gate)
+        extractor_runner = runner(extractor)
+
+        engine = SimpleNamespace(dataout={"frame": 0})
+        extractor_runner.fetch(engine)
+        engine.dataout["frame"] = 1
+        gate.set()
+        extractor_runner.release(engine)
+
+        assert extractor.events == [0, "release"]
+
+    def test_samples_are_deep_copies(self):
+        """Nested values of a sample are shared neither with the engine nor with other extractors."""
+        fetched = []
+
+        class Mutating_Extractor:
+            mode = "thread"
+            policy = "block"
+
+            def fetch(self, sample):
+                fetched.append(sample.dataout)
+                sample.dataout["calibration"].append(-1)
+
+        engine = SimpleNamespace(dataout={"pupil": ((320., 240.), 20., 18., 0.), "calibration": [1, 2]})
+        extractor_runners = [runner(Mutating_Extractor()) for _ in range(2)]
+        for extractor_runner in extractor_runners:
+            extractor_runner.fetch(engine)
+            extractor_runner.release(engine)
+
+        assert engine.dataout["calibration"] == [1, 2]
+        assert [dataout["calibration"] for dataout in fetched] == [[1, 2, -1]] * 2
+        assert fetched[0] == {"pupil": ((320., 240.), 20., 18., 0.), "calibration": [1, 2, -1]}
+
+    def test_drop_does_not_block(self):
+        gate = threading.Event()
+        extractor = Recording_Extractor(mode="thread", policy="drop", gate=gate)
+        extractor_runner = runner(extractor, queue_size=2)
+
+        start = time.perf_counter()
+        engine = SimpleNamespace(dataout={})
+        for frame in range(50):
+            engine.dataout = {"frame": frame}
+            extractor_runner.fetch(engine)
+        assert time.perf_counter() - start < 1
+
+        gate.set()
+        extractor_runner.release(engine)
+
+        report = extractor_runner.report()
+        assert report["dropped"] > 0 and report["fetched"] + report["dropped"] == 50
+        assert report["queue_max"] == 2
+
+    def test_errors_are_caught(self, capsys):
+        class Failing_Extractor:
+            mode = "thread"
+
+            def fetch(self, core):
+                raise RuntimeError("failed")
+
+        extractor_runner = runner(Failing_Extractor())
+        run(extractor_runner, frames=3)
+
+        assert "Failing_Extractor" in capsys.readouterr().out
+        assert extractor_runner.report()["fetched"] == 3
+
+    def test_process(self, tmpdir):
+        path = Path(tmpdir, "frames.txt")
+        extractor_runner = runner(File_Extractor(path))
+        run(extractor_runner)
+
+        assert path.read_text() == ",".join(map(str, range(20)))
+        assert extractor_runner.report()["fetched"] == 20
+
+    @pytest.mark.parametrize("mode", ["thread", "process"])
+    def test_activate_and_release_errors(self, mode):
+        """A raising activate() or release() is logged; the runner keeps draining its queue, and does not hang."""
+        extractor = Failing_Activation(mode)
+        extractor_runner = runner(extractor, queue_size=2)
+        run(extractor_runner, frames=10)
+
+        assert extractor_runner.report()["fetched"] == 10
+        if mode == "thread":
+            assert extractor.frames == list(range(10))
+        assert not extractor_runner.worker.is_alive()
+
+    def test_process_dies(self):
+        extractor_runner = runner(Exiting_Extractor())
+        start = time.perf_counter()
+        run(extractor_runner, frames=5)
+
+        assert time.perf_counter() - start < 30
+        assert extractor_runner.worker.exitcode == 3
+        assert extractor_runner.report()["fetched"] == 0
@@ -0,0 +1,146 @@
+# Tests of the file manager and its background frame writers
+import json
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from eyeloop.utilities.file_manager import File_Manager, Frame_Writer, Sequence_Reader
+
+
+class Gated_Save:
+    """Save function which holds the writers until opened, so the buffer fills up."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.frames = []
+        self.images = []
+
+    def __call__(self, image, frame):
+        self.entered.set()
+        self.gate.wait()
+        self.frames.append(frame)
+        self.images.append(image)
+
+
+class TestFrameWriter:
+    def test_block_saves_every_frame(self, tmpdir):
+        manager = File_Manager(output_root=Path(tmpdir), img_format="frame_$.png", save_workers=2, save_buffer=4)
+        for frame in range(20):
+            manager.save_image(np.full((8, 8), frame, dtype=np.uint8), frame)
+        manager.flush()
+
+        assert manager.writer is None
+        assert len(list(Path(manager.new_folderpath).glob("frame_*.png"))) == 20
+        assert not Path(manager.new_folderpath, "dropped_frames.json").exists()
+
+    def test_drop_counts_frames(self, tmpdir):
+        save = Gated_Save()
+        writer = Frame_Writer(save, Path(tmpdir, "spill"), workers=1, buffer_size=2, policy="drop")
+
+        writer.write(np.zeros((4, 4), dtype=np.uint8), 0)
+        save.entered.wait()
+        for frame in range(1, 10):
+            writer.write(np.zeros((4, 4), dtype=np.uint8), frame)
+        save.gate.set()
+
+        report = writer.flush()
+        assert report["saved"] == len(save.frames) == 3
+        assert report["dropped"] == list(range(3, 10))
+
+    def test_spill_saves_every_frame(self, tmpdir):
+        save = Gated_Save()
+        writer = Frame_Writer(save, Path(tmpdir, "spill"), workers=1, buffer_size=2, policy="spill")
+
+        for frame in range(10):
+            writer.write(np.full((4, 4), frame, dtype=np.uint8), frame)
+        assert len(list(Path(tmpdir, "spill").glob("*.npy"))) == len(writer.spilled) > 0
+        save.gate.set()
+
+        report = writer.flush()
+        assert report["dropped"] == [] and report["saved"] == 10
+        assert sorted(save.frames) == list(range(10))
+        assert not Path(tmpdir, "spill").exists()
+
+    def test_dropped_frames_report(self, tmpdir):
+        manager = File_Manager(output_root=Path(tmpdir), img_format="frame_$.png", save_workers=1, save_buffer=1,
+                               save_policy="drop")
+        save = Gated_Save()
+        manager.writer.save = save
+
+        for frame in range(10):
+            manager.save_image(np.zeros((4, 4), dtype=np.uint8), frame)
+        save.gate.set()
+        manager.flush()
+
+        dropped = json.loads(Path(manager.new_folderpath, "dropped_frames.json").read_text())
+        assert len(dropped) + len(save.frames) == 10 and dropped
+
+    def test_unknown_policy(self, tmpdir):
+        with pytest.raises(ValueError):
+            Frame_Writer(print, Path(tmpdir), policy="queue")
+
+    def test_views_are_copied(self, tmpdir):
+        save = Gated_Save()
+        writer = Frame_Writer(save, Path(tmpdir), workers=1, buffer_size=4)
+        buffer = np.zeros((4, 8), dtype=np.uint8)
+
+        writer.write(buffer[:, :4], 0)
+        save.gate.set()
+        writer.flush()
+
+        assert not np.shares_memory(save.images[0], buffer)
+
+
+def write_sequence(folder: Path, frames: list, img_format: str = "frame_$.png") -> None:
+    """Writes 3-channel frames filled with (frame, 2 * frame, 3 * frame)."""
+    folder.mkdir(parents=True, exist_ok=True)
+    for frame in frames:
+        image = np.empty((6, 8, 3), dtype=np.uint8)
+        image[:] = (frame, 2 * frame, 3 * frame)
+        cv2.imwrite(str(Path(folder, img_format.replace("$", str(frame), 1))), image)
+
+
+class TestSequenceReader:
+    def test_discovery(self, tmpdir):
+        folder = Path(tmpdir, "sequence")
+        write_sequence(folder, [0, 1, 2, 3, 5])  # gap after frame 3
+        write_sequence(folder, [4], img_format="frame_0$.png")
+        Path(folder, "frame_x.png").touch()
+
+        manager = File_Manager(output_root=Path(tmpdir, "out"), img_format="frame_$.png")
+        manager.input_folderpath = folder
+
+        assert [path.name for path in manager.sequence_paths()] == [f"frame_{frame}.png" for frame in range(4)]
+
+    @pytest.mark.parametrize("prefetch", [0, 1, 4])
+    def test_grayscale_in_order(self, tmpdir, prefetch):
+        write_sequence(Path(tmpdir), range(12))
+        paths = [Path(tmpdir, f"frame_{frame}.png") for frame in range(12)]
+        reader = Sequence_Reader(paths, prefetch=prefetch, workers=2)
+
+        images = [reader.read(frame) for frame in range(12)]
+        with pytest.raises(ValueError):
+            reader.read(12)
+        reader.close()
+
+        # the codec converts to gray itself, which may round differently from cvtColor
+        expected = [cv2.cvtColor(cv2.imread(str(path)), cv2.COLOR_BGR2GRAY) for path in paths]
+        assert all(image.ndim == 2 and np.allclose(image, gray, atol=1) for image, gray in zip(images, expected))
+        assert [image[0, 0] for image in images] == [cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)[0, 0] for path in paths]
+        assert len(reader.pending) == 0
+
+    def test_out_of_order(self, tmpdir):
+        write_sequence(Path(tmpdir), range(10))
+        paths = [Path(tmpdir, f"frame_{frame}.png") for frame in range(10)]
+        reader = Sequence_Reader(paths, prefetch=3)
+
+        frames = [7, 8, 2, 3, 4, 9]
+        first = [reader.read(frame)[0, 0] for frame in frames]
+        reader.close()
+
+        reference = Sequence_Reader(paths, prefetch=0)
+        assert first == [reference.read(frame)[0, 0] for frame in frames]
@@ -0,0 +1,90 @@
+# Tests of raw frame stacks: recording with --save_format stack, and replay with the memory-mapped stack importer
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.engine.parallel import count_frames, read_frames
+from eyeloop.importers import cv, stack
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.file_manager import File_Manager
+from eyeloop.utilities.frame_stack import Frame_Stack, Frame_Stack_Writer
+
+TEST_VIDEO = Path(__file__).parent / "testdata" / "short_mouse_noblink.m4v"
+
+
+def frames(count: int, shape: tuple = (6, 8)) -> list:
+    return [np.full(shape, frame, dtype=np.uint8) for frame in range(count)]
+
+
+class TestFrameStack:
+    def test_roundtrip(self, tmpdir):
+        writer = Frame_Stack_Writer(Path(tmpdir, "frames.stack.json"), block_bytes=5 * 48)  # 5 frames per block
+        for frame, image in enumerate(frames(12)):
+            writer.append(image, frame, frame / 100, 1 + frame / 100)
+        writer.close()
+
+        header = json.loads(Path(tmpdir, "frames.stack.json").read_text())
+        assert header["frames"] == 12 and header["shape"] == [6, 8] and header["fps"] == pytest.approx(100)
+
+        stack = Frame_Stack(Path(tmpdir, "frames.stack.json"))
+        assert len(stack) == 12 and isinstance(stack.frames, np.memmap)
+        assert all(np.array_equal(stack[frame], image) for frame, image in enumerate(frames(12)))
+        assert stack[7][0, 0] == 7  # random access
+        assert np.array_equal(stack.times["frame"], range(12)) and stack.times["capture"][3] == pytest.approx(.03)
+
+    def test_interrupted_recording(self, tmpdir):
+        writer = Frame_Stack_Writer(Path(tmpdir, "frames.stack.json"), block_bytes=4 * 48)
+        for frame, image in enumerate(frames(10)):
+            writer.append(image, frame)
+        writer.frames_file.flush()  # not closed: the last block (2 frames) is lost
+
+        stack = Frame_Stack(Path(tmpdir, "frames.stack.json"))
+        assert len(stack) == 8 and np.isnan(stack.times["capture"]).all()
+
+    def test_shape_change(self, tmpdir):
+        writer = Frame_Stack_Writer(Path(tmpdir, "frames.stack.json"))
+        writer.append(np.zeros((6, 8), dtype=np.uint8), 0)
+        with pytest.raises(ValueError):
+            writer.append(np.zeros((8, 6), dtype=np.uint8), 1)
+
+    @pytest.mark.parametrize("save_workers", [0, 2])
+    def test_file_manager(self, tmpdir, save_workers):
+        manager = File_Manager(output_root=Path(tmpdir), img_format="frame_$.png", save_workers=save_workers,
+                               save_format="stack")
+        for frame, image in enumerate(frames(30)):
+            manager.save_image(image, frame, frame / 10, frame / 10)
+        manager.flush()
+
+        stack = Frame_Stack(Path(manager.new_folderpath, "frames.stack.json"))
+        assert [int(image[0, 0]) for image in stack.frames] == list(range(30))  # in frame order
+        assert stack.fps == pytest.approx(10)
+        assert not list(Path(manager.new_folderpath).glob("frame_*.png"))
+
+    def test_parallel_chunks(self, tmpdir):
+        """Chunks of parallel tracking start at their frame of the stack."""
+        path = Path(tmpdir, "frames.stack.json")
+        writer = Frame_Stack_Writer(path)
+        for frame, image in enumerate(frames(20)):
+            writer.append(image, frame)
+        writer.close()
+
+        config.arguments = Arguments(["--video", str(path), "--output_dir", str(tmpdir)])
+        assert count_frames(path) == 20
+        assert [(position, int(image[0, 0])) for position, image in read_frames(path, 5, 9)] == [(5, 5), (6, 6), (7, 7), (8, 8)]
+        assert [position for position, _ in read_frames(path, 18)] == [18, 19]
+
+
+class TestStackImporter:
+    def test_replay_matches_recording(self, route, tmpdir):
+        recorded = route(cv.Importer, Path(tmpdir, "record"), "--video", str(TEST_VIDEO), "--save_format", "stack")
+        recording = Path(config.file_manager.new_folderpath, "frames.stack.json")
+        replayed = route(stack.Importer, Path(tmpdir, "replay"), "--video", str(recording), "--importer", "stack",
+                         "--save", "0")
+
+        assert len(replayed.frames) == len(recorded.frames) == 308
+        assert all(np.array_equal(a, b) for a, b in zip(replayed.frames, recorded.frames))
+        assert replayed.captures == pytest.approx(recorded.captures)
+        assert config.importer.frame == 308
@@ -0,0 +1,54 @@
+# Tests of headless tracking (--headless)
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.guis.headless import GUI, argument_seeds
+from eyeloop.run_eyeloop import EyeLoop
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.synthetic import Synthetic_Eye, accuracy, load_ground_truth
+
+
+class TestSeeds:
+    def test_command_line_overrides_params(self, tmpdir):
+        params = Path(tmpdir, "params.npy")
+        np.save(params, {"pupil": [40, [3, 3], (10., 20.)], "cr1": [170, [3, 3], (30., 40.)], "cr2": [170, [3, 3], -1]})
+
+        config.arguments = Arguments(["--params", str(params), "--pupil_seed", "11.5,21"])
+        assert argument_seeds() == {"pupil": (11.5, 21.), "cr1": (30., 40.)}
+
+    def test_no_seeds(self):
+        config.arguments = Arguments([])
+        with pytest.raises(ValueError):
+            GUI()
+
+
+class TestHeadless:
+    def test_tracks_image_sequence(self, tmpdir):
+        """A headless run tracks from the seeds without a display and releases at the end of the sequence."""
+        eye = Synthetic_Eye(frames=40)
+        truths = load_ground_truth(eye.write_sequence(Path(tmpdir, "sequence")))
+        (x, y), _, _, _ = truths[0]["pupil"]
+        cr_x, cr_y = truths[0]["cr_1"]
+
+        EyeLoop(["--video", str(Path(tmpdir, "sequence")), "--img_format", "frame_$.png", "--output_dir", str(tmpdir),
+                 "--headless", "1", "--clear", "1", "--save", "0", "--pupil_threshold", "60",
+                 "--pupil_seed", f"{x},{y}", "--cr_seed", f"{cr_x},{cr_y}"], logger=None)
+
+        assert config.engine.pupil_processor.binarythreshold == 60
+        assert not config.engine.live
+
+        datalog = Path(config.file_manager.new_folderpath, "datalog.json")
+        entries = [json.loads(line) for line in datalog.read_text().splitlines()]
+        # the first frame is also tracked when the engine is armed, and the last entry is logged again at release
+        assert len(entries) == len(truths) + 2
+        assert all(entry["received"] <= entry["completed"] for entry in entries)
+
+        assert [entry["frame"] for entry in entries[1:-1]] == list(range(len(truths)))
+
+        report = accuracy(entries, truths)
+        assert report["pupil_missed"] == 0
+        assert report["pupil_error_mean"] < 1.5
@@ -0,0 +1,81 @@
+# Tests of the importers, with a stand-in engine which records the routed frames (see conftest.py)
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.importers.cv import Importer
+from eyeloop.utilities.file_manager import File_Manager
+
+TEST_VIDEO = Path(__file__).parent / "testdata" / "short_mouse_noblink.m4v"
+
+
+class TestCvImporter:
+    @pytest.mark.parametrize("save", [0, 1])
+    def test_pipeline_matches_sequential(self, route, tmpdir, save):
+        sequential = route(Importer, Path(tmpdir, "sequential"), "--video", str(TEST_VIDEO), "--save", str(save))
+        pipelined = route(Importer, Path(tmpdir, "pipelined"), "--video", str(TEST_VIDEO), "--save", str(save),
+                          "--pipeline", "1", "--queue_size", "4")
+        importer = config.importer
+
+        assert pipelined.released and sequential.released
+        assert len(pipelined.frames) == 308
+        assert all(np.array_equal(a, b) for a, b in zip(pipelined.frames, sequential.frames))
+
+        saved = sorted(Path(config.file_manager.new_folderpath).glob("frame_*.jpg"))
+        assert len(saved) == (len(pipelined.frames) if save else 0)
+
+        assert importer.stages == []
+        assert all(0 <= peak <= 4 for peak in importer.depth_peak.values())
+        assert set(importer.queue_depths()) == {"decode", "save"}
+
+    def test_pipeline_stage_errors(self, route, tmpdir, monkeypatch):
+        """A failing read ends the stream and a failing save skips the frame; tracking never waits forever."""
+        class Failing_Importer(Importer):
+            def read(self, frame):
+                if frame == 10:
+                    raise cv2.error("corrupt frame")
+                return super().read(frame)
+
+        def save_image(self, image, frame, *stamps):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(File_Manager, "save_image", save_image)
+        routing = threading.Thread(target=route, args=(Failing_Importer, tmpdir, "--video", str(TEST_VIDEO),
+                                                       "--pipeline", "1", "--queue_size", "2"), daemon=True)
+        routing.start()
+        routing.join(30)
+
+        assert not routing.is_alive()
+        assert config.engine.released and len(config.engine.frames) == 10
+        assert config.importer.stages == []
+
+    def test_capture_timestamps(self, route, tmpdir):
+        """Video frames carry their presentation time, and the monotonic time they were read; also when pipelined."""
+        sequential = route(Importer, Path(tmpdir, "sequential"), "--video", str(TEST_VIDEO), "--save", "0")
+        pipelined = route(Importer, Path(tmpdir, "pipelined"), "--video", str(TEST_VIDEO), "--save", "0",
+                          "--pipeline", "1")
+
+        assert sequential.captures[0] == 0 and np.all(np.diff(sequential.captures) > 0)
+        assert np.all(np.diff(sequential.received) >= 0)
+        assert pipelined.captures == sequential.captures
+
+    @pytest.mark.parametrize("prefetch", [0, 4])
+    def test_image_sequence(self, route, tmpdir, prefetch):
+        """Image sequences are read in grayscale up to the last frame, prefetched or not."""
+        folder = Path(tmpdir, "sequence")
+        folder.mkdir()
+        for frame in range(15):
+            cv2.imwrite(str(Path(folder, f"frame_{frame}.png")), np.full((24, 32, 3), (frame, 2 * frame, 3 * frame), dtype=np.uint8))
+
+        engine = route(Importer, tmpdir, "--video", str(folder), "--img_format", "frame_$.png", "--save", "0",
+                       "--prefetch", str(prefetch))
+
+        gray = [float(cv2.cvtColor(np.full((1, 1, 3), (frame, 2 * frame, 3 * frame), dtype=np.uint8), cv2.COLOR_BGR2GRAY)[0, 0])
+                for frame in range(15)]
+        assert engine.shape == (24, 32)
+        assert np.allclose([np.mean(image) for image in engine.frames], gray, atol=1)  # converted to gray by the codec
+        assert config.importer.sequence.pool is None
@@ -0,0 +1,81 @@
+# Tests of latest-frame-wins live capture (eyeloop.importers.live)
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.importers.cv import Importer
+from eyeloop.importers.live import Capture_Thread, Frame_Ring
+
+TEST_VIDEO = Path(__file__).parent / "testdata" / "short_mouse_noblink.m4v"
+
+
+def publish(ring: Frame_Ring, value: int) -> None:
+    ring.claim((2, 2))[:] = value
+    ring.publish(value, value)
+
+
+class TestFrameRing:
+    def test_newest_frame_wins(self):
+        ring = Frame_Ring(3)
+        assert ring.take(0) is None
+
+        for value in range(5):
+            publish(ring, value)
+        image, capture, received, skipped = ring.take(0)
+        assert image[0, 0] == 4 and capture == 4 and skipped == 4
+
+        publish(ring, 5)
+        assert ring.take(0)[3] == 0
+        assert ring.skipped == 4 and ring.written == 6
+
+    def test_taken_frame_is_not_overwritten(self):
+        ring = Frame_Ring(3)
+        publish(ring, 1)
+        image, _, _, _ = ring.take(0)
+
+        for value in range(2, 10):
+            publish(ring, value)
+        assert image[0, 0] == 1
+        assert ring.take(0)[0][0, 0] == 9
+
+    def test_too_small(self):
+        with pytest.raises(ValueError):
+            Frame_Ring(2)
+
+    def test_capture_thread(self):
+        frames = iter(range(1, 4))
+
+        def read(slot):
+            value = next(frames, None)
+            if value is not None:
+                slot[:] = value
+            return value
+
+        ring = Frame_Ring()
+        capture = Capture_Thread(ring, read, (2, 2))
+        capture.start()
+        capture.thread.join(1)
+
+        assert ring.closed and ring.take(0)[0][0, 0] == 3
+        assert ring.take(0) is None
+
+
+class Live_Importer(Importer):
+    """cv importer which captures a video file as if it were a webcam."""
+
+    def first_frame(self) -> None:
+        super().first_frame()
+        self.live_capture = True
+
+
+class TestLiveCapture:
+    def test_tracks_newest_frames(self, route, tmpdir):
+        engine = route(Live_Importer, tmpdir, "--video", str(TEST_VIDEO), "--save", "0", delay=.005)
+        importer = config.importer
+
+        assert engine.released and not importer.capture_thread.thread.is_alive()
+
+        assert np.all(np.diff(engine.captures) > 0)
+        assert len(engine.frames) + sum(engine.skipped) == importer.ring.written
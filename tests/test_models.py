@@ -0,0 +1,112 @@
+# Unit tests of the shape models
+import numpy as np
+import pytest
+
+from eyeloop.engine.models.circular import Circle, fit_circles
+from eyeloop.engine.models.ellipsoid import Ellipse, fit_ellipses
+
+
+def ellipse_points(center, width, height, angle, n=32):
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    phi = np.deg2rad(angle)
+    x = width * np.cos(t) * np.cos(phi) - height * np.sin(t) * np.sin(phi)
+    y = width * np.cos(t) * np.sin(phi) + height * np.sin(t) * np.cos(phi)
+    return np.column_stack((x + center[0], y + center[1]))
+
+
+class TestEllipse:
+    @pytest.mark.parametrize("center, width, height, angle", [
+        ((320., 240.), 40., 25., 30.),
+        ((12.5, 800.), 3., 5., 100.),
+        ((1000., 1000.), 60., 59., 0.),
+    ])
+    def test_fit_exact(self, center, width, height, angle):
+        model = Ellipse(None)
+        assert model.fit(ellipse_points(center, width, height, angle)) == pytest.approx(center, abs=1e-6)
+
+        (x0, y0), fit_width, fit_height, fit_angle = model.params
+        assert sorted((fit_width, fit_height)) == pytest.approx(sorted((width, height)), rel=1e-6)
+        assert 0 <= fit_angle < 360
+
+    def test_fit_reuses_buffers(self):
+        model = Ellipse(None)
+        model.fit(ellipse_points((100., 100.), 10., 8., 0., n=200))
+        design = model.design
+        assert design.shape[0] >= 200
+
+        assert model.fit(ellipse_points((50., 60.), 10., 8., 45., n=16)) == pytest.approx((50., 60.), abs=1e-6)
+        assert model.design is design
+
+    def test_fit_line_raises(self):
+        line = np.column_stack((np.arange(10.), 2 * np.arange(10.)))
+        with pytest.raises(Exception):
+            Ellipse(None).fit(line)
+
+    @pytest.mark.parametrize("points", [
+        ellipse_points((336., 261.), 1.1, 1., 20.),
+        # a walkout collapsed onto the 3x3 px box around the seed, as on frames of the human test video
+        np.array([(x, y) for x in np.linspace(335, 337, 7) for y in np.linspace(260, 262, 7)
+                  if x in (335, 337) or y in (260, 262)]),
+    ])
+    def test_fit_degenerate_raises(self, points):
+        """Fits narrower than MIN_AXIS are rejected, by the single and the batched fit."""
+        with pytest.raises(IndexError):
+            Ellipse(None).fit(points)
+        assert np.isnan(fit_ellipses(points[np.newaxis])[0]).all()
+
+
+def noisy_batch(frames=50, n=32, seed=0):
+    rng = np.random.default_rng(seed)
+    batch = np.array([ellipse_points(rng.uniform(50, 500, 2), *rng.uniform(5, 60, 2), rng.uniform(0, 180), n=n)
+                      for _ in range(frames)])
+    return np.round(batch + rng.normal(0, .5, batch.shape))
+
+
+class TestBatchedFit:
+    def test_fit_ellipses_matches_single(self):
+        batch = noisy_batch()
+        centers, width, height, angle = fit_ellipses(batch)
+
+        model = Ellipse(None)
+        for i, points in enumerate(batch):
+            model.fit(points)
+            (x0, y0), w, h, a = model.params
+            assert centers[i] == pytest.approx((x0, y0), abs=1e-6)
+            assert (width[i], height[i]) == pytest.approx((w, h), rel=1e-6)
+            assert angle[i] == pytest.approx(a, abs=1e-6)
+
+    def test_fit_circles_matches_single(self):
+        batch = noisy_batch()
+        centers, width, height, angle = fit_circles(batch)
+
+        model = Circle(None)
+        for i, points in enumerate(batch):
+            model.fit(points)
+            (x0, y0), r, _, _ = model.params
+            assert centers[i] == pytest.approx((x0, y0), abs=1e-9)
+            assert width[i] == height[i] == pytest.approx(r, rel=1e-9)
+        assert np.all(angle == 0)
+
+    @pytest.mark.parametrize("fit", [fit_ellipses, fit_circles])
+    def test_mask_drops_points(self, fit):
+        batch = noisy_batch(frames=10)
+        mask = np.ones(batch.shape[:2], dtype=bool)
+        mask[:, ::3] = False
+
+        dropped = batch.copy()
+        dropped[~mask] = np.nan
+        expected = fit(batch[:, mask[0]])
+
+        for result, reference in zip(fit(dropped, mask), expected):
+            np.testing.assert_allclose(result, reference, rtol=1e-9, atol=1e-9)
+
+    @pytest.mark.parametrize("fit", [fit_ellipses, fit_circles])
+    def test_invalid_frames_are_nan(self, fit):
+        batch = noisy_batch(frames=3)
+        batch[1] = np.column_stack((np.arange(32.), np.arange(32.)))
+        mask = np.ones(batch.shape[:2], dtype=bool)
+        mask[2, 2:] = False
+
+        centers, width, height, angle = fit(batch, mask)
+        assert np.isfinite(centers[0]).all()
+        assert np.isnan(centers[1:]).all() and np.isnan(width[1:]).all() and np.isnan(angle[1:]).all()
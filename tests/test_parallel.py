@@ -0,0 +1,109 @@
+# Tests of parallel offline tracking (--workers)
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.engine.parallel import chunk_ranges, shared_thresholds, track_chunk, track_parallel
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.file_manager import File_Manager
+
+TEST_VIDEO = Path(__file__).parent / "testdata" / "short_mouse_noblink.m4v"
+
+
+def save_params(path: Path) -> None:
+    """Thresholds as in Engine.arm, seeds at the largest dark blob and the nearest bright blob."""
+    _, image = cv2.VideoCapture(str(TEST_VIDEO)).read()
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    filtered_image = image[np.logical_and((image < 220), (image > 30))]
+    pupil_threshold = np.min(filtered_image) + np.median(filtered_image) * .1
+    cr_threshold = float(np.min(filtered_image)) * .7 + 150
+
+    _, _, stats, centers = cv2.connectedComponentsWithStats((image < pupil_threshold).astype(np.uint8))
+    pupil = centers[1 + np.argmax(stats[1:, cv2.CC_STAT_AREA])]
+    _, _, _, centers = cv2.connectedComponentsWithStats((image > cr_threshold).astype(np.uint8))
+    cr = centers[1 + np.argmin(np.linalg.norm(centers[1:] - pupil, axis=1))]
+
+    np.save(path, {
+        "pupil": [pupil_threshold, [3, 3], tuple(pupil)],
+        "cr1": [cr_threshold, [3, 3], tuple(cr)],
+        "cr2": [cr_threshold, [3, 3], -1]
+    })
+
+
+def seed_arguments(params: Path) -> list:
+    """The seeds of the params file on the command line, without its thresholds."""
+    params_ = np.load(params, allow_pickle=True).tolist()
+    (x, y), (cr_x, cr_y) = params_["pupil"][2], params_["cr1"][2]
+    return ["--pupil_seed", f"{x},{y}", "--cr_seed", f"{cr_x},{cr_y}", "--clear", "1"]
+
+
+def run_parallel(tmpdir, params: Path, workers: int, chunk_size: int, seeds_only: bool = False) -> list:
+    source = seed_arguments(params) if seeds_only else ["--params", str(params)]
+    config.arguments = Arguments(["--video", str(TEST_VIDEO), *source, "--workers", str(workers),
+                                  "--chunk_size", str(chunk_size), "--output_dir", str(tmpdir)])
+    config.file_manager = File_Manager(output_root=config.arguments.output_dir, img_format=config.arguments.img_format)
+
+    track_parallel(workers)
+
+    datalog = Path(config.file_manager.new_folderpath, "datalog.json")
+    return [json.loads(line) for line in datalog.read_text().splitlines()]
+
+
+class TestParallel:
+    @pytest.mark.parametrize("frames, chunk_size, expected", [
+        (10, 4, [(0, 4), (4, 8), (8, None)]),
+        (8, 4, [(0, 4), (4, None)]),
+        (3, 10, [(0, None)]),
+        (0, 10, [(0, None)]),
+    ])
+    def test_chunk_ranges(self, frames, chunk_size, expected):
+        assert chunk_ranges(frames, chunk_size) == expected
+
+    def test_chunks_match_single_run(self, tmpdir):
+        params = Path(tmpdir, "params.npy")
+        save_params(params)
+
+        single = run_parallel(Path(tmpdir, "single"), params, workers=1, chunk_size=10 ** 6)
+        chunked = run_parallel(Path(tmpdir, "chunked"), params, workers=2, chunk_size=40)
+
+        assert [entry["frame"] for entry in chunked] == list(range(len(single)))
+        assert sum("pupil" in entry for entry in single) > .9 * len(single)
+        for a, b in zip(single, chunked):
+            assert a.get("pupil") == b.get("pupil")
+            assert a.get("cr_1") == b.get("cr_1")
+
+    def test_thresholds_shared_without_params(self, tmpdir):
+        """Without a params file, the thresholds are estimated once, so every chunk is binarized alike."""
+        params = Path(tmpdir, "params.npy")
+        save_params(params)
+
+        single = run_parallel(Path(tmpdir, "single"), params, workers=1, chunk_size=10 ** 6, seeds_only=True)
+        chunked = run_parallel(Path(tmpdir, "chunked"), params, workers=2, chunk_size=40, seeds_only=True)
+
+        assert sum("pupil" in entry for entry in single) > .9 * len(single)
+        for a, b in zip(single, chunked):
+            assert a.get("pupil") == b.get("pupil")
+            assert a.get("cr_1") == b.get("cr_1")
+
+    def test_chunk_uses_shared_thresholds(self, tmpdir):
+        """A chunk starting late in the video is binarized with the thresholds of the first frame."""
+        params = Path(tmpdir, "params.npy")
+        save_params(params)
+        params_ = np.load(params, allow_pickle=True).tolist()
+
+        config.arguments = Arguments(["--video", str(TEST_VIDEO), *seed_arguments(params), "--output_dir", str(tmpdir)])
+        config.file_manager = File_Manager(output_root=config.arguments.output_dir, img_format=config.arguments.img_format)
+
+        thresholds = shared_thresholds(TEST_VIDEO)
+        assert thresholds["pupil"][0] == pytest.approx(params_["pupil"][0])
+        assert thresholds["cr1"][0] == thresholds["cr2"][0] == pytest.approx(params_["cr1"][0])
+
+        seeds = {"pupil": params_["pupil"][2], "cr1": params_["cr1"][2]}
+        track_chunk((config.arguments, config.file_manager, seeds, thresholds, 240, 250, Path(tmpdir, "chunk.json")))
+        assert config.engine.pupil_processor.binarythreshold == thresholds["pupil"][0]
+        assert config.engine.cr_processor_1.binarythreshold == thresholds["cr1"][0]
@@ -0,0 +1,88 @@
+# Tests of minimum-gui rendering: the off-thread tracking preview and the adjustment panels
+import threading
+import time
+
+import numpy as np
+
+from eyeloop.guis.minimum.minimum_gui import GUI
+from eyeloop.guis.minimum.preview import Mailbox, Preview_Renderer, render
+
+
+class TestMailbox:
+    def test_newest_post_once(self):
+        mailbox = Mailbox()
+        assert mailbox.take() is None
+
+        mailbox.post(1)
+        mailbox.post(2)
+        assert mailbox.take() == 2
+        assert mailbox.take() is None
+        assert mailbox.posted() == 2
+
+
+class TestPreviewRenderer:
+    def test_render(self):
+        img = np.full((48, 64), 100, dtype=np.uint8)
+        source_rgb = render(img, ((32, 24), 10, 8, 0), ((20, 20), None))
+
+        assert source_rgb.shape == (48, 64, 3)
+        assert tuple(source_rgb[24, 32]) == (0, 0, 220)  # pupil cross
+        assert tuple(source_rgb[20, 20]) == (0, 220, 0)  # corneal reflection cross
+        assert tuple(source_rgb[0, 0]) == (100, 100, 100)
+
+    def test_draws_off_thread_and_shows_on_caller(self):
+        shown = []
+        keys = iter([-1, ord("q")])
+        now = [0.]
+        preview = Preview_Renderer(1, show=lambda image: shown.append((threading.current_thread(), image)),
+                                   wait=lambda ms: next(keys, -1), transform=lambda image: image[::-1],
+                                   clock=lambda: now[0])
+        preview.start()
+
+        for value in range(2):
+            now[0] += 1
+            img = np.zeros((4, 4), dtype=np.uint8)
+            img[0] = value + 1
+            preview.post(img)
+            img[:] = 255  # the importer reuses the buffer for a later frame
+
+            for _ in range(100):  # the tracking thread refreshes on every frame
+                preview.refresh()
+                if len(shown) > value:
+                    break
+                time.sleep(.01)
+
+        preview.stop()
+
+        assert len(shown) == 2 and all(thread is threading.current_thread() for thread, _ in shown)
+        assert shown[1][1][-1, 0, 0] == 2 and not shown[1][1][:-1].any()  # drawn from the copy, transformed
+        assert preview.quit
+        assert not preview.thread.is_alive()
+
+    def test_posts_once_per_interval(self):
+        now = [0.]
+        preview = Preview_Renderer(1, clock=lambda: now[0])
+
+        for now[0] in np.arange(0, 3, .1):
+            preview.post(np.zeros((4, 4), dtype=np.uint8))
+
+        assert preview.mailbox.posted() == 3
+
+
+class TestAdjustmentPanel:
+    def test_paste_in_place(self):
+        gui = GUI()
+        gui.binary_width, gui.binary_height = 300, 200
+        gui.regions = {"pupil": None, "cr": None}
+        panel = np.zeros((200, 300), dtype=np.uint8)
+        buffer = panel.ctypes.data
+
+        gui.paste(panel, "pupil", np.full((100, 100), 255, dtype=np.uint8))
+        assert np.count_nonzero(panel) == 100 * 100 and panel[50:150, 100:200].all()
+
+        gui.paste(panel, "pupil", np.full((40, 60), 255, dtype=np.uint8))
+        assert np.count_nonzero(panel) == 40 * 60 and panel[80:120, 120:180].all()
+
+        gui.paste(panel, "pupil", None)
+        assert not panel.any()
+        assert panel.ctypes.data == buffer
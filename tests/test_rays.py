@@ -0,0 +1,187 @@
+# Tests of the walkout: table-driven ray casting of the pupil and corneal reflection processors
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.engine.processor import Shape
+from eyeloop.engine.rays import Rays, ray_fan
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.synthetic import Synthetic_Eye
+
+SIZE = (160, 120)
+
+
+def processor(center: tuple, *args, type: int = 1, size: tuple = SIZE) -> Shape:
+    config.arguments = Arguments(list(args))
+    config.engine = SimpleNamespace(width=size[0], height=size[1], dataout={})
+
+    shape = Shape(type, 1)
+    shape.binarythreshold = 60
+    shape.reset(center)
+    return shape
+
+
+def track(shape: Shape, images) -> list:
+    """
+    Tracks the images in order; returns the pupil fit of each.
+    """
+
+    fits = []
+    for image in images:
+        config.engine.dataout = {}
+        shape.track(image)
+        fits.append(config.engine.dataout.get("pupil"))
+    return fits
+
+
+def binarized(params, size: tuple = SIZE) -> np.ndarray:
+    """
+    A binarized pupil: white inside the ellipse ((x, y), width, height, angle), as after pupil_thresh.
+    """
+
+    image = np.zeros(size[::-1], dtype=np.uint8)
+    (x, y), width, height, angle = params
+    cv2.ellipse(image, (round(x), round(y)), (round(width), round(height)), angle, 0, 360, 255, -1)
+    return image
+
+
+def legacy_crop_list(canvas: np.ndarray, center: tuple, start: int, stop: int) -> np.ndarray:
+    """
+    Distances of the 32 pupil rays as the original walkout found them: with boolean diagonal masks
+    on the crops of the canvas around the center, flipped so that every ray runs from the center.
+    """
+
+    cx, cy = center
+    size = max(canvas.shape)
+    i = np.arange(size)
+    masks = {}
+    for name, (rows, columns) in {"main": (i, i), "half": (i // 2, i), "fourth": (i // 4, i), "third": (i // 3, i),
+                                  "invhalf": (i, i // 2), "invfourth": (i, i // 4), "invthird": (i, i // 3)}.items():
+        masks[name] = np.zeros((size, size), dtype=bool)
+        masks[name][rows, columns] = True
+
+    crops = {"se": canvas[cy:, cx:], "nw": np.flip(canvas[:cy, :cx]),
+             "sw": np.fliplr(canvas[cy:, :cx]), "ne": np.flipud(canvas[:cy, cx:])}
+    flipped = np.flip(canvas)
+
+    def diagonal(crop, name):
+        crop = crops[crop]
+        return crop[masks[name][:crop.shape[0], :crop.shape[1]]]
+
+    rays = [crops["se"][:, 0], crops["se"][0, :]] + [diagonal(crop, "main") for crop in ("se", "nw", "sw", "ne")] \
+        + [flipped[-cy, -cx:], flipped[-cy:, -cx]]
+    for name, order in (("half", ("se", "nw", "sw", "ne")), ("invhalf", ("se", "nw", "sw", "ne")),
+                        ("fourth", ("se", "ne", "nw", "sw")), ("invfourth", ("se", "sw", "nw", "ne")),
+                        ("third", ("se", "sw", "nw", "ne")), ("invthird", ("se", "sw", "nw", "ne"))):
+        rays += [diagonal(crop, name) for crop in order]
+
+    return np.array([np.argmax(ray[start:stop] == 0) for ray in rays]) + start
+
+
+class TestWalkout:
+    @pytest.mark.parametrize("type", [1, 2])
+    def test_source_unchanged(self, type):
+        shape = processor((80, 60), type=type)
+        shape.source = np.full(SIZE[::-1], 255, dtype=np.uint8)
+
+        r = shape.walkout()
+
+        assert np.all(shape.source == 255)
+        assert np.max(r[:, 0]) == SIZE[0] - 1 and np.max(r[:, 1]) == SIZE[1] - 1  # stopped by the black border
+
+    @pytest.mark.parametrize("frame", [0, 45, 130])
+    @pytest.mark.parametrize("offset", [(0, 0), (-7, 4), (11, -9)])
+    def test_matches_legacy_walkout(self, frame, offset):
+        eye = Synthetic_Eye(frames=frame + 1)
+        truth = eye.ground_truth(frame)
+        center = tuple(np.round(truth["pupil"][0]).astype(int) + offset)
+
+        shape = processor(center, size=(640, 480))
+        shape.source = eye.render(frame, truth)
+        shape.thresh()
+        canvas = shape.canvas()
+
+        crop_list = shape.rays.cast(canvas, np.array(center), shape.min_radius, shape.max_radius)
+        assert np.array_equal(crop_list, legacy_crop_list(canvas, center, shape.min_radius, shape.max_radius))
+
+
+class TestFrameSize:
+    def test_2048_px_frame(self):
+        """Frames over 1024 px (the size of the original diagonal masks) are tracked."""
+        eye = Synthetic_Eye(width=2048, height=2048, pupil_radius=60, frames=61)
+        truth = eye.ground_truth(60)  # right of x = 1024, so the crops left of the pupil are over 1024 px wide
+        (x, y), width, height, _ = truth["pupil"]
+        assert x > 1100
+
+        shape = processor((x + 5, y - 5), size=(2048, 2048))
+        fit = track(shape, [eye.render(60, truth)] * 2)[-1]
+
+        assert fit[0] == pytest.approx((x, y), abs=1)
+        assert fit[1:3] == pytest.approx((width, height), abs=1.5)
+
+
+class TestRoi:
+    def test_fit_matches_full_frame(self):
+        """Tracking inside the window (--roi 1) fits the same pupil as tracking the full frame."""
+        images, truths = Synthetic_Eye(frames=30).arrays()
+        seed = truths[0]["pupil"][0]
+
+        full = track(processor(seed, size=(640, 480)), images)
+        windowed = processor(seed, "--roi", "1", size=(640, 480))
+        fits = track(windowed, images)
+
+        assert windowed.origin.any() and windowed.corners != windowed.standard_corners
+        for fit, expected in zip(fits, full):
+            assert fit[0] == pytest.approx(expected[0], abs=1e-9)
+            assert fit[1:] == pytest.approx(expected[1:], abs=1e-9)
+
+    def test_offsets_cache_is_bounded(self):
+        """The window resizes every frame; offsets stay exact while the cache keeps at most offsets_cache widths."""
+        rays = ray_fan(32)
+        for width in range(20, 200, 3):
+            for start, stop in ((2, width // 2), (0, width)):
+                dy, dx = rays.steps(stop)
+                assert np.array_equal(rays.offsets(width, start, stop), dy[:, start:] * width + dx[:, start:])
+            assert len(rays.offsets_) <= Rays.offsets_cache
+
+
+class TestRayFan:
+    @pytest.mark.parametrize("n", [8, 16, 24, 48])
+    def test_symmetric(self, n):
+        """Opposite rays of a fan reach the same distance on a centered disc."""
+        canvas = binarized(((80., 60.), 30., 30., 0.))
+        crop_list = ray_fan(n).cast(canvas, np.array((80, 60)), 0, 100)
+
+        assert np.array_equal(crop_list[:n // 2], crop_list[n // 2:])
+        assert np.array_equal(crop_list[1:n // 2], crop_list[n - 1:n // 2:-1])  # mirrored about the x axis
+
+    @pytest.mark.parametrize("rays, model, error", [(16, "ellipsoid", 1.5), (48, "ellipsoid", 1.5),
+                                                    (8, "circular", 2.5)])  # the pupil is elliptical
+    def test_tracks_with_ray_count(self, rays, model, error):
+        images, truths = Synthetic_Eye(frames=20).arrays()
+        shape = processor(truths[0]["pupil"][0], "--pupil_rays", str(rays), "--model", model, size=(640, 480))
+        assert shape.rays.n == rays
+
+        fits = track(shape, images)
+
+        for fit, truth in zip(fits, truths):
+            assert fit[0] == pytest.approx(truth["pupil"][0], abs=error)
+
+    @pytest.mark.parametrize("n", [0, 6, 30])
+    def test_invalid(self, n):
+        with pytest.raises(ValueError):
+            ray_fan(n)
+
+    @pytest.mark.parametrize("args", [["--pupil_rays", "12"], ["--pupil_rays", "18"], ["--cr_rays", "2"],
+                                      ["--pupil_rays", "4", "--model", "circular"]])
+    def test_arguments_rejected(self, args, capsys):
+        with pytest.raises(SystemExit):
+            Arguments(args)
+        assert "must be a multiple of 4 and at least" in capsys.readouterr().err
+
+    def test_arguments_accepted(self):
+        arguments = Arguments(["--pupil_rays", "8", "--model", "circular", "--cr_rays", "8"])
+        assert (arguments.pupil_rays, arguments.cr_rays) == (8, 8)
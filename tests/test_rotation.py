@@ -0,0 +1,100 @@
+# Tests of axis alignment (--rotation 1): the fits are rotated instead of the pixels
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.engine.engine import Engine
+from eyeloop.engine.models.ellipsoid import Ellipse
+from eyeloop.engine.rotation import Rotation
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.file_manager import File_Manager
+
+SIZE = (160, 120)
+
+
+def ellipse_mask(params) -> np.ndarray:
+    mask = np.zeros(SIZE[::-1], dtype=np.uint8)
+    (x, y), width, height, angle = params
+    cv2.ellipse(mask, (round(x), round(y)), (round(width), round(height)), angle, 0, 360, 255, -1)
+    return mask
+
+
+class TestRotation:
+    def test_matrices_are_cached(self):
+        rotation = Rotation((80, 60), SIZE)
+        assert rotation.matrices(30) is rotation.matrices(30)
+        assert len(rotation.cache) == 1
+
+    @pytest.mark.parametrize("angle", [-9, 30, 90])
+    def test_point_roundtrip(self, angle):
+        rotation = Rotation((80, 60), SIZE)
+        point = rotation.point((100, 20), angle)
+        assert rotation.point((80, 60), angle) == pytest.approx((80, 60))
+        assert rotation.point(point, angle, inverse=True) == pytest.approx((100, 20))
+
+    @pytest.mark.parametrize("angle", [-15, 12, 45])
+    def test_fit_matches_rotated_pixels(self, angle):
+        """The rotated fit covers the ellipse of the rotated frame."""
+        rotation = Rotation((80, 60), SIZE)
+        params = ((95., 50.), 30., 15., 20.)
+
+        rotated_pixels = rotation.image(ellipse_mask(params), angle) > 127
+        rotated_fit = ellipse_mask(rotation.fit(params, angle)) > 0
+
+        overlap = np.sum(rotated_pixels & rotated_fit) / np.sum(rotated_pixels | rotated_fit)
+        assert overlap > .9
+
+    def test_fit_matches_model_on_rotated_points(self):
+        rotation = Rotation((80, 60), SIZE)
+        t = np.linspace(0, 2 * np.pi, 32, endpoint=False)
+        points = np.column_stack((90 + 25 * np.cos(t), 55 + 10 * np.sin(t)))
+
+        model = Ellipse(None)
+        model.fit(points)
+        aligned = rotation.fit(model.params, 30)
+
+        forward = rotation.matrices(30)[0]
+        model.fit(points @ forward[:, :2].T + forward[:, 2])
+        (x, y), width, height, angle = model.params
+
+        assert aligned[0] == pytest.approx((x, y), abs=1e-6)
+        difference = (aligned[3] - angle) % 180  # ellipse axes are symmetric
+        assert min(difference, 180 - difference) == pytest.approx(0, abs=1e-6)
+
+
+class TestEngineAlignment:
+    @pytest.mark.parametrize("rotation, angle, aligned", [(1, 30, True), (1, 0, False), (0, 30, False)])
+    def test_dataout(self, rotation, angle, aligned):
+        config.arguments = Arguments(["--rotation", str(rotation)])
+        engine = Engine(None)
+        engine.rotation = Rotation((80, 60), SIZE)
+        engine.angle = angle
+
+        pupil = ((100., 40.), 10., 8., 5.)
+        engine.dataout = {"time": 0, "pupil": pupil, "cr_1": (90., 45.), "cr_2": None}
+        engine.align()
+
+        if aligned:
+            center, width, height, fit_angle = engine.dataout["pupil"]
+            assert center == pytest.approx(engine.rotation.point((100, 40), angle))
+            assert (width, height, fit_angle) == pytest.approx((10., 8., 335.))
+            assert engine.dataout["cr_1"] == pytest.approx(engine.rotation.point((90, 45), angle))
+        else:
+            assert engine.dataout["pupil"] is pupil
+        assert engine.dataout["cr_2"] is None
+        assert pupil == ((100., 40.), 10., 8., 5.)
+
+    def test_saved_frames_are_rotated(self, tmpdir):
+        rotation = Rotation((80, 60), SIZE)
+        manager = File_Manager(output_root=Path(tmpdir), img_format="frame_$.png", save_workers=2)
+        manager.transform = lambda image: rotation.image(image, 90)
+
+        image = ellipse_mask(((95., 50.), 30., 15., 20.))
+        manager.save_image(image, 0)
+        manager.flush()
+
+        saved = cv2.imread(str(Path(manager.new_folderpath, "frame_0.png")), cv2.IMREAD_GRAYSCALE)
+        assert np.array_equal(saved, rotation.image(image, 90))
@@ -0,0 +1,83 @@
+# Tests of the synthetic eye videos, and of the tracking accuracy on them
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+from eyeloop.engine.parallel import shared_thresholds, track_chunk
+from eyeloop.utilities.argument_parser import Arguments
+from eyeloop.utilities.file_manager import File_Manager
+from eyeloop.utilities.synthetic import Synthetic_Eye, accuracy, load_ground_truth
+
+
+class TestSyntheticEye:
+    @pytest.mark.parametrize("frame", [0, 17, 80])
+    def test_pupil_matches_ground_truth(self, frame):
+        eye = Synthetic_Eye(crs=0, noise=0, blur=0)
+        truth = eye.ground_truth(frame)
+        image = eye.render(frame, truth)
+
+        (x, y), width, height, _ = truth["pupil"]
+        weights = np.clip(60. - image, 0, None)  # pupil 25, iris 100; anti-aliased edges weigh partially
+        ys, xs = np.indices(image.shape)
+        assert np.average(xs, weights=weights) == pytest.approx(x, abs=.05)
+        assert np.average(ys, weights=weights) == pytest.approx(y, abs=.05)
+        assert np.count_nonzero(image < 62) == pytest.approx(np.pi * width * height, rel=.02)
+
+    def test_reproducible(self):
+        first, _ = Synthetic_Eye(width=64, height=48, frames=3, seed=1).arrays()
+        second, _ = Synthetic_Eye(width=64, height=48, frames=3, seed=1).arrays()
+        other, _ = Synthetic_Eye(width=64, height=48, frames=3, seed=2).arrays()
+
+        assert np.array_equal(first, second) and not np.array_equal(first, other)
+
+    def test_blinks(self):
+        eye = Synthetic_Eye(frames=40, blinks=(10,), blink_frames=10)
+        images, truths = eye.arrays()
+
+        blinks = [truth["frame"] for truth in truths if truth["blink"]]
+        assert blinks and min(blinks) > 10 and max(blinks) < 20
+        assert images[15].mean() > images[5].mean() + 10
+
+    @pytest.mark.parametrize("crs", [1, 2])
+    def test_reflections(self, crs):
+        truth = Synthetic_Eye(crs=crs).ground_truth(0)
+        assert [key for key in truth if key.startswith("cr_")] == [f"cr_{n}" for n in range(1, crs + 1)]
+
+    def test_write(self, tmpdir):
+        eye = Synthetic_Eye(width=64, height=48, frames=5)
+
+        truth_path = eye.write_sequence(Path(tmpdir, "sequence"))
+        assert len(list(Path(tmpdir, "sequence").glob("frame_*.png"))) == 5
+        assert load_ground_truth(truth_path) == [eye.ground_truth(frame) for frame in range(5)]
+
+        eye.write_video(Path(tmpdir, "video.avi"))
+        assert int(cv2.VideoCapture(str(Path(tmpdir, "video.avi"))).get(cv2.CAP_PROP_FRAME_COUNT)) == 5
+
+
+class TestTrackingAccuracy:
+    def test_synthetic_sequence(self, tmpdir):
+        """Tracking of a synthetic image sequence stays close to its ground truth."""
+        eye = Synthetic_Eye(frames=150, blinks=(100,), blink_frames=12)
+        truths = load_ground_truth(eye.write_sequence(Path(tmpdir, "sequence")))
+
+        config.arguments = Arguments(["--video", str(Path(tmpdir, "sequence")), "--img_format", "frame_$.png",
+                                      "--output_dir", str(tmpdir), "--clear", "1"])
+        config.file_manager = File_Manager(output_root=config.arguments.output_dir, img_format=config.arguments.img_format)
+        seeds = {"pupil": tuple(truths[0]["pupil"][0]), "cr1": tuple(truths[0]["cr_1"])}
+        thresholds = shared_thresholds(config.arguments.video)
+
+        datalog = track_chunk((config.arguments, config.file_manager, seeds, thresholds, 0, None,
+                               Path(tmpdir, "datalog.json")))
+
+        entries = [json.loads(line) for line in datalog.read_text().splitlines()]
+        for entry in entries:
+            entry["frame"] = entry.pop("position")
+
+        report = accuracy(entries, truths)
+        assert report["pupil_missed"] == 0
+        assert report["pupil_error_mean"] < 1.5 and report["pupil_error_max"] < 3
+        assert report["blink_recall"] == 1
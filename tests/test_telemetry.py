@@ -0,0 +1,74 @@
+# Tests of the throughput and latency telemetry extractor
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import eyeloop.config as config
+from eyeloop.extractors.telemetry import INTERVAL_EDGES, Telemetry_extractor
+
+
+def run(telemetry: Telemetry_extractor, frames: list) -> None:
+    """Fetches (frame index, received time, dataout) entries on a stand-in engine and importer; tracking takes 2 ms."""
+    config.importer = SimpleNamespace(frame=0)
+    core = SimpleNamespace(dataout={})
+    for frame, timestamp, dataout in frames:
+        config.importer.frame = frame
+        core.dataout = {"time": timestamp, "received": timestamp, "completed": timestamp + .002, **dataout}
+        telemetry.fetch(core)
+
+
+class TestTelemetry:
+    def test_period_statistics(self, tmpdir):
+        telemetry = Telemetry_extractor(tmpdir, interval=3600)
+        run(telemetry, [(0, 0, {})])  # before activation
+
+        telemetry.activate()
+        pupil = {"pupil": [[1, 1], 2, 2, 0]}
+        run(telemetry, [(0, 0, pupil), (1, .01, pupil), (2, .02, {}), (5, .03, pupil),
+                        (6, .06, {"blink": 1}), (7, .07, pupil)])
+        stats = telemetry.write()
+
+        assert stats["frames"] == 6
+        assert stats["fps"] == pytest.approx(5 / .07)
+        assert stats["interval_ms"]["p50"] == pytest.approx(10) and stats["interval_ms"]["max"] == pytest.approx(30)
+        assert sum(stats["interval_hist"]) == 5
+        assert stats["interval_hist"][INTERVAL_EDGES.index(25)] == 1  # the 30 ms interval
+        assert stats["dropped"] == 2 and stats["late"] == 1
+        assert stats["lost_track"] == pytest.approx(1 / 6) and stats["blink"] == pytest.approx(1 / 6)
+        assert stats["latency_ms"]["p50"] == pytest.approx(2) and stats["latency_ms"]["max"] == pytest.approx(2)
+
+    def test_totals_across_periods(self, tmpdir):
+        telemetry = Telemetry_extractor(tmpdir, interval=3600)
+        telemetry.activate()
+
+        run(telemetry, [(0, 0, {}), (1, .01, {})])
+        telemetry.write()
+        run(telemetry, [(3, .02, {})])  # interval to the last frame of the previous period
+        stats = telemetry.write()
+
+        assert stats["frames"] == 3 and stats["dropped"] == 1 and stats["lost_track_frames"] == 3
+        assert sum(stats["interval_hist"]) == 1
+
+    def test_stats_file(self, tmpdir):
+        telemetry = Telemetry_extractor(tmpdir, interval=0)
+        telemetry.activate()
+        run(telemetry, [(frame, frame / 100, {}) for frame in range(3)])
+        telemetry.release(None)
+
+        lines = [json.loads(line) for line in Path(tmpdir, "telemetry.json").read_text().splitlines()]
+        assert lines[0] == {"interval_edges_ms": list(INTERVAL_EDGES)}
+        assert len(lines) == 5 and lines[-1]["frames"] == 3
+
+    def test_release_twice(self, tmpdir):
+        telemetry = Telemetry_extractor(tmpdir, interval=3600)
+        telemetry.activate()
+        run(telemetry, [(0, 0, {}), (1, .01, {})])
+
+        telemetry.release(None)
+        telemetry.release(None)
+        run(telemetry, [(2, .02, {})])  # after release
+
+        lines = Path(tmpdir, "telemetry.json").read_text().splitlines()
+        assert len(lines) == 2 and json.loads(lines[-1])["frames"] == 2
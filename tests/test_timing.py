@@ -0,0 +1,46 @@
+# Unit tests of the stage timer
+import logging
+
+import pytest
+
+from eyeloop.engine.timing import Stage_Timer
+
+
+class TestStageTimer:
+    def test_percentiles(self):
+        timer = Stage_Timer(stages=("a", "b"), size=1000)
+        for duration in range(1, 1001):
+            timer.record("a", duration * 1000)
+
+        summary = timer.percentiles()
+        assert list(summary) == ["a"]
+        assert summary["a"]["p50"] == pytest.approx(.5, abs=.001)
+        assert summary["a"]["p99"] == pytest.approx(.99, abs=.001)
+        assert summary["a"]["max"] == 1
+
+    def test_ring_keeps_last(self):
+        timer = Stage_Timer(stages=("a",), size=8)
+        for duration in range(20):
+            timer.record("a", duration)
+
+        assert sorted(timer.durations("a")) == list(range(12, 20))
+
+    def test_summary_lists_stages(self):
+        timer = Stage_Timer()
+        timer.record("pupil_fit", 40000)
+        timer.record("track", 900000)
+
+        lines = timer.summary().splitlines()
+        assert len(lines) == 3 and lines[1].startswith("pupil_fit") and lines[2].startswith("track")
+
+    @pytest.mark.parametrize("interval, logged", [(0, 0), (1, 2)])
+    def test_tick(self, caplog, interval, logged):
+        timer = Stage_Timer(interval=interval)
+        timer.record("track", 1000)
+
+        with caplog.at_level(logging.INFO):
+            start = timer.next_summary
+            for now in (start - 1, start, start + 10, start + 10 ** 9):
+                timer.tick(now)
+
+        assert sum("stage timing" in record.message for record in caplog.records) == logged
@@ -0,0 +1,44 @@
+# Tests of the Vimba importer, against a stand-in pymba module which generates frames locally
+import importlib
+import sys
+
+import numpy as np
+import pytest
+
+import eyeloop.config as config
+
+import fake_pymba
+
+
+@pytest.fixture
+def vimba(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pymba", fake_pymba)
+    monkeypatch.delitem(sys.modules, "eyeloop.importers.vimba", raising=False)
+    return importlib.import_module("eyeloop.importers.vimba")
+
+
+class TestVimbaImporter:
+    def test_persistent_session(self, vimba, route, tmpdir):
+        route(vimba.Importer, tmpdir, "--importer", "vimba", "--save", "0", "--exposure", "300", "--camera_fps", "200",
+              "--vimba_buffers", "4", "--camera", "1", frames=10)
+        importer, camera = config.importer, fake_pymba.cameras[-1]
+
+        assert camera.camera_id == 1 and len(camera.frame_buffer) == 4
+        assert camera.ExposureTime == 300 and camera.ExposureAuto == "Off" and camera.AcquisitionFrameRate == 200
+        assert not camera.is_open and not camera.armed
+        assert importer.frame == 10
+
+    def test_newest_frame_wins(self, vimba, route, tmpdir):
+        """Tracking slower than the camera skips to the newest frame; the skipped frames are counted per frame."""
+        engine = route(vimba.Importer, tmpdir, "--importer", "vimba", "--save", "0", delay=.01, frames=20)  # 500 fps
+        importer, camera = config.importer, fake_pymba.cameras[-1]
+
+        ids = np.array([int(image.min()) for image in engine.frames])
+        assert all(image.min() == image.max() for image in engine.frames)  # copied before the buffer was reused
+        assert np.all(np.diff(ids) > 0)
+        assert np.array_equal(np.diff(ids) - 1, engine.skipped[1:]) and sum(engine.skipped) > 0
+        assert importer.ring.skipped >= sum(engine.skipped)
+        assert importer.missed == 0
+
+        assert np.allclose(np.array(engine.captures) * 500, ids)
+        assert camera.frames_generated > ids[-1]